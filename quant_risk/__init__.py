@@ -1,6 +1,6 @@
 from .models import regression, time_series
-from .portfolio import portfolio, regime_signal
-from .statistics import annualize, VaR, financial_ratios, statistics, summarize, tests
+from .portfolio import portfolio, regime_signal, covariance, performance, frontier, backtest
+from .statistics import annualize, VaR, financial_ratios, statistics, summarize, tests, kernels, rolling, streaming
 from .utils import fetch_data, plot
 
 __all__ = [
@@ -8,12 +8,19 @@ __all__ = [
     'time_series',
     'portfolio',
     'regime_signal',
+    'covariance',
+    'performance',
+    'frontier',
+    'backtest',
     'annualize',
     'VaR',
     'financial_ratios',
     'statistics',
     'summarize',
     'tests',
+    'kernels',
+    'rolling',
+    'streaming',
     'fetch_data',
     'plot'
 ]
\ No newline at end of file
@@ -1,20 +1,435 @@
 from statsmodels.regression.linear_model import OLS
 import statsmodels.api as sm
-from typing import Union
+from typing import NamedTuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from scipy import stats
+from scipy.linalg import solve_triangular
+import os
+import numpy as np
 import pandas as pd
 
 __all__ = [
-    'regress'
+    'regress',
+    'regress_batch',
+    'BatchRegressionResults',
+    'rolling_regress',
+    'regularization_path',
+    'RegularizationPathResult'
 ]
 
-def regress(endogenousSeries: pd.Series, exogenousSeries: Union[pd.Series, pd.DataFrame], method: str = 'OLS', **kwargs):
-    """This function implements regression for a given set of endogeneous and exogeneous variables.
-    Note: summary() function is not available for any method except 'OLS'
+class BatchRegressionResults(NamedTuple):
+    """Result of regression.regress_batch, one column per target
+
+    Attributes
+    ----------
+    params : pd.DataFrame
+        estimated coefficients, indexed by regressor
+    bse : pd.DataFrame
+        standard errors of the coefficients, indexed by regressor
+    tvalues : pd.DataFrame
+        t-statistics of the coefficients, indexed by regressor
+    pvalues : pd.DataFrame
+        two-sided p-values of the t-statistics, indexed by regressor
+    rsquared : pd.Series
+        R-squared of each regression (centered if the design has a constant, as in statsmodels)
+    nobs : pd.Series
+        number of observations used in each regression
+    """
+    params: pd.DataFrame
+    bse: pd.DataFrame
+    tvalues: pd.DataFrame
+    pvalues: pd.DataFrame
+    rsquared: pd.Series
+    nobs: pd.Series
+
+class RegularizationPathResult(NamedTuple):
+    """Result of regression.regularization_path
+
+    Attributes
+    ----------
+    params : pd.Series
+        coefficients (with the constant) at the penalty with the lowest cross-validated error
+    bestAlpha : float
+        penalty with the lowest cross-validated error
+    coefficientPath : pd.DataFrame
+        coefficients (with the constant) at every penalty, indexed by penalty from the largest down
+    cvError : pd.DataFrame
+        mean squared error of every validation fold at every penalty, indexed by penalty
+    """
+    params: pd.Series
+    bestAlpha: float
+    coefficientPath: pd.DataFrame
+    cvError: pd.DataFrame
+
+def _solve_targets(X: np.ndarray, Y: np.ndarray, hasConstant: bool) -> tuple:
+    """Least squares of every column of Y on X from a single QR factorisation of X"""
+
+    nObs, nRegressors = X.shape
+    Q, R = np.linalg.qr(X)
+
+    if np.abs(np.diag(R)).min() <= 1e-10 * np.abs(np.diag(R)).max():
+        raise ValueError("The design matrix is rank deficient")
+
+    params = solve_triangular(R, Q.T @ Y)
+    resid = Y - X @ params
+    ssr = np.einsum('ij,ij->j', resid, resid)
+    dfResid = nObs - nRegressors
+
+    # diag((X'X)^-1) is the squared row norms of R^-1
+    RInverse = solve_triangular(R, np.eye(nRegressors))
+    bse = np.sqrt(np.outer((RInverse ** 2).sum(axis=1), ssr / dfResid))
+
+    tss = ((Y - Y.mean(axis=0)) ** 2).sum(axis=0) if hasConstant else (Y ** 2).sum(axis=0)
+    rsquared = 1 - ssr / tss
+
+    return params, bse, rsquared, nObs
+
+def regress_batch(endogenousFrame: pd.DataFrame, exogenousSeries: Union[pd.Series, pd.DataFrame]) -> BatchRegressionResults:
+    """Runs OLS of every column of endogenousFrame on the same exogenous covariates (with a constant).
+    The shared design matrix is factorised once and all targets are solved together, instead of building
+    one statsmodels model per target. Targets sharing the same missing observations are solved together,
+    so only one factorisation is needed per distinct pattern of missing values.
+
+    Parameters
+    ----------
+    endogenousFrame : pd.DataFrame
+        T x N endogenous variables, one target per column
+    exogenousSeries : Union[pd.Series, pd.DataFrame]
+        Exogenous covariates shared by every target, aligned to the rows of endogenousFrame
+
+    Returns
+    -------
+    BatchRegressionResults
+        coefficients, standard errors, t-statistics, p-values, R-squared and number of observations of every target
+
+    Raises
+    ------
+    ValueError
+        If the design matrix of a set of targets is rank deficient
+    """
+    exogenousSeries = sm.add_constant(exogenousSeries)
+    hasConstant = bool((np.ptp(np.asarray(exogenousSeries, dtype='float64'), axis=0) == 0).any())
+
+    X = np.asarray(exogenousSeries, dtype='float64')
+    Y = endogenousFrame.to_numpy(dtype='float64')
+    nRegressors, nTargets = X.shape[1], Y.shape[1]
+
+    # Rows with a missing covariate are dropped for every target, missing targets only for that target
+    valid = ~np.isnan(Y) & ~np.isnan(X).any(axis=1)[:, None]
+    patterns, groups = np.unique(valid.T, axis=0, return_inverse=True)
+    groups = np.asarray(groups).ravel()
+
+    params = np.full((nRegressors, nTargets), np.nan)
+    bse = np.full((nRegressors, nTargets), np.nan)
+    rsquared = np.full(nTargets, np.nan)
+    nobs = np.zeros(nTargets, dtype=np.int64)
+
+    for group, rows in enumerate(patterns):
+
+        targets = groups == group
+
+        # Targets with too few observations for any residual degrees of freedom are left missing
+        if rows.sum() <= nRegressors:
+            continue
+
+        solution = _solve_targets(X[rows], Y[np.ix_(rows, targets)], hasConstant)
+        params[:, targets], bse[:, targets], rsquared[targets], nobs[targets] = solution
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tvalues = params / bse
+
+    pvalues = 2 * stats.t.sf(np.abs(tvalues), nobs - nRegressors)
+
+    names = exogenousSeries.columns if isinstance(exogenousSeries, pd.DataFrame) else None
+    params, bse, tvalues, pvalues = (pd.DataFrame(values, index=names, columns=endogenousFrame.columns)
+                                        for values in (params, bse, tvalues, pvalues))
+
+    return BatchRegressionResults(params, bse, tvalues, pvalues,
+                                    pd.Series(rsquared, index=endogenousFrame.columns),
+                                    pd.Series(nobs, index=endogenousFrame.columns))
+
+def _solve_normal_equations(gram: np.ndarray, xty: np.ndarray) -> np.ndarray:
+    """Solves the normal equations of one shared (k x k) or one per-target (N x k x k) gram matrix,
+    targets whose gram matrix is singular are left missing"""
+
+    try:
+        if gram.ndim == 2:
+            return np.linalg.solve(gram, xty)
+
+        return np.linalg.solve(gram, xty.T[..., None])[..., 0].T
+
+    except np.linalg.LinAlgError:
+        params = np.full(xty.shape, np.nan)
+        grams = gram if gram.ndim == 3 else np.broadcast_to(gram, (xty.shape[1],) + gram.shape)
+
+        for j in range(xty.shape[1]):
+            try:
+                params[:, j] = np.linalg.solve(grams[j], xty[:, j])
+            except np.linalg.LinAlgError:
+                pass
+
+        return params
+
+def rolling_regress(endogenousSeries: Union[pd.Series, pd.DataFrame], exogenousSeries: Union[pd.Series, pd.DataFrame],
+                    window: int = 252, expanding: bool = False, minPeriods: int = None) -> pd.DataFrame:
+    """Runs OLS (with a constant) over rolling or expanding windows for one or many targets.
+    The normal equations X'X and X'y are updated incrementally, adding the entering observation and dropping the
+    leaving one, so each date costs O(k^2 N) instead of refitting the whole window. The rolling sums are recomputed
+    exactly once every `window` dates so rounding errors cannot build up.
+    Missing observations are skipped for the target they belong to (or for every target if a covariate is missing).
+
+    Parameters
+    ----------
+    endogenousSeries : Union[pd.Series, pd.DataFrame]
+        Endogenous series, or a T x N DataFrame of them
+    exogenousSeries : Union[pd.Series, pd.DataFrame]
+        Exogenous covariates shared by every target, aligned to the rows of endogenousSeries
+    window : int, optional
+        number of observations in each rolling window, by default 252
+    expanding : bool, optional
+        True to use every observation up to each date instead of a rolling window, by default False
+    minPeriods : int, optional
+        minimum number of observations needed for an estimate, by default window
+
+    Returns
+    -------
+    pd.DataFrame
+        Coefficients aligned to the dates of endogenousSeries, with one column per coefficient for a Series
+        and (coefficient, target) columns for a DataFrame
+    """
+    exogenousSeries = sm.add_constant(exogenousSeries)
+    names = exogenousSeries.columns if isinstance(exogenousSeries, pd.DataFrame) else None
+    frame = endogenousSeries.to_frame() if isinstance(endogenousSeries, pd.Series) else endogenousSeries
+    minPeriods = window if minPeriods is None else minPeriods
+
+    X = np.asarray(exogenousSeries, dtype='float64')
+    Y = frame.to_numpy(dtype='float64')
+    nObs, nRegressors = X.shape
+    nTargets = Y.shape[1]
+
+    valid = ~np.isnan(Y) & ~np.isnan(X).any(axis=1)[:, None]
+    X = np.where(np.isnan(X), 0.0, X)
+    Y = np.where(valid, Y, 0.0)
+    weights = valid.astype('float64')
+
+    # One gram matrix serves every target unless they are missing on different dates
+    sharedGram = bool((valid.all(axis=1) | ~valid.any(axis=1)).all())
+    gramWeights = weights[:, 0] if sharedGram else weights
+
+    def window_sums(start, end):
+        xty = X[start:end].T @ Y[start:end]
+        if sharedGram:
+            gram = (X[start:end] * gramWeights[start:end, None]).T @ X[start:end]
+        else:
+            gram = np.einsum('tn,ti,tj->nij', gramWeights[start:end], X[start:end], X[start:end])
+        return gram, xty, weights[start:end].sum(axis=0)
+
+    def row_update(t, sign):
+        outer = np.outer(X[t], X[t])
+        gramUpdate = gramWeights[t] * outer if sharedGram else gramWeights[t][:, None, None] * outer
+        return sign * gramUpdate, sign * np.outer(X[t], Y[t]), sign * weights[t]
+
+    gram, xty, count = window_sums(0, 0)
+    params = np.full((nObs, nRegressors, nTargets), np.nan)
+
+    for t in range(nObs):
+
+        if not expanding and t >= window and t % window == 0:
+            gram, xty, count = window_sums(t - window + 1, t + 1)
+
+        else:
+            updates = [row_update(t, 1.0)]
+            if not expanding and t >= window:
+                updates.append(row_update(t - window, -1.0))
+
+            for gramUpdate, xtyUpdate, countUpdate in updates:
+                gram = gram + gramUpdate
+                xty = xty + xtyUpdate
+                count = count + countUpdate
+
+        ready = count >= minPeriods
+        if ready.all():
+            params[t] = _solve_normal_equations(gram, xty)
+
+        elif ready.any():
+            params[t][:, ready] = _solve_normal_equations(gram if sharedGram else gram[ready], xty[:, ready])
+
+    if isinstance(endogenousSeries, pd.Series):
+        return pd.DataFrame(params[:, :, 0], index=frame.index, columns=names)
+
+    columns = pd.MultiIndex.from_product([names if names is not None else range(nRegressors), frame.columns],
+                                            names=['coefficient', 'target'])
+
+    return pd.DataFrame(params.reshape(nObs, -1), index=frame.index, columns=columns)
+
+def _moments(X: np.ndarray, y: np.ndarray) -> tuple:
+    """Sufficient statistics of a regression sample: counts, sums and cross products"""
+
+    return len(y), X.sum(axis=0), y.sum(), X.T @ X, X.T @ y
+
+def _coordinate_descent_path(moments: tuple, alphas: np.ndarray, L1_wt: float, maxIter: int, tol: float) -> tuple:
+    """Elastic net path by cyclical coordinate descent on the centered Gram matrix, each penalty warm started
+    from the solution of the previous (larger) one. Minimises
+    0.5 * RSS / n + alpha * (L1_wt * |b|_1 + 0.5 * (1 - L1_wt) * |b|^2), leaving the constant unpenalised
+
+    Returns
+    -------
+    tuple
+        (len(alphas) x k matrix of slopes, vector of constants)
+    """
+    n, sumX, sumY, crossX, crossXY = moments
+    meanX, meanY = sumX / n, sumY / n
+    gram = crossX / n - np.outer(meanX, meanX)
+    covariance = crossXY / n - meanX * meanY
+    diagonal = np.diag(gram)
+
+    slopes = np.zeros((len(alphas), len(meanX)))
+    b = np.zeros(len(meanX))
+    gramB = np.zeros(len(meanX))
+
+    for i, alpha in enumerate(alphas):
+
+        threshold = alpha * L1_wt
+        denominator = diagonal + alpha * (1 - L1_wt)
+
+        for _ in range(maxIter):
+
+            largestStep = 0.0
+            for j in range(len(b)):
+
+                if denominator[j] == 0:
+                    continue
+
+                rho = covariance[j] - gramB[j] + diagonal[j] * b[j]
+                updated = np.sign(rho) * max(abs(rho) - threshold, 0.0) / denominator[j]
+                step = updated - b[j]
+
+                if step != 0.0:
+                    gramB += step * gram[:, j]
+                    b[j] = updated
+                    largestStep = max(largestStep, abs(step))
+
+            if largestStep <= tol * max(np.abs(b).max(), 1e-12):
+                break
+
+        slopes[i] = b
+
+    return slopes, meanY - slopes @ meanX
+
+def _validate_fold(moments: tuple, XValidation: np.ndarray, yValidation: np.ndarray, alphas: np.ndarray,
+                    L1_wt: float, maxIter: int, tol: float) -> np.ndarray:
+    """Fits the path on the training moments and returns the mean squared error on the validation fold"""
+
+    slopes, constants = _coordinate_descent_path(moments, alphas, L1_wt, maxIter, tol)
+    residuals = yValidation[:, None] - XValidation @ slopes.T - constants
+
+    return (residuals ** 2).mean(axis=0)
+
+def regularization_path(endogenousSeries: pd.Series, exogenousSeries: Union[pd.Series, pd.DataFrame],
+                        method: str = 'Lasso', alphas: Union[list, np.ndarray] = None, nAlphas: int = 50,
+                        nFolds: int = 5, nJobs: int = 1, maxIter: int = 1000, tol: float = 1e-6,
+                        L1_wt: float = None) -> RegularizationPathResult:
+    """Fits Ridge, Lasso or elastic net regressions over a whole grid of penalties and picks the penalty
+    by K-fold cross-validation. Every fit is run by coordinate descent on the Gram matrix, which is computed once
+    (the training Gram matrix of each fold is the full one minus the fold's), and each penalty is warm started from
+    the previous one. The folds are contiguous blocks of observations, so no future data is shuffled into the
+    past, and they can be run in worker processes.
+    The objective is 0.5 * RSS / n + alpha * (L1_wt * |b|_1 + 0.5 * (1 - L1_wt) * |b|^2) as in
+    OLS.fit_regularized, but the constant is not penalised.
 
     Parameters
     ----------
     endogenousSeries : pd.Series
         Endogenous series for our regression
+    exogenousSeries : Union[pd.Series, pd.DataFrame]
+        Exogenous covariates for our regression, a constant is added
+    method : str, optional
+        Type of regularisation, 'Ridge' or 'Lasso', by default 'Lasso'
+    alphas : Union[list, np.ndarray], optional
+        Penalties to fit, by default None (nAlphas penalties spaced geometrically from the smallest penalty
+        that sets every coefficient to zero, or its Ridge equivalent, down to a thousandth of the Lasso one)
+    nAlphas : int, optional
+        Number of penalties in the default grid, by default 50
+    nFolds : int, optional
+        Number of cross-validation folds, by default 5
+    nJobs : int, optional
+        Number of worker processes used for the folds, -1 to use every CPU, by default 1 (no process pool)
+    maxIter : int, optional
+        Maximum number of coordinate descent sweeps per penalty, by default 1000
+    tol : float, optional
+        Convergence tolerance on the largest coefficient update relative to the largest coefficient, by default 1e-6
+    L1_wt : float, optional
+        Weight of the L1 penalty to use an elastic net instead, overrides the method, by default None
+
+    Returns
+    -------
+    RegularizationPathResult
+        Coefficients at the best penalty, the best penalty, the coefficient path and the cross-validation errors
+
+    Raises
+    ------
+    NameError
+        Incase an invalid method is selected, a NameError is raised
+    """
+    if L1_wt is None:
+
+        if method not in ('Ridge', 'Lasso'):
+            raise NameError(f"Invalid method '{method}'Please choose from 'Ridge' or 'Lasso'")
+
+        L1_wt = 0.0 if method == 'Ridge' else 1.0
+
+    data = pd.concat([endogenousSeries, exogenousSeries], axis=1).dropna()
+    y = data.iloc[:, 0].to_numpy(dtype='float64')
+    X = data.iloc[:, 1:].to_numpy(dtype='float64')
+    names = ['const'] + list(data.columns[1:])
+
+    moments = _moments(X, y)
+
+    if alphas is None:
+        n, sumX, sumY, _, crossXY = moments
+        alphaMax = np.abs(crossXY / n - sumX / n * sumY / n).max() / max(L1_wt, 1e-3)
+        alphas = alphaMax * np.geomspace(1, 1e-3 * max(L1_wt, 1e-3), nAlphas)
+
+    # Largest penalty first, so the warm starts move from the sparse end of the path
+    alphas = np.sort(np.asarray(alphas, dtype='float64'))[::-1]
+
+    folds = np.array_split(np.arange(len(y)), nFolds)
+    foldArgs = []
+    for rows in folds:
+        foldMoments = _moments(X[rows], y[rows])
+        trainingMoments = tuple(total - part for total, part in zip(moments, foldMoments))
+        foldArgs.append((trainingMoments, X[rows], y[rows], alphas, L1_wt, maxIter, tol))
+
+    if nJobs == -1:
+        nJobs = os.cpu_count()
+
+    if nJobs > 1:
+        with ProcessPoolExecutor(max_workers=min(nJobs, nFolds)) as executor:
+            errors = list(executor.map(_validate_fold, *zip(*foldArgs)))
+
+    else:
+        errors = [_validate_fold(*args) for args in foldArgs]
+
+    cvError = pd.DataFrame(np.column_stack(errors), index=pd.Index(alphas, name='alpha'),
+                            columns=pd.RangeIndex(nFolds, name='fold'))
+
+    slopes, constants = _coordinate_descent_path(moments, alphas, L1_wt, maxIter, tol)
+    coefficientPath = pd.DataFrame(np.column_stack([constants, slopes]), index=cvError.index, columns=names)
+
+    bestAlpha = cvError.mean(axis=1).idxmin()
+
+    return RegularizationPathResult(coefficientPath.loc[bestAlpha].rename(None), bestAlpha, coefficientPath, cvError)
+
+def regress(endogenousSeries: Union[pd.Series, pd.DataFrame], exogenousSeries: Union[pd.Series, pd.DataFrame], method: str = 'OLS',
+            batch: bool = False, **kwargs):
+    """This function implements regression for a given set of endogeneous and exogeneous variables.
+    Note: summary() function is not available for any method except 'OLS'
+    With batch=True, every column of a DataFrame of endogenous series is regressed in one batch, see regress_batch (OLS only).
+
+    Parameters
+    ----------
+    endogenousSeries : Union[pd.Series, pd.DataFrame]
+        Endogenous series for our regression, or a T x N DataFrame of them
     exogenousSeries : Union[pd.Series, pd.DataFrame]
         Exogenous covariates for our regression
     method : str, optional
@@ -24,11 +439,13 @@ def regress(endogenousSeries: pd.Series, exogenousSeries: Union[pd.Series, pd.Da
         2. Ridge
         3. Lasso
         , by default 'OLS'
+    batch : bool, optional
+        Whether to regress every column of a DataFrame of endogenous series in one batch, by default False
 
     Returns
     -------
-    RegressionResults
-        Returns a fitted instance of the regression model
+    Union[RegressionResults, BatchRegressionResults]
+        Returns a fitted instance of the regression model, or the batched results with batch=True
 
     Raises
     ------
@@ -36,6 +453,16 @@ def regress(endogenousSeries: pd.Series, exogenousSeries: Union[pd.Series, pd.Da
         Incase an invalid method is selected, a NameError is raised
     """
 
+    if batch:
+
+        if method != 'OLS':
+            raise NameError(f"Invalid method '{method}' with batch=True, only 'OLS' is batched")
+
+        if kwargs:
+            raise TypeError(f"regress_batch does not accept the OLS arguments {sorted(kwargs)}")
+
+        return regress_batch(pd.DataFrame(endogenousSeries), exogenousSeries)
+
     exogenousSeries = sm.add_constant(exogenousSeries)
     model = OLS(endog=endogenousSeries, exog=exogenousSeries, **kwargs)
 
@@ -1,22 +1,162 @@
 from statsmodels.tsa.arima.model import ARIMA
-from typing import Union
+from typing import NamedTuple, Union
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import os
+import time
 import numpy as np
 import pandas as pd
+from quant_risk.statistics import tests
 
 import warnings
 warnings.filterwarnings('ignore')
 
 __all__ = [
-    'auto_arima'
+    'auto_arima',
+    'AutoARIMAResult',
+    'iter_auto_arima_panel',
+    'auto_arima_panel'
 ]
 
+# Covariates shared by every series of a panel, set only inside worker processes by the pool initializer
+_panelExog = None
+_panelFutureExog = None
+
+class AutoARIMAResult(NamedTuple):
+    """Result of time_series.auto_arima
+
+    Attributes
+    ----------
+    results : ARIMAResults
+        fitted arima model with the best chosen order of components
+    bestParams : tuple
+        the best order in the format (p, d, q)
+    bestMetric : float
+        value of the information criterion for the best order
+    searchTable : pd.DataFrame
+        one row per candidate order with the chosen metric, its information criteria, fit time in seconds
+        and error message (if it failed)
+    """
+    results: object
+    bestParams: tuple
+    bestMetric: float
+    searchTable: pd.DataFrame
+
+def _fit_orders(endogenousSeries: Union[pd.Series, np.array], exogenousSeries: Union[pd.DataFrame, np.array],
+                candidates: list, metric: str, kwargs: dict) -> tuple:
+    """Fits each candidate order, skipping those that fail, and keeps only the best fitted result
+
+    Parameters
+    ----------
+    candidates : list
+        list of (candidate number, order) pairs
+    metric : str
+        The metric by which the best model is chosen
+
+    Returns
+    -------
+    tuple
+        (list of one dict per candidate for the search table, (candidate number, fitted result) of the best order)
+    """
+    rows = []
+    best = (None, None)
+    bestMetric = np.inf
+
+    for number, order in candidates:
+
+        row = {'candidate': number, 'p': order[0], 'd': order[1], 'q': order[2],
+                metric: np.nan, 'aic': np.nan, 'bic': np.nan, 'hqic': np.nan, 'fitTime': np.nan, 'error': None}
+        start = time.perf_counter()
+
+        try:
+            results = ARIMA(endog=endogenousSeries, exog=exogenousSeries, order=order, **kwargs).fit()
+            value = results.info_criteria(metric)
+
+        except Exception as error:
+            row['error'] = f"{type(error).__name__}: {error}"
+
+        else:
+            row.update(aic=results.aic, bic=results.bic, hqic=results.hqic)
+            row[metric] = value
+
+            if value < bestMetric:
+                bestMetric = value
+                best = (number, results)
+
+        row['fitTime'] = time.perf_counter() - start
+        rows.append(row)
+
+    return rows, best
+
+def _evaluate(endogenousSeries: Union[pd.Series, np.array], exogenousSeries: Union[pd.DataFrame, np.array],
+                candidates: list, metric: str, kwargs: dict, executor: ProcessPoolExecutor, nJobs: int) -> tuple:
+    """Fits a batch of candidate orders, in the worker pool if one is given
+
+    Returns
+    -------
+    tuple
+        (list of one dict per candidate for the search table, dict of the best fitted result of each chunk keyed by
+        candidate number)
+    """
+    if executor is not None and len(candidates) > 1:
+
+        # Interleave the orders so every worker gets a mix of cheap and expensive models
+        chunks = [candidates[i::nJobs] for i in range(nJobs) if candidates[i::nJobs]]
+        futures = [executor.submit(_fit_orders, endogenousSeries, exogenousSeries, chunk, metric, kwargs) for chunk in chunks]
+        outputs = [future.result() for future in futures]
+
+    else:
+        outputs = [_fit_orders(endogenousSeries, exogenousSeries, candidates, metric, kwargs)]
+
+    rows = [row for chunkRows, _ in outputs for row in chunkRows]
+    fitted = {number: results for _, (number, results) in outputs if results is not None}
+
+    return rows, fitted
+
+def _best_candidate(rows: list, fitted: dict, metric: str) -> int:
+    """Number of the fitted candidate with the lowest metric, ties go to the first candidate evaluated"""
+
+    values = {row['candidate']: row[metric] for row in rows if row['candidate'] in fitted}
+
+    return min(sorted(values), key=lambda number: values[number])
+
+def _differencing_order(endogenousSeries: Union[pd.Series, np.array], dRange: int) -> int:
+    """Number of differences needed for the ADF test to reject a unit root, capped at dRange"""
+
+    values = np.asarray(endogenousSeries, dtype='float64').ravel()
+    values = values[~np.isnan(values)]
+
+    for d in range(dRange):
+
+        if tests.stationary_test_adf(values, verbose=False)['Is stationary']:
+            return d
+
+        values = np.diff(values)
+
+    return dRange
+
+def _stepwise_neighbours(order: tuple, pRange: int, qRange: int) -> list:
+    """Orders one step away from the given order, changing p, q or both by one"""
+
+    p, d, q = order
+    steps = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)]
+
+    return [(p + dp, d, q + dq) for dp, dq in steps if 0 <= p + dp <= pRange and 0 <= q + dq <= qRange]
+
 # AUTO ARIMA
 def auto_arima(endogenousSeries: Union[pd.Series, np.array], exogenousSeries: Union[pd.DataFrame, np.array],
-                 pRange: int = 5, dRange: int = 1, qRange: int = 5, metric: str = 'BIC',  **kwargs):
+                 pRange: int = 5, dRange: int = 1, qRange: int = 5, metric: str = 'BIC', nJobs: int = 1,
+                 search: str = 'grid', **kwargs):
     """This function implements an auto-arima model by utilising a grid search over the parameter ranges for the
     autoregressive, differencing, moving average parameters for each model. Each model is then evaluated based on the
-    specifed metric and the model with the lowest metric statistic is chosen as the best model. The order params for
-    the best model are saved and another model is fitted with those params.
+    specifed metric and the model with the lowest metric statistic is chosen as the best model.
+    Orders that fail to fit are skipped and recorded in the search table. The candidate orders can be spread over
+    worker processes, each of which returns only its best fitted model.
+    The search state is local to each call, so the function is safe to call concurrently.
+
+    With search='stepwise' the Hyndman-Khandakar search is used instead: the differencing order is the number of
+    differences needed for the ADF test to find the series stationary, the orders (2, d, 2), (0, d, 0), (1, d, 0) and
+    (0, d, 1) are fitted, and the search then moves to the best neighbour of the current best order (p, q or both
+    changed by one) until no neighbour improves the metric. Every order is fitted at most once.
 
     Parameters
     ----------
@@ -32,39 +172,226 @@ def auto_arima(endogenousSeries: Union[pd.Series, np.array], exogenousSeries: Un
         The maximum value of the moving average component till where we want to search, by default 5
     metric : str, optional
         The metric by which we want to search and choose our model, by default 'BIC'
+    nJobs : int, optional
+        Number of worker processes, -1 to use every CPU, by default 1 (no process pool)
+    search : str, optional
+        'grid' to fit every order in the ranges or 'stepwise' for the Hyndman-Khandakar search, by default 'grid'
 
     Returns
     -------
-    Fitted ARIMA Result
-        Returns a fitted arima model with the best chosen order of components
+    AutoARIMAResult
+        Returns the fitted arima model with the best chosen order of components, the order, its metric value
+        and the table of every candidate's information criteria and fit time
 
     Raises
     ------
+    ValueError
+        If the search is neither 'grid' nor 'stepwise'
     RuntimeWarning
-        If the model fails to converge on any order, a RuntimeWarning is engaged
+        If the model fails to converge on every order, a RuntimeWarning is engaged
+    """
+
+    if search not in ('grid', 'stepwise'):
+        raise ValueError(f"search must be 'grid' or 'stepwise', got {search}")
+
+    if nJobs == -1:
+        nJobs = os.cpu_count()
+
+    executor = ProcessPoolExecutor(max_workers=nJobs) if nJobs > 1 else None
+    rows, fitted = [], {}
+
+    try:
+        if search == 'grid':
+            orders = [(p, d, q) for d in range(dRange+1) for p in range(pRange+1) for q in range(qRange+1)]
+            rows, fitted = _evaluate(endogenousSeries, exogenousSeries, list(enumerate(orders)), metric, kwargs,
+                                        executor, nJobs)
+
+        else:
+            d = _differencing_order(endogenousSeries, dRange)
+            seeds = [(min(2, pRange), d, min(2, qRange)), (0, d, 0), (min(1, pRange), d, 0), (0, d, min(1, qRange))]
+            orders = list(dict.fromkeys(seeds))
+            evaluated = set()
+            bestCandidate = None
+
+            while orders:
+
+                candidates = list(enumerate(orders, start=len(rows)))
+                evaluated.update(orders)
+                batchRows, batchFitted = _evaluate(endogenousSeries, exogenousSeries, candidates, metric, kwargs,
+                                                    executor, nJobs)
+                rows += batchRows
+                fitted.update(batchFitted)
+
+                if not fitted:
+                    break
+
+                # Stop as soon as a whole neighbourhood fails to improve on the current best order
+                newBest = _best_candidate(rows, fitted, metric)
+                if newBest == bestCandidate:
+                    break
+
+                bestCandidate = newBest
+                bestRow = next(row for row in rows if row['candidate'] == bestCandidate)
+                bestOrder = (bestRow['p'], bestRow['d'], bestRow['q'])
+                orders = [order for order in _stepwise_neighbours(bestOrder, pRange, qRange) if order not in evaluated]
+
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    searchTable = pd.DataFrame(rows).sort_values('candidate').set_index('candidate')
+
+    if not fitted:
+        raise RuntimeWarning(f"Model failed to converge on every order, last error: {searchTable['error'].iloc[-1]}")
+
+    bestCandidate = _best_candidate(rows, fitted, metric)
+    bestParams = tuple(int(x) for x in searchTable.loc[bestCandidate, ['p', 'd', 'q']])
+
+    return AutoARIMAResult(fitted[bestCandidate], bestParams, searchTable.loc[bestCandidate, metric], searchTable)
+
+def _set_panel_data(exogenousSeries: Union[pd.DataFrame, np.array], futureExogenousSeries: Union[pd.DataFrame, np.array]):
+    """Stores the shared covariates so they are sent to each worker once instead of with every series"""
+
+    global _panelExog, _panelFutureExog
+    _panelExog = exogenousSeries
+    _panelFutureExog = futureExogenousSeries
+
+def _fit_series_shared(name, endogenousSeries: pd.Series, horizon: int, kwargs: dict) -> dict:
+    """Runs _fit_series in a worker process with the covariates stored by _set_panel_data"""
+
+    return _fit_series(name, endogenousSeries, _panelExog, _panelFutureExog, horizon, kwargs)
+
+def _fit_series(name, endogenousSeries: pd.Series, exogenousSeries: Union[pd.DataFrame, np.array],
+                futureExogenousSeries: Union[pd.DataFrame, np.array], horizon: int, kwargs: dict) -> dict:
+    """Runs the order search on one series of the panel and summarises it as one row of the panel table"""
+
+    row = {'series': name, 'p': np.nan, 'd': np.nan, 'q': np.nan, 'aic': np.nan, 'bic': np.nan, 'hqic': np.nan,
+            'nFits': np.nan, 'error': None}
+    row.update({f'h{step}': np.nan for step in range(1, horizon + 1)})
+
+    if endogenousSeries.isna().all():
+        row['error'] = "ValueError: series has no observations"
+        return row
+
+    try:
+        fit = auto_arima(endogenousSeries, exogenousSeries, **kwargs)
+
+    except Exception as error:
+        row['error'] = f"{type(error).__name__}: {error}"
+        return row
+
+    row.update(p=fit.bestParams[0], d=fit.bestParams[1], q=fit.bestParams[2], aic=fit.results.aic,
+                bic=fit.results.bic, hqic=fit.results.hqic, nFits=len(fit.searchTable))
+
+    if horizon > 0:
+        forecast = np.asarray(fit.results.forecast(steps=horizon, exog=futureExogenousSeries))
+        row.update({f'h{step}': value for step, value in enumerate(forecast, start=1)})
+
+    return row
+
+def iter_auto_arima_panel(panel: pd.DataFrame, exogenousSeries: Union[pd.DataFrame, np.array] = None,
+                            futureExogenousSeries: Union[pd.DataFrame, np.array] = None, horizon: int = 1,
+                            nJobs: int = 1, maxPending: int = None, **kwargs):
+    """Runs auto_arima on every column of a panel and yields each series' result as soon as it finishes.
+    At most `maxPending` series are held by the worker pool at any time, so memory stays bounded however wide
+    the panel is. Series that fail are yielded with their error message instead of stopping the panel.
+
+    Parameters
+    ----------
+    panel : pd.DataFrame
+        T x N DataFrame with one endogenous series per column
+    exogenousSeries : Union[pd.DataFrame, np.array], optional
+        Exogenous variables shared by every series, aligned to the rows of the panel, by default None
+    futureExogenousSeries : Union[pd.DataFrame, np.array], optional
+        Values of the exogenous variables over the forecast horizon, required with exogenousSeries, by default None
+    horizon : int, optional
+        Number of steps ahead to forecast, 0 for no forecasts, by default 1
+    nJobs : int, optional
+        Number of worker processes, -1 to use every CPU, by default 1 (no process pool)
+    maxPending : int, optional
+        Maximum number of series submitted to the pool and not yet returned, by default 4 * nJobs
+    **kwargs
+        Passed to auto_arima, e.g pRange, dRange, qRange, metric or search
+
+    Yields
+    ------
+    dict
+        One row per series with its name, chosen (p, d, q), AIC, BIC, HQIC, number of fits, forecasts h1 ... hH
+        and error message (if it failed), in order of completion
     """
 
-    auto_arima.bestParams = None
-    auto_arima.bestMetric = np.inf
+    if exogenousSeries is not None and horizon > 0 and futureExogenousSeries is None:
+        raise ValueError("futureExogenousSeries is required to forecast a model with exogenous variables")
+
+    if nJobs == -1:
+        nJobs = os.cpu_count()
+
+    # Each series is searched serially, the panel is parallelised across series instead
+    kwargs['nJobs'] = 1
+
+    if nJobs <= 1:
+        for name in panel.columns:
+            yield _fit_series(name, panel[name], exogenousSeries, futureExogenousSeries, horizon, kwargs)
+
+        return
 
-    for d in range(dRange+1):
-        for p in range(pRange+1):
-            for q in range(qRange+1):
+    maxPending = maxPending or 4 * nJobs
+    columns = iter(panel.columns)
 
-                order = (p, d, q)
+    with ProcessPoolExecutor(max_workers=nJobs, initializer=_set_panel_data,
+                                initargs=(exogenousSeries, futureExogenousSeries)) as executor:
 
-                try:
-                    results = ARIMA(endog=endogenousSeries, exog=exogenousSeries, order=order, **kwargs).fit()
+        pending = set()
 
-                except:
-                    raise RuntimeWarning(f"Model failed to converge on order {order}")
+        for name in columns:
+            pending.add(executor.submit(_fit_series_shared, name, panel[name], horizon, kwargs))
 
-                if results.info_criteria(metric) < auto_arima.bestMetric:
-                    auto_arima.bestMetric = results.info_criteria(metric)
-                    auto_arima.bestParams = order
+            if len(pending) >= maxPending:
+                break
 
-                else: continue
+        while pending:
 
-    results = ARIMA(endog=endogenousSeries, exog=exogenousSeries, order=auto_arima.bestParams, **kwargs).fit()
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            # Top the pool back up before handing the finished series to the caller
+            for name in columns:
+                pending.add(executor.submit(_fit_series_shared, name, panel[name], horizon, kwargs))
+
+                if len(pending) >= maxPending:
+                    break
+
+            for future in done:
+                yield future.result()
+
+def auto_arima_panel(panel: pd.DataFrame, exogenousSeries: Union[pd.DataFrame, np.array] = None,
+                        futureExogenousSeries: Union[pd.DataFrame, np.array] = None, horizon: int = 1,
+                        nJobs: int = 1, maxPending: int = None, **kwargs) -> pd.DataFrame:
+    """Runs auto_arima on every column of a panel, see iter_auto_arima_panel
+
+    Parameters
+    ----------
+    panel : pd.DataFrame
+        T x N DataFrame with one endogenous series per column
+    exogenousSeries : Union[pd.DataFrame, np.array], optional
+        Exogenous variables shared by every series, aligned to the rows of the panel, by default None
+    futureExogenousSeries : Union[pd.DataFrame, np.array], optional
+        Values of the exogenous variables over the forecast horizon, required with exogenousSeries, by default None
+    horizon : int, optional
+        Number of steps ahead to forecast, 0 for no forecasts, by default 1
+    nJobs : int, optional
+        Number of worker processes, -1 to use every CPU, by default 1 (no process pool)
+    maxPending : int, optional
+        Maximum number of series submitted to the pool and not yet returned, by default 4 * nJobs
+    **kwargs
+        Passed to auto_arima, e.g pRange, dRange, qRange, metric or search
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per series, in the column order of the panel, with the chosen (p, d, q), AIC, BIC, HQIC,
+        number of fits, forecasts h1 ... hH and error message (if it failed)
+    """
+    rows = list(iter_auto_arima_panel(panel, exogenousSeries, futureExogenousSeries, horizon, nJobs, maxPending, **kwargs))
+    table = pd.DataFrame(rows).set_index('series')
 
-    return results
\ No newline at end of file
+    return table.reindex(panel.columns)
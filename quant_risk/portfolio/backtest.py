@@ -0,0 +1,291 @@
+""" This module implements a walk-forward backtest of portfolios optimised on trailing windows, chosen by a signal."""
+
+import time
+import collections
+import numpy as np
+import pandas as pd
+from typing import Callable, NamedTuple, Union
+from pypfopt import expected_returns
+from quant_risk.portfolio.portfolio import ParametricMeanVariance, _hrp_weights, _erc_weights
+from quant_risk.portfolio.covariance import WindowStatistics, FactorCovariance, factor_covariance
+from quant_risk.portfolio.performance import simulate_nav
+from quant_risk.utils import fetch_data
+
+__all__ = [
+    'BacktestResult',
+    'WalkForwardBacktest',
+    'optimise_window'
+]
+
+class BacktestResult(NamedTuple):
+    """Weights, methods, optimisation errors, net asset value and per-stage timings of a walk-forward backtest"""
+
+    weightsByTime: pd.DataFrame
+    methods: pd.Series
+    errors: pd.Series
+    portfolio: pd.DataFrame
+    timings: pd.Series
+
+def optimise_window(optimizer: ParametricMeanVariance, call: Union[str, tuple, Callable], expectedReturns: pd.Series,
+                    covarianceMatrix: Union[pd.DataFrame, FactorCovariance], riskFreeRate: float) -> tuple:
+    """Optimises one window with an optimizer call, falling back to the minimum volatility portfolio and then to
+    equal weights if the call fails
+
+    Parameters
+    ----------
+    optimizer : ParametricMeanVariance
+        Optimizer reused across windows, its tickers set the order of the weights
+    call : Union[str, tuple, Callable]
+        The name of a ParametricMeanVariance method in portfolio._MEAN_VARIANCE_METHODS, 'hierarchical_risk_parity'
+        or 'equal_risk_contribution', a (name, kwargs) pair such as ('efficient_risk', {'target_volatility': 0.15}),
+        or a function of (expectedReturns, covarianceMatrix, riskFreeRate) returning {ticker:weight}.
+        max_sharpe uses riskFreeRate unless one is given in kwargs
+    expectedReturns : pd.Series
+        Annualised expected returns of the window, indexed by ticker
+    covarianceMatrix : Union[pd.DataFrame, FactorCovariance]
+        Annualised covariance matrix of the window, or its factor model
+    riskFreeRate : float
+        Risk free rate of the window
+
+    Returns
+    -------
+    tuple
+        (weights in the format {ticker:weight}, name of the method that produced them,
+        the errors of the attempts that failed or None)
+    """
+    tickers = optimizer.tickers
+    riskBased = {'hierarchical_risk_parity': _hrp_weights, 'equal_risk_contribution': _erc_weights}
+    attempts = [call] if call == 'min_volatility' else [call, 'min_volatility']
+    errors = []
+
+    for attempt in attempts:
+
+        method, kwargs = (attempt, {}) if isinstance(attempt, str) or callable(attempt) else attempt
+        name = getattr(method, '__name__', 'custom') if callable(method) else method
+
+        try:
+            if callable(method):
+                weights = dict(method(expectedReturns, covarianceMatrix, riskFreeRate))
+
+            elif method in riskBased:
+                covariance = covarianceMatrix.to_dense() if isinstance(covarianceMatrix, FactorCovariance) else covarianceMatrix
+                weights = riskBased[method](covariance.reindex(index=tickers, columns=tickers).to_numpy(dtype='float64'), **kwargs)
+                weights = dict(zip(tickers, (float(weight) for weight in weights)))
+
+            else:
+                if method == 'max_sharpe':
+                    kwargs = {'risk_free_rate': riskFreeRate, **kwargs}
+
+                optimizer.set_inputs(expectedReturns, covarianceMatrix)
+                weights = dict(getattr(optimizer, method)(**kwargs))
+
+            return weights, name, '; '.join(errors) or None
+
+        except Exception as error:
+            errors.append(f"{name}: {type(error).__name__}: {error}")
+
+    return {ticker: 1 / len(tickers) for ticker in tickers}, 'equal_weights', '; '.join(errors)
+
+class WalkForwardBacktest:
+
+    def __init__(self, historicalPrices: pd.DataFrame, lookback: Union[pd.DateOffset, int] = pd.DateOffset(months=3),
+                    frequency: int = 252, bounds: Union[tuple,list] = (0,1), riskFreeRate: float = None, solver: str = None,
+                    solverOptions: dict = None, covarianceModel: str = 'ledoit_wolf', nFactors: int = 5, cacheSize: int = 0):
+        """Walk-forward backtest over a fixed price history. On every signal date a portfolio is optimised on the
+        window of prices that ends on that date, with the optimizer call mapped to the signal's value, and held until
+        the next signal date. Signals of any frequency and any set of values can be backtested, see run.
+        The windows are located once per run with searchsorted on the price index, and the expected returns and
+        covariance matrices are only computed for the windows a run needs. With a cacheSize, the statistics of the
+        most recently used windows are kept across runs, so signal variants that share dates reuse them.
+
+        Parameters
+        ----------
+        historicalPrices : pd.DataFrame
+            DataFrame of historical prices for each ticker, with column name as name of ticker and index as timestamps
+        lookback : Union[pd.DateOffset, int], optional
+            Length of the trailing window, as a date offset or a number of prices, by default pd.DateOffset(months=3)
+        frequency : int, optional
+            Frequency of the data passed, default is daily, i.e., 252 days
+        bounds : Union[tuple,list]
+            Minimum and maximum weight of each asset or a single pair if all weights are identical, (-1,1) if shorting is allowed, by default (0,1)
+        riskFreeRate : float, optional
+            Risk free rate, by default None (average of fetch_data.risk_free_rate over each window)
+        solver : str, optional
+            Name of solver, by default None. List of solvers: cp.installed_solvers()
+        solverOptions : dict, optional
+            Parameters for the given solver in the format {parameter:value}, by default None
+        covarianceModel : str, optional
+            'ledoit_wolf' for the Ledoit-Wolf shrunk covariance, updated incrementally between overlapping windows by a
+            covariance.WindowStatistics, or 'factor' for covariance.factor_covariance, by default 'ledoit_wolf'
+        nFactors : int, optional
+            Number of principal components of the factor model, by default 5
+        cacheSize : int, optional
+            Number of windows whose statistics are kept across runs, least recently used first out, by default 0
+            (none). Each dense window holds an N x N covariance matrix, see clear_cache
+        """
+        if covarianceModel not in ('ledoit_wolf', 'factor'):
+            raise ValueError(f"The Chosen covariance model '{covarianceModel}' is not valid, choose 'ledoit_wolf' or 'factor'.")
+
+        self.historicalPrices = historicalPrices
+        self.lookback = lookback
+        self.frequency = frequency
+        self.riskFreeRate = riskFreeRate
+        self.covarianceModel = covarianceModel
+        self.nFactors = nFactors
+        self.cacheSize = cacheSize
+
+        self.tickers = list(historicalPrices.columns)
+        self._optimizerArguments = (self.tickers, bounds, solver, solverOptions,
+                                    nFactors if covarianceModel == 'factor' else None)
+        self._optimizer = None
+        self._windowStatistics = None
+        self._statistics = collections.OrderedDict()
+        self._riskFreeRates = {}
+
+    def clear_cache(self):
+        """Drops the cached window statistics and risk free rates"""
+
+        self._statistics.clear()
+        self._riskFreeRates.clear()
+
+    def window_boundaries(self, signalDates: pd.DatetimeIndex) -> tuple:
+        """Locates the window of every signal date in the price history
+
+        Parameters
+        ----------
+        signalDates : pd.DatetimeIndex
+            Dates on which the portfolio is rebalanced
+
+        Returns
+        -------
+        tuple
+            (startRows, endRows) as np.ndarrays, the window of each date being historicalPrices.iloc[startRow:endRow]
+        """
+        index = self.historicalPrices.index
+        endRows = index.searchsorted(signalDates, side='right')
+
+        if isinstance(self.lookback, (int, np.integer)):
+            startRows = np.maximum(endRows - self.lookback, 0)
+
+        else:
+            startRows = index.searchsorted(signalDates - self.lookback, side='left')
+
+        return startRows, endRows
+
+    def _window_statistics(self, startRow: int, endRow: int) -> tuple:
+        """Expected returns, covariance matrix and risk free rate of a window, from the cache if it is kept there"""
+
+        key = (startRow, endRow)
+
+        if key in self._statistics:
+            self._statistics.move_to_end(key)
+            statistics = self._statistics[key]
+
+        else:
+
+            if self.covarianceModel == 'factor':
+                # No dense statistics are kept, so memory stays O(N k)
+                window = self.historicalPrices.iloc[startRow:endRow]
+                expectedReturns = expected_returns.mean_historical_return(window, frequency=self.frequency)
+                covarianceMatrix = factor_covariance(window, self.nFactors, frequency=self.frequency)
+
+            else:
+                expectedReturns, covarianceMatrix = self._get_window_statistics().get_window(startRow, endRow)
+
+            statistics = (expectedReturns, covarianceMatrix)
+
+            if self.cacheSize > 0:
+                self._statistics[key] = statistics
+
+                while len(self._statistics) > self.cacheSize:
+                    self._statistics.popitem(last=False)
+
+        if key not in self._riskFreeRates:
+
+            if self.riskFreeRate is None:
+                startDate, endDate = self.historicalPrices.index[[startRow, max(endRow - 1, startRow)]].astype('str')
+                self._riskFreeRates[key] = fetch_data.mean_risk_free_rate(startDate, endDate)
+
+            else:
+                self._riskFreeRates[key] = self.riskFreeRate
+
+        return statistics + (self._riskFreeRates[key],)
+
+    def _get_window_statistics(self) -> WindowStatistics:
+
+        if self._windowStatistics is None:
+            self._windowStatistics = WindowStatistics(self.historicalPrices, self.frequency)
+
+        return self._windowStatistics
+
+    def run(self, signals: pd.Series, signalMethods: dict, initialValue: float = 1.0, transactionCost: float = 0.0,
+            slippage: float = 0.0) -> BacktestResult:
+        """Backtests a signal. On each signal date the portfolio is optimised on its trailing window with the call
+        mapped to the signal's value, then the rebalanced portfolio is simulated with performance.simulate_nav.
+
+        Parameters
+        ----------
+        signals : pd.Series
+            Signal values with the index as timestamps, at any frequency. Missing values are skipped
+        signalMethods : dict
+            Optimizer call of each signal value in the format {signalValue:call}, see optimise_window. A call that
+            fails falls back to the minimum volatility portfolio and then to equal weights, with its error recorded
+        initialValue : float, optional
+            Portfolio value before the first rebalance, by default 1.0
+        transactionCost : float, optional
+            Proportional cost per unit of turnover, e.g 0.001 for 10 basis points, by default 0.0
+        slippage : float, optional
+            Proportional slippage per unit of turnover, by default 0.0
+
+        Returns
+        -------
+        BacktestResult
+            Weights, method and errors of every signal date, the simulated portfolio and the seconds spent in each stage
+        """
+        timings = dict.fromkeys(['boundaries', 'statistics', 'optimisation', 'simulation'], 0.0)
+
+        clock = time.perf_counter()
+        signals = signals.dropna().sort_index()
+
+        missing = set(signals.unique()) - set(signalMethods)
+        if missing:
+            raise ValueError(f"No optimizer call is mapped to the signal values {sorted(missing)}")
+
+        startRows, endRows = self.window_boundaries(signals.index)
+
+        # Fetch the risk free rate once for the whole span, every window then averages the cached series
+        if self.riskFreeRate is None and len(signals):
+            index = self.historicalPrices.index
+            fetch_data.risk_free_rate_series(index[startRows.min()].strftime('%Y-%m-%d'),
+                                                index[max(endRows.max() - 1, 0)].strftime('%Y-%m-%d'))
+
+        timings['boundaries'] = time.perf_counter() - clock
+
+        weightsByTime, methods, errors = [], [], []
+
+        # Built on first use, then compiled once and warm started across every run
+        if self._optimizer is None:
+            self._optimizer = ParametricMeanVariance(*self._optimizerArguments)
+
+        for signal, startRow, endRow in zip(signals, startRows, endRows):
+
+            clock = time.perf_counter()
+            expectedReturns, covarianceMatrix, riskFreeRate = self._window_statistics(startRow, endRow)
+            timings['statistics'] += time.perf_counter() - clock
+
+            clock = time.perf_counter()
+            weights, method, error = optimise_window(self._optimizer, signalMethods[signal], expectedReturns,
+                                                        covarianceMatrix, riskFreeRate)
+            timings['optimisation'] += time.perf_counter() - clock
+
+            weightsByTime.append(weights)
+            methods.append(method)
+            errors.append(error)
+
+        clock = time.perf_counter()
+        weightsByTime = pd.DataFrame(weightsByTime, index=signals.index, columns=self.tickers)
+        portfolio = simulate_nav(self.historicalPrices, weightsByTime, initialValue, transactionCost, slippage)
+        timings['simulation'] = time.perf_counter() - clock
+
+        return BacktestResult(weightsByTime, pd.Series(methods, index=signals.index, dtype='object'),
+                                pd.Series(errors, index=signals.index, dtype='object'), portfolio, pd.Series(timings))
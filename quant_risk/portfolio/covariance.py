@@ -0,0 +1,328 @@
+""" This module implements a cache of rolling window statistics for portfolio optimization over many overlapping windows."""
+
+import numpy as np
+import pandas as pd
+from typing import Union
+
+__all__ = [
+    'WindowStatistics',
+    'FactorCovariance',
+    'factor_covariance'
+]
+
+class WindowStatistics:
+
+    def __init__(self, historicalPrices: pd.DataFrame, frequency: int = 252, refreshEvery: int = None):
+        """Maintains the sums and cross products of the returns inside a window of the price history, so that the
+        mean historical return and the Ledoit-Wolf shrunk covariance of each window can be produced in O(N^2)
+        as the window slides, instead of being recomputed from the whole window in O(W N^2).
+        The results match expected_returns.mean_historical_return and risk_models.CovarianceShrinkage(...).ledoit_wolf()
+        on the same slice of prices. Windows are cheapest when requested in chronological order.
+
+        Parameters
+        ----------
+        historicalPrices : pd.DataFrame
+            DataFrame of historical prices for each ticker, with column name as name of ticker and index as timestamps
+        frequency : int, optional
+            Frequency of the data passed, default is daily, i.e., 252 days
+        refreshEvery : int, optional
+            Number of rows added or dropped after which the sums are recomputed exactly from the window, bounding the
+            rounding error of the running updates, by default None (the length of the current window)
+        """
+        self.historicalPrices = historicalPrices
+        self.frequency = frequency
+        self.refreshEvery = refreshEvery
+
+        returns = historicalPrices.pct_change(fill_method=None).to_numpy(dtype='float64')
+
+        # Rows where every return is missing are dropped, other missing returns count as zero, as in pypfopt
+        self.rowValid = (~np.isnan(returns).all(axis=1)).astype('float64')
+        self.columnValid = (~np.isnan(returns)).astype('float64')
+        self.logGrowth = np.where(np.isnan(returns), 0.0, np.log1p(returns))
+
+        # Shifting by the full sample mean leaves the covariances unchanged and avoids cancellation in the sums, and the
+        # dropped rows are zeroed again afterwards so that they add nothing to them
+        returns = np.nan_to_num(returns)
+        self.returns = returns - returns[self.rowValid == 1].mean(axis=0)
+        self.returns *= self.rowValid[:, None]
+        self.squares = self.returns ** 2
+
+        self.start, self.end = 0, 0
+        self.updatesSinceRefresh = 0
+        self._compute(0, 0)
+
+    def _row_sums(self, rows: slice) -> list:
+        """Sums over the given rows of every statistic kept for the window"""
+
+        X, X2 = self.returns[rows], self.squares[rows]
+
+        return [self.rowValid[rows].sum(), self.columnValid[rows].sum(axis=0), self.logGrowth[rows].sum(axis=0),
+                X.sum(axis=0), X2.sum(axis=0), X.T @ X, X2.T @ X, X2.T @ X2]
+
+    def _compute(self, start: int, end: int):
+        """Recomputes every sum exactly for the returns in rows start to end - 1"""
+
+        self.sums = self._row_sums(slice(start, end))
+        self.start, self.end = start, end
+        self.updatesSinceRefresh = 0
+
+    def _update(self, rows: slice, sign: float):
+
+        self.sums = [total + sign * part for total, part in zip(self.sums, self._row_sums(rows))]
+
+        self.updatesSinceRefresh += rows.stop - rows.start
+
+    def _move(self, start: int, end: int):
+        """Slides the window to the returns in rows start to end - 1, adding and dropping only the rows that changed"""
+
+        refreshEvery = self.refreshEvery or max(end - start, 1)
+        changes = abs(start - self.start) + abs(end - self.end)
+
+        # Recompute from scratch when the windows barely overlap or the running sums are due for a refresh
+        if start >= self.end or end <= self.start or changes >= end - start \
+                or self.updatesSinceRefresh + changes > refreshEvery:
+            self._compute(start, end)
+            return
+
+        if end > self.end:
+            self._update(slice(self.end, end), 1.0)
+        elif end < self.end:
+            self._update(slice(end, self.end), -1.0)
+
+        if start > self.start:
+            self._update(slice(self.start, start), -1.0)
+        elif start < self.start:
+            self._update(slice(start, self.start), 1.0)
+
+        self.start, self.end = start, end
+
+    def get_statistics(self, startDate, endDate) -> tuple:
+        """Returns the mean historical return and Ledoit-Wolf shrunk covariance of historicalPrices.loc[startDate:endDate]
+
+        Parameters
+        ----------
+        startDate : Any
+            first date of the window, as used in DataFrame.loc
+        endDate : Any
+            last date of the window, as used in DataFrame.loc
+
+        Returns
+        -------
+        tuple
+            (annualised expected returns as a pd.Series, annualised covariance matrix as a pd.DataFrame)
+        """
+        index = self.historicalPrices.index
+
+        return self.get_window(index.searchsorted(startDate, side='left'), index.searchsorted(endDate, side='right'))
+
+    def get_window(self, startRow: int, endRow: int) -> tuple:
+        """Returns the mean historical return and Ledoit-Wolf shrunk covariance of historicalPrices.iloc[startRow:endRow],
+        for callers that have already located the window, e.g with searchsorted
+
+        Parameters
+        ----------
+        startRow : int
+            position of the first price of the window
+        endRow : int
+            position one past the last price of the window
+
+        Returns
+        -------
+        tuple
+            (annualised expected returns as a pd.Series, annualised covariance matrix as a pd.DataFrame)
+        """
+        # The return on the first price of the window belongs to the previous window
+        first = startRow + 1
+        self._move(first, max(first, endRow))
+
+        n, counts, logGrowth, sumX, sumX2, crossX, crossX2X, crossX2 = self.sums
+        tickers = self.historicalPrices.columns
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expectedReturns = np.expm1(logGrowth * self.frequency / counts)
+
+        mean = sumX / n
+        empiricalCovariance = crossX / n - np.outer(mean, mean)
+
+        # Sum over the window of (x_i - mean_i)^2 (x_j - mean_j)^2, expanded in terms of the running sums
+        meanSquared = mean ** 2
+        fourthMoments = (crossX2 - 2 * crossX2X * mean[None, :] - 2 * crossX2X.T * mean[:, None]
+                         + np.outer(sumX2, meanSquared) + np.outer(meanSquared, sumX2)
+                         + 4 * np.outer(mean, mean) * crossX
+                         - 2 * np.outer(mean * sumX, meanSquared) - 2 * np.outer(meanSquared, mean * sumX)
+                         + n * np.outer(meanSquared, meanSquared))
+
+        covarianceMatrix = self._ledoit_wolf(empiricalCovariance, fourthMoments.sum(), n) * self.frequency
+
+        return (pd.Series(expectedReturns, index=tickers),
+                pd.DataFrame(covarianceMatrix, index=tickers, columns=tickers))
+
+    @staticmethod
+    def _ledoit_wolf(empiricalCovariance: np.ndarray, sumFourthMoments: float, n: float) -> np.ndarray:
+        """Ledoit-Wolf shrinkage towards a scaled identity from the window moments, as in sklearn.covariance.ledoit_wolf"""
+
+        nFeatures = empiricalCovariance.shape[0]
+        mu = np.trace(empiricalCovariance) / nFeatures
+
+        delta_ = (empiricalCovariance ** 2).sum()
+        beta_ = (sumFourthMoments / n - delta_) / (nFeatures * n)
+        delta = (delta_ - 2 * mu * np.trace(empiricalCovariance) + nFeatures * mu ** 2) / nFeatures
+
+        beta = min(beta_, delta)
+        shrinkage = 0 if beta == 0 else beta / delta
+
+        shrunkCovariance = (1 - shrinkage) * empiricalCovariance
+        shrunkCovariance.flat[::nFeatures + 1] += shrinkage * mu
+
+        return shrunkCovariance
+
+
+class FactorCovariance:
+
+    def __init__(self, loadings: pd.DataFrame, factorCovariance: pd.DataFrame, specificVariance: pd.Series):
+        """Low rank plus diagonal covariance matrix B F B' + D of a factor model, stored in O(N k) rather than O(N^2)
+
+        Parameters
+        ----------
+        loadings : pd.DataFrame
+            Exposures B of each ticker (rows) to each factor (columns)
+        factorCovariance : pd.DataFrame
+            Annualised covariance matrix F of the factors
+        specificVariance : pd.Series
+            Annualised specific (idiosyncratic) variance D of each ticker
+        """
+        self.loadings = loadings
+        self.factorCovariance = factorCovariance
+        self.specificVariance = specificVariance.reindex(loadings.index)
+
+    @property
+    def index(self) -> pd.Index:
+        """Tickers of the covariance matrix"""
+
+        return self.loadings.index
+
+    def reindex(self, tickers: list) -> 'FactorCovariance':
+        """Returns the model restricted to, and ordered by, the given tickers"""
+
+        return FactorCovariance(self.loadings.reindex(tickers), self.factorCovariance, self.specificVariance.reindex(tickers))
+
+    def covariance_factor(self) -> np.ndarray:
+        """Returns the N x k matrix G with G G' = B F B'
+
+        Returns
+        -------
+        np.ndarray
+            Loadings scaled by a square root of the factor covariance
+        """
+        factorCovariance = self.factorCovariance.to_numpy(dtype='float64')
+
+        try:
+            root = np.linalg.cholesky(factorCovariance)
+
+        except np.linalg.LinAlgError:
+            eigenvalues, eigenvectors = np.linalg.eigh((factorCovariance + factorCovariance.T) / 2)
+            root = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+        return self.loadings.to_numpy(dtype='float64') @ root
+
+    def portfolio_variance(self, weights: Union[np.ndarray, pd.Series]) -> float:
+        """Variance of a portfolio, w' B F B' w + w' D w, in O(N k)
+
+        Parameters
+        ----------
+        weights : Union[np.ndarray, pd.Series]
+            Weights of the tickers, in the order of the loadings
+
+        Returns
+        -------
+        float
+            Annualised variance of the portfolio
+        """
+        weights = np.asarray(weights, dtype='float64')
+        exposures = self.loadings.to_numpy(dtype='float64').T @ weights
+
+        return exposures @ self.factorCovariance.to_numpy(dtype='float64') @ exposures \
+            + weights ** 2 @ self.specificVariance.to_numpy(dtype='float64')
+
+    def to_dense(self) -> pd.DataFrame:
+        """Returns the full N x N covariance matrix
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame of covariance between tickers
+        """
+        factor = self.covariance_factor()
+        covarianceMatrix = factor @ factor.T
+        covarianceMatrix.flat[::len(factor) + 1] += self.specificVariance.to_numpy(dtype='float64')
+
+        return pd.DataFrame(covarianceMatrix, index=self.index, columns=self.index)
+
+
+def factor_covariance(historicalPrices: pd.DataFrame, nFactors: int = 5, factorReturns: pd.DataFrame = None,
+                        frequency: int = 252) -> FactorCovariance:
+    """Estimates a factor model of the covariance matrix of the returns of historicalPrices.
+    Without factorReturns the factors are the first nFactors principal components of the returns, found from a thin
+    SVD in O(T N min(T, N)) without forming the N x N sample covariance. With factorReturns, the loadings are the
+    coefficients of a regression of every ticker's returns on the factor returns (with an intercept).
+    In both cases the specific variance of a ticker is the variance of its returns left unexplained by the factors.
+
+    Parameters
+    ----------
+    historicalPrices : pd.DataFrame
+        DataFrame of historical prices for each ticker, with column name as name of ticker and index as timestamps
+    nFactors : int, optional
+        Number of principal components, ignored if factorReturns is given, by default 5
+    factorReturns : pd.DataFrame, optional
+        Returns of the factors over the same period and frequency, with column name as name of factor and index as
+        timestamps, by default None (principal components)
+    frequency : int, optional
+        Frequency of the data passed, default is daily, i.e., 252 days
+
+    Returns
+    -------
+    FactorCovariance
+        Annualised factor model of the covariance matrix
+    """
+    returns = historicalPrices.pct_change(fill_method=None)
+
+    # Rows where every return is missing are dropped, other missing returns count as zero, as in WindowStatistics
+    returns = returns[returns.notna().any(axis=1)].fillna(0.0)
+    tickers = historicalPrices.columns
+
+    if factorReturns is None:
+        X = returns.to_numpy(dtype='float64')
+        X = X - X.mean(axis=0)
+        nObservations = len(X)
+        nFactors = min(nFactors, *X.shape)
+
+        _, singularValues, components = np.linalg.svd(X, full_matrices=False)
+
+        loadings = components[:nFactors].T
+        factorVariance = singularValues[:nFactors] ** 2 / (nObservations - 1)
+        totalVariance = (X ** 2).sum(axis=0) / (nObservations - 1)
+
+        # What the leading components leave of each ticker's variance, kept positive
+        specificVariance = np.clip(totalVariance - (loadings ** 2) @ factorVariance, np.finfo(float).eps, None)
+
+        factors = [f'PC{i + 1}' for i in range(nFactors)]
+        factorCovariance = pd.DataFrame(np.diag(factorVariance), index=factors, columns=factors)
+
+    else:
+        factorReturns = factorReturns.reindex(returns.index)
+        valid = factorReturns.notna().all(axis=1).to_numpy()
+        F = factorReturns.to_numpy(dtype='float64')[valid]
+        Y = returns.to_numpy(dtype='float64')[valid]
+
+        design = np.column_stack((np.ones(len(F)), F))
+        coefficients = np.linalg.lstsq(design, Y, rcond=None)[0]
+        residuals = Y - design @ coefficients
+
+        loadings = coefficients[1:].T
+        specificVariance = (residuals ** 2).sum(axis=0) / (len(F) - design.shape[1])
+        factors = factorReturns.columns
+        factorCovariance = pd.DataFrame(np.cov(F, rowvar=False, ddof=1).reshape(len(factors), len(factors)),
+                                        index=factors, columns=factors)
+
+    return FactorCovariance(pd.DataFrame(loadings, index=tickers, columns=factorCovariance.columns),
+                            factorCovariance * frequency, pd.Series(specificVariance * frequency, index=tickers))
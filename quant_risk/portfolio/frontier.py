@@ -0,0 +1,214 @@
+""" This module implements the efficient frontier from the turning points of the critical line algorithm."""
+
+import numpy as np
+import pandas as pd
+from typing import Union
+from pypfopt.cla import CLA
+
+__all__ = [
+    'CriticalLineFrontier',
+    'sample_portfolios'
+]
+
+def sample_portfolios(expectedReturns: Union[pd.Series, np.ndarray], covarianceMatrix: Union[pd.DataFrame, np.ndarray],
+                        nSamples: int = 10000, seed: int = None, chunkSize: int = 10000) -> tuple:
+    """Draws long only portfolios uniformly from the simplex and returns their expected returns and volatilities.
+    The weights are drawn and contracted with the covariance matrix one chunk at a time, so only chunkSize weight
+    vectors are held in memory however many portfolios are sampled.
+
+    Parameters
+    ----------
+    expectedReturns : Union[pd.Series, np.ndarray]
+        Annualised expected returns of the assets
+    covarianceMatrix : Union[pd.DataFrame, np.ndarray]
+        Annualised covariance matrix between the assets
+    nSamples : int, optional
+        Number of random portfolios, by default 10000
+    seed : int, optional
+        Seed of the random number generator, by default None
+    chunkSize : int, optional
+        Number of portfolios drawn at a time, by default 10000
+
+    Returns
+    -------
+    tuple
+        (expected returns, volatilities) of the random portfolios as np.ndarrays
+    """
+    expectedReturns = np.asarray(expectedReturns, dtype='float64')
+    covarianceMatrix = np.asarray(covarianceMatrix, dtype='float64')
+    generator = np.random.default_rng(seed)
+
+    sampleReturns = np.empty(nSamples)
+    sampleStd = np.empty(nSamples)
+
+    for start in range(0, nSamples, chunkSize):
+        stop = min(start + chunkSize, nSamples)
+        weights = generator.dirichlet(np.ones(len(expectedReturns)), stop - start)
+
+        sampleReturns[start:stop] = weights @ expectedReturns
+        # Row wise w_i' S w_i without forming the full W S W' matrix
+        sampleStd[start:stop] = np.sqrt(np.einsum('ij,ij->i', weights @ covarianceMatrix, weights))
+
+    return sampleReturns, sampleStd
+
+class CriticalLineFrontier:
+
+    def __init__(self, expectedReturns: pd.Series, covarianceMatrix: pd.DataFrame, bounds: Union[tuple,list] = (0,1)):
+        """Computes the whole efficient frontier in one pass with the critical line algorithm.
+        The frontier is piecewise linear in the weights between consecutive turning points, so any point on it,
+        and the maximum sharpe ratio portfolio of each segment, follows in closed form without solving another problem.
+
+        Parameters
+        ----------
+        expectedReturns : pd.Series
+            Annualised expected returns, indexed by ticker
+        covarianceMatrix : pd.DataFrame
+            Annualised covariance matrix between tickers
+        bounds : Union[tuple,list]
+            Minimum and maximum weight of each asset or a single pair if all weights are identical, (-1,1) if shorting is allowed, by default (0,1)
+        """
+        self.tickers = list(expectedReturns.index) if isinstance(expectedReturns, pd.Series) else list(range(len(expectedReturns)))
+        self.expectedReturns = np.asarray(expectedReturns, dtype='float64')
+        self.covarianceMatrix = np.asarray(covarianceMatrix, dtype='float64')
+
+        # CLA updates the bounds in place, so integer bounds must be cast to floats
+        if len(bounds) == len(self.tickers) and not np.isscalar(bounds[0]):
+            bounds = [(float(lower), float(upper)) for lower, upper in bounds]
+
+        cla = CLA(self.expectedReturns, self.covarianceMatrix, weight_bounds=bounds)
+        # Solves for every turning point
+        cla.min_volatility()
+
+        # Turning points run from the highest return down to the minimum volatility portfolio
+        self.turningWeights = np.hstack(cla.w).T
+        self.turningReturns = self.turningWeights @ self.expectedReturns
+        self.turningVolatilities = np.sqrt(np.einsum('ij,jk,ik->i', self.turningWeights, self.covarianceMatrix,
+                                                        self.turningWeights))
+
+    def _segment_moments(self, segment: int) -> tuple:
+        """Return and variance along a segment w(a) = w_i + a (w_i+1 - w_i), 0 <= a <= 1, as polynomials in a
+
+        Returns
+        -------
+        tuple
+            (return at a = 0, slope of the return, (A, B, C) with variance = A a^2 + B a + C)
+        """
+        start = self.turningWeights[segment]
+        direction = self.turningWeights[segment + 1] - start
+        covarianceDirection = self.covarianceMatrix @ direction
+
+        return (self.turningReturns[segment], direction @ self.expectedReturns,
+                (direction @ covarianceDirection, 2 * start @ covarianceDirection, self.turningVolatilities[segment] ** 2))
+
+    def interpolate(self, values: Union[np.ndarray, list], parameter: str = 'return') -> tuple:
+        """Returns the frontier portfolios with the given returns or volatilities
+
+        Parameters
+        ----------
+        values : Union[np.ndarray, list]
+            Target annualised returns or volatilities
+        parameter : str, optional
+            'return' or 'risk', by default 'return'
+
+        Returns
+        -------
+        tuple
+            (returns, volatilities, weights) of the frontier portfolios, NaN for targets outside the frontier
+        """
+        if parameter not in ('return', 'risk'):
+            raise ValueError(f"parameter must be 'return' or 'risk', got {parameter}")
+
+        values = np.atleast_1d(np.asarray(values, dtype='float64'))
+        weights = np.full((len(values), len(self.tickers)), np.nan)
+
+        # A single turning point is the whole frontier
+        if len(self.turningWeights) == 1:
+            turning = self.turningReturns if parameter == 'return' else self.turningVolatilities
+            weights[np.isclose(values, turning[0])] = self.turningWeights[0]
+
+        for segment in range(len(self.turningWeights) - 1):
+
+            returnStart, returnSlope, (A, B, C) = self._segment_moments(segment)
+
+            if parameter == 'return':
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    a = (values - returnStart) / returnSlope
+
+            else:
+                # Smallest root of A a^2 + B a + C = volatility^2 on the segment
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    discriminant = np.sqrt(B ** 2 - 4 * A * (C - values ** 2))
+                    a = (-B - discriminant) / (2 * A) if A > 0 else (values ** 2 - C) / B
+                    a = np.where((a < -1e-12) | (a > 1 + 1e-12), (-B + discriminant) / (2 * A), a) if A > 0 else a
+
+            inside = np.isnan(weights[:, 0]) & (a >= -1e-12) & (a <= 1 + 1e-12)
+            a = np.clip(a[inside], 0, 1)[:, None]
+            weights[inside] = self.turningWeights[segment] + a * (self.turningWeights[segment + 1] - self.turningWeights[segment])
+
+        returns = weights @ self.expectedReturns
+        volatilities = np.sqrt(np.einsum('ij,jk,ik->i', weights, self.covarianceMatrix, weights))
+
+        return returns, volatilities, weights
+
+    def frontier(self, points: int = 100) -> tuple:
+        """Returns points evenly spaced in return along the whole efficient frontier
+
+        Parameters
+        ----------
+        points : int, optional
+            The number of points, by default 100
+
+        Returns
+        -------
+        tuple
+            (returns, volatilities, weights) of the frontier portfolios, from the minimum volatility portfolio up
+        """
+        targets = np.linspace(self.turningReturns.min(), self.turningReturns.max(), points)
+
+        return self.interpolate(targets, 'return')
+
+    def max_sharpe(self, riskFreeRate: float = 0.0) -> tuple:
+        """Finds the maximum sharpe ratio portfolio, the best of the closed form optimum of each segment
+
+        Parameters
+        ----------
+        riskFreeRate : float, optional
+            Risk free rate, by default 0.0
+
+        Returns
+        -------
+        tuple
+            (weights as a pd.Series, expected return, volatility, sharpe ratio)
+        """
+        best = (-np.inf, None)
+
+        for segment in range(max(len(self.turningWeights) - 1, 1)):
+
+            if len(self.turningWeights) == 1:
+                candidates, weights = [0.0], lambda a: self.turningWeights[0]
+
+            else:
+                returnStart, returnSlope, (A, B, C) = self._segment_moments(segment)
+                p, q = returnStart - riskFreeRate, returnSlope
+
+                # Stationary point of (p + q a) / sqrt(A a^2 + B a + C)
+                candidates = [0.0, 1.0]
+                denominator = q * B / 2 - p * A
+                if denominator != 0:
+                    candidates.append(min(max((p * B / 2 - q * C) / denominator, 0.0), 1.0))
+
+                start, end = self.turningWeights[segment], self.turningWeights[segment + 1]
+                weights = lambda a, start=start, end=end: start + a * (end - start)
+
+            for a in candidates:
+                w = weights(a)
+                volatility = np.sqrt(w @ self.covarianceMatrix @ w)
+                sharpe = (w @ self.expectedReturns - riskFreeRate) / volatility
+
+                if sharpe > best[0]:
+                    best = (sharpe, w)
+
+        sharpe, w = best
+        expectedReturn = w @ self.expectedReturns
+
+        return pd.Series(w, index=self.tickers), expectedReturn, np.sqrt(w @ self.covarianceMatrix @ w), sharpe
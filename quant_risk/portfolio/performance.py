@@ -0,0 +1,80 @@
+""" This module implements the simulation of a rebalanced portfolio's net asset value from prices and target weights."""
+
+import numpy as np
+import pandas as pd
+
+__all__ = [
+    'simulate_nav'
+]
+
+def simulate_nav(historicalPrices: pd.DataFrame, weightsByTime: pd.DataFrame, initialValue: float = 1.0,
+                    transactionCost: float = 0.0, slippage: float = 0.0) -> pd.DataFrame:
+    """Simulates the net asset value of a portfolio rebalanced to target weights on given dates.
+    Between rebalances the holdings drift with the asset returns, and on each rebalance date the portfolio trades from
+    its drifted weights to the new targets at the close, paying transactionCost + slippage on every unit of turnover.
+    Weights summing to less than one leave the rest in cash, which earns nothing. Missing prices are carried forward.
+    The prices are read, never modified.
+
+    Parameters
+    ----------
+    historicalPrices : pd.DataFrame
+        DataFrame of historical prices for each ticker, with column name as name of ticker and index as timestamps
+    weightsByTime : pd.DataFrame
+        Target weights for each ticker, indexed by rebalance date. A rebalance on a date without prices
+        is traded on the next date with prices
+    initialValue : float, optional
+        Net asset value before the first rebalance, by default 1.0
+    transactionCost : float, optional
+        Proportional cost per unit of turnover, e.g 0.001 for 10 basis points, by default 0.0
+    slippage : float, optional
+        Proportional slippage per unit of turnover, by default 0.0
+
+    Returns
+    -------
+    pd.DataFrame
+        Net asset value ('Portfolio Value'), turnover (sum of absolute weight changes, including the initial purchase)
+        and costs paid, indexed by the dates of historicalPrices from the first rebalance onwards
+    """
+    weightsByTime = weightsByTime.sort_index().reindex(columns=historicalPrices.columns).fillna(0.0)
+    prices = historicalPrices.ffill().to_numpy(dtype='float64')
+    dates = historicalPrices.index
+
+    # Rows of the price history on which each rebalance is traded, a later rebalance on the same row replaces earlier ones
+    rows = dates.searchsorted(weightsByTime.index, side='left')
+    keep = (rows < len(dates)) & np.append(rows[1:] != rows[:-1], True)
+    rows, targets = rows[keep], weightsByTime.to_numpy(dtype='float64')[keep]
+
+    start = rows[0] if len(rows) else len(dates)
+    nav = np.full(len(dates) - start, np.nan)
+    turnover = np.zeros(len(dates) - start)
+    costs = np.zeros(len(dates) - start)
+
+    value = initialValue
+    holdings = np.zeros(prices.shape[1])
+    boundaries = np.append(rows, len(dates))
+
+    for period, (begin, end) in enumerate(zip(boundaries[:-1], boundaries[1:])):
+
+        # Drifted weights just before trading, then trade to the targets at the close of the rebalance date
+        traded = np.abs(targets[period] - holdings).sum()
+        cost = value * traded * (transactionCost + slippage)
+        value -= cost
+
+        turnover[begin - start] = traded
+        costs[begin - start] = cost
+
+        # Growth of each asset since the rebalance, up to and including the close of the next rebalance date
+        # (before it trades), assets without a price yet are held at zero weight
+        last = min(end + 1, len(dates))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = np.nan_to_num(prices[begin:last] / prices[begin], nan=1.0, posinf=1.0)
+
+        weights = np.where(np.isnan(prices[begin]), 0.0, targets[period])
+        assetValues = weights * growth
+        periodValue = (1 - weights.sum()) + assetValues.sum(axis=1)
+        nav[begin - start:end - start] = value * periodValue[:end - begin]
+
+        value = value * periodValue[-1]
+        holdings = assetValues[-1] / periodValue[-1]
+
+    return pd.DataFrame({'Portfolio Value': nav, 'Turnover': turnover, 'Costs': costs}, index=dates[start:])
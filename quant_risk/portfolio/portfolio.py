@@ -1,20 +1,116 @@
 """ This module implements classes for various portfolio optimization methods."""
 
+import collections
 import numpy as np
 import pandas as pd
+import cvxpy as cp
 from typing import OrderedDict, Union
 import pypfopt
+import scipy.linalg
+import scipy.cluster.hierarchy as sch
+import scipy.spatial.distance as ssd
 from pypfopt import expected_returns, risk_models
+from pypfopt.base_optimizer import portfolio_performance
+from pypfopt.exceptions import OptimizationError
 from quant_risk.utils import fetch_data
+from quant_risk.portfolio.covariance import FactorCovariance, factor_covariance
 
 __all__ = [
-    'MeanVariance'
+    'MeanVariance',
+    'ParametricMeanVariance',
+    'HierarchicalRiskParity',
+    'EqualRiskContribution'
 ]
 
-class MeanVariance:
+class _Portfolio:
+
+    def __init__(self, historicalPrices: pd.DataFrame, frequency: int = 252, riskFreeRate: float = None,
+                    expectedReturns: pd.Series = None, covarianceMatrix: Union[pd.DataFrame, FactorCovariance] = None,
+                    covarianceModel: str = 'ledoit_wolf', nFactors: int = 5, factorReturns: pd.DataFrame = None):
+        """Estimates the inputs shared by every portfolio optimizer and fetches the risk free rate,
+        see MeanVariance for the parameters"""
+
+        if expectedReturns is None:
+            expectedReturns = expected_returns.mean_historical_return(historicalPrices,frequency=frequency)
+
+        if covarianceMatrix is None:
+
+            if covarianceModel == 'ledoit_wolf':
+                covarianceMatrix = risk_models.CovarianceShrinkage(historicalPrices, frequency=frequency).ledoit_wolf()
+
+            elif covarianceModel == 'factor':
+                covarianceMatrix = factor_covariance(historicalPrices, nFactors, factorReturns, frequency)
+
+            else:
+                raise ValueError(f"The Chosen covariance model '{covarianceModel}' is not valid, choose 'ledoit_wolf' or 'factor'.")
+
+        self.historicalPrices = historicalPrices
+        self.expectedReturns = expectedReturns
+        self.covarianceMatrix = covarianceMatrix
+
+        if riskFreeRate is None:
+
+            # Averaged from a cached series, so portfolios over windows of an already fetched span cost no request
+            startDate = historicalPrices.index.astype('str')[0]
+            endDate = historicalPrices.index.astype('str')[-1]
+            self.riskFreeRate = fetch_data.mean_risk_free_rate(startDate, endDate)
+
+        else:
+
+            self.riskFreeRate = riskFreeRate
+
+        self.weights = None
+
+    def getRiskFreeRate(self) -> float:
+        """Returns the risk free rate
+
+        Returns
+        -------
+        float
+            Risk free rate
+        """
+        return round(self.riskFreeRate,2)
+
+    def getHistoricalPrices(self) -> pd.DataFrame:
+        """Returns the historical prices
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame of historical prices for each ticker, with column name as name of ticker and index as timestamps
+        """
+        return self.historicalPrices
+
+    def getExpectedReturns(self) -> pd.DataFrame:
+        """Returns the expected returns
+
+        Returns
+        -------
+        pd.DataFrame
+            DataFrame of expected returns, with index as ticker names
+        """
+        return self.expectedReturns
+
+    def getCovarianceMatrix(self) -> Union[pd.DataFrame, FactorCovariance]:
+        """Returns the covariance matrix
+
+        Returns
+        -------
+        Union[pd.DataFrame, FactorCovariance]
+            DataFrame of covariance between tickers, or their factor model
+        """
+        return self.covarianceMatrix
+
+
+# Optimisation methods of pypfopt.EfficientFrontier, all of which ParametricMeanVariance also implements
+_MEAN_VARIANCE_METHODS = ('max_sharpe', 'min_volatility', 'max_quadratic_utility', 'efficient_risk', 'efficient_return')
+
+class MeanVariance(_Portfolio):
 
     def __init__(self, historicalPrices: pd.DataFrame, frequency: int=252, bounds: Union[tuple,list] = (0,1), riskFreeRate: float = None,
-    solver: str = None, solverOptions: dict = None, verbose: bool = False):
+    solver: str = None, solverOptions: dict = None, verbose: bool = False, expectedReturns: pd.Series = None,
+    covarianceMatrix: Union[pd.DataFrame, FactorCovariance] = None, covarianceModel: str = 'ledoit_wolf',
+    nFactors: int = 5, factorReturns: pd.DataFrame = None):
         """Constructor to instantiate the class based on the input parameters.
 
         Parameters
@@ -28,33 +124,43 @@ class MeanVariance:
         bounds : Union[tuple,list]
             Minimum and maximum weight of each asset or a single pair if all weights are identical, (-1,1) if shorting is allowed, by default (0,1)
         riskFreeRate : float, optional
-            Risk free rate, by default None
+            Risk free rate, by default None (average of fetch_data.risk_free_rate over the dates of historicalPrices)
         solver : str, optional
             Name of solver, by default None. List of solvers: cp.installed_solvers()
         solverOptions : dict, optional
             Parameters for the given solver in the format {parameter:value}, by default None
         verbose : bool, optional
             Whether performance and debugging information should be printed, by default False
+        expectedReturns : pd.Series, optional
+            Precomputed annualised expected returns of the tickers, e.g from covariance.WindowStatistics,
+            by default None (mean historical return of historicalPrices)
+        covarianceMatrix : Union[pd.DataFrame, FactorCovariance], optional
+            Precomputed annualised covariance matrix of the tickers, e.g from covariance.WindowStatistics,
+            or a covariance.FactorCovariance, by default None (estimated with covarianceModel)
+        covarianceModel : str, optional
+            'ledoit_wolf' for the Ledoit-Wolf shrunk covariance of historicalPrices, or 'factor' for a factor model
+            B F B' + D from covariance.factor_covariance, by default 'ledoit_wolf'.
+            A factor model is optimised directly in factor form by a ParametricMeanVariance, so memory and solve time
+            grow with N k rather than N^2. fit then supports the methods in _MEAN_VARIANCE_METHODS without
+            market_neutral, and verbose prints the solver output
+        nFactors : int, optional
+            Number of principal components of the factor model, by default 5
+        factorReturns : pd.DataFrame, optional
+            Returns of given factors for the factor model instead of principal components, by default None
         """
-        expectedReturns = expected_returns.mean_historical_return(historicalPrices,frequency=frequency)
-        covarianceMatrix = risk_models.CovarianceShrinkage(historicalPrices).ledoit_wolf()
-        self.historicalPrices = historicalPrices
-        self.expectedReturns=expectedReturns
-        self.covarianceMatrix = covarianceMatrix
-        self.portfolio = pypfopt.EfficientFrontier(expectedReturns, covarianceMatrix, bounds, solver, verbose, solverOptions)
+        super().__init__(historicalPrices, frequency, riskFreeRate, expectedReturns, covarianceMatrix, covarianceModel,
+                            nFactors, factorReturns)
+        expectedReturns, covarianceMatrix = self.expectedReturns, self.covarianceMatrix
 
-        if riskFreeRate is None:
+        if isinstance(covarianceMatrix, FactorCovariance):
 
-            # TODO: implement risk-free rate for same time period as returns; implement dynamic rf-rate rather than static
-            startDate = historicalPrices.index.astype('str')[0]
-            endDate = historicalPrices.index.astype('str')[-1]
-            self.riskFreeRate = fetch_data.risk_free_rate(startDate=startDate, endDate=endDate).mean().values[0]
+            self.portfolio = ParametricMeanVariance(expectedReturns.index, bounds, solver, solverOptions,
+                                                    nFactors=covarianceMatrix.loadings.shape[1], verbose=verbose)
+            self.portfolio.set_inputs(expectedReturns, covarianceMatrix)
 
         else:
 
-            self.riskFreeRate = riskFreeRate
-
-        self.weights = None
+            self.portfolio = pypfopt.EfficientFrontier(expectedReturns, covarianceMatrix, bounds, solver, verbose, solverOptions)
 
     def fit(self, method: str = 'max_sharpe', **kwargs) -> dict:
         """Optimize the portfolio by maxizing the Sharpe Ratio, and return the tickers and their respective weights.
@@ -62,8 +168,8 @@ class MeanVariance:
         Parameters
         ----------
         method : str, optional
-            Different methods by which one can maximise the portfolio.
-            Please have a look at the following link for the available methods that are available for optimisation : https://pyportfolioopt.readthedocs.io/en/latest/MeanVariance.html
+            Different methods by which one can maximise the portfolio, one of _MEAN_VARIANCE_METHODS.
+            Please have a look at the following link for the methods and their arguments : https://pyportfolioopt.readthedocs.io/en/latest/MeanVariance.html
 
             #TODO: We can always add more objectives to the solver so that we can get a better estimate of our weights.
             #  We can take some lower or upper bounds from the investment team as an input and use that as a contraint in our optimization
@@ -74,10 +180,10 @@ class MeanVariance:
         dict
             Returns a dictionary with format {ticker:weight}
         """
-        if method not in dir(self.portfolio):
-            raise ValueError(f"The Chosen method '{method}'' is not a valid optimisation method. Please have a look at the documentation and try again.")
+        if method not in _MEAN_VARIANCE_METHODS:
+            raise ValueError(f"The Chosen method '{method}' is not a valid optimisation method, choose one of {_MEAN_VARIANCE_METHODS}.")
 
-        self.weights = eval(f"dict(self.portfolio.{method}(**kwargs))")
+        self.weights = dict(getattr(self.portfolio, method)(**kwargs))
 
         return self.weights
 
@@ -99,44 +205,547 @@ class MeanVariance:
 
         return stat
 
-    def getRiskFreeRate(self) -> float:
-        """Returns the risk free rate
+class ParametricMeanVariance:
+
+    def __init__(self, tickers: list, bounds: Union[tuple,list] = (0,1), solver: str = None, solverOptions: dict = None,
+                    nFactors: int = None, verbose: bool = False):
+        """Reusable mean-variance optimizer for many rebalances over the same tickers. The problems of the methods
+        in _MEAN_VARIANCE_METHODS are compiled once with cvxpy Parameters for the expected returns and a factor of
+        the covariance matrix, so each rebalance only updates the parameter values and re-solves, warm started from
+        the previous weights. The problems are those of pypfopt.EfficientFrontier, without market neutral weights.
+
+        Parameters
+        ----------
+        tickers : list
+            List of tickers of the assets in the portfolio
+        bounds : Union[tuple,list]
+            Minimum and maximum weight of each asset or a single pair if all weights are identical, (-1,1) if shorting is allowed, by default (0,1)
+        solver : str, optional
+            Name of solver, by default None. List of solvers: cp.installed_solvers()
+        solverOptions : dict, optional
+            Parameters for the given solver in the format {parameter:value}, by default None
+        nFactors : int, optional
+            Number of factors of a covariance.FactorCovariance given to set_inputs. The problems are then compiled in
+            factor form, with the variance ||G' w||^2 + ||D^1/2 w||^2 for G G' = B F B', so their size grows with N k
+            rather than N^2, by default None (dense covariance matrices)
+        verbose : bool, optional
+            Whether the solver output should be printed, by default False
+        """
+        self.tickers = list(tickers)
+        self.nFactors = nFactors
+        self.solver = solver
+        self.solverOptions = solverOptions or {}
+        self.verbose = verbose
+
+        n = len(self.tickers)
+        bounds = np.array(bounds, dtype=object).reshape(-1, 2)
+        bounds = np.broadcast_to(bounds, (n, 2))
+        self.lowerBounds = np.array([-1.0 if lower is None else lower for lower in bounds[:, 0]], dtype='float64')
+        self.upperBounds = np.array([1.0 if upper is None else upper for upper in bounds[:, 1]], dtype='float64')
+
+        self._expectedReturns = cp.Parameter(n)
+        self._excessReturns = cp.Parameter(n)
+        self._covarianceFactor = cp.Parameter((n, n if nFactors is None else nFactors))
+        self._specificVolatility = None if nFactors is None else cp.Parameter(n, nonneg=True)
+        self._targetVolatility = cp.Parameter(nonneg=True)
+        self._targetReturn = cp.Parameter()
+        # Expected returns divided by the risk aversion, which keeps the quadratic utility problem DPP
+        self._scaledReturns = cp.Parameter(n)
+        self._problems = {}
+
+        self.expectedReturns = None
+        self.covarianceMatrix = None
+        self.weights = None
+
+    def set_inputs(self, expectedReturns: pd.Series, covarianceMatrix: Union[pd.DataFrame, FactorCovariance]):
+        """Sets the expected returns and covariance matrix of the next rebalance
+
+        Parameters
+        ----------
+        expectedReturns : pd.Series
+            Annualised expected returns, indexed by ticker
+        covarianceMatrix : Union[pd.DataFrame, FactorCovariance]
+            Annualised covariance matrix between tickers, or its factor model
+        """
+        self.expectedReturns = pd.Series(expectedReturns).reindex(self.tickers)
+        self._expectedReturns.value = self.expectedReturns.to_numpy(dtype='float64')
+
+        if self.nFactors is not None:
+
+            if not isinstance(covarianceMatrix, FactorCovariance) or covarianceMatrix.loadings.shape[1] != self.nFactors:
+                raise ValueError(f"The optimizer was compiled for a FactorCovariance with {self.nFactors} factors")
+
+            self.covarianceMatrix = covarianceMatrix.reindex(self.tickers)
+            self._covarianceFactor.value = self.covarianceMatrix.covariance_factor()
+            self._specificVolatility.value = np.sqrt(self.covarianceMatrix.specificVariance.to_numpy(dtype='float64'))
+            return
+
+        if isinstance(covarianceMatrix, FactorCovariance):
+            covarianceMatrix = covarianceMatrix.to_dense()
+
+        self.covarianceMatrix = pd.DataFrame(covarianceMatrix).reindex(index=self.tickers, columns=self.tickers)
+        covariance = self.covarianceMatrix.to_numpy(dtype='float64')
+
+        # Any factor with covariance = L L' gives the same variance, fall back to the eigenvalues if it is singular
+        try:
+            factor = np.linalg.cholesky(covariance)
+
+        except np.linalg.LinAlgError:
+            eigenvalues, eigenvectors = np.linalg.eigh((covariance + covariance.T) / 2)
+            factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+        self._covarianceFactor.value = factor
+
+    def _risk_vector(self, w: cp.Variable) -> cp.Expression:
+        """Vector whose squared norm is the variance of the weights w"""
+
+        if self.nFactors is None:
+            return self._covarianceFactor.T @ w
+
+        return cp.hstack([self._covarianceFactor.T @ w, cp.multiply(self._specificVolatility, w)])
+
+    def _problem(self, method: str) -> tuple:
+        """Builds the problem of a method the first time it is used, every later solve reuses its compiled form"""
+
+        if method in self._problems:
+            return self._problems[method]
+
+        n = len(self.tickers)
+        w = cp.Variable(n)
+        variance = cp.sum_squares(self._risk_vector(w))
+
+        if method == 'min_volatility':
+            k = None
+            problem = cp.Problem(cp.Minimize(variance),
+                                    [cp.sum(w) == 1, w >= self.lowerBounds, w <= self.upperBounds])
+
+        elif method == 'efficient_risk':
+            k = None
+            problem = cp.Problem(cp.Maximize(self._expectedReturns @ w),
+                                    [cp.norm(self._risk_vector(w), 2) <= self._targetVolatility,
+                                     cp.sum(w) == 1, w >= self.lowerBounds, w <= self.upperBounds])
+
+        elif method == 'efficient_return':
+            k = None
+            problem = cp.Problem(cp.Minimize(variance),
+                                    [self._expectedReturns @ w >= self._targetReturn,
+                                     cp.sum(w) == 1, w >= self.lowerBounds, w <= self.upperBounds])
+
+        elif method == 'max_quadratic_utility':
+            k = None
+            problem = cp.Problem(cp.Maximize(self._scaledReturns @ w - 0.5 * variance),
+                                    [cp.sum(w) == 1, w >= self.lowerBounds, w <= self.upperBounds])
+
+        else:
+            # Cornuejols-Tutuncu transformation, the weights are w / k
+            k = cp.Variable(nonneg=True)
+            problem = cp.Problem(cp.Minimize(variance),
+                                    [self._excessReturns @ w == 1, cp.sum(w) == k,
+                                     w >= self.lowerBounds * k, w <= self.upperBounds * k])
+
+        self._problems[method] = (problem, w, k)
+
+        return self._problems[method]
+
+    def _solve(self, method: str) -> OrderedDict:
+
+        if self.expectedReturns is None:
+            raise ValueError("Please set the expected returns and covariance matrix with set_inputs first")
+
+        problem, w, k = self._problem(method)
+
+        # Warm start from the previous rebalance
+        if self.weights is not None:
+            w.value = self.weights if k is None else self.weights * (k.value if k.value else 1.0)
+
+        try:
+            problem.solve(solver=self.solver, warm_start=True, verbose=self.verbose, **self.solverOptions)
+
+        except (TypeError, cp.DCPError, cp.SolverError) as error:
+            raise OptimizationError from error
+
+        if problem.status not in {"optimal", "optimal_inaccurate"}:
+            raise OptimizationError("Solver status: {}".format(problem.status))
+
+        weights = w.value if k is None else w.value / k.value
+        self.weights = weights.round(16) + 0.0
+
+        return collections.OrderedDict(zip(self.tickers, (float(weight) for weight in self.weights)))
+
+    def max_sharpe(self, risk_free_rate: float = 0.0) -> OrderedDict:
+        """Maximises the Sharpe Ratio, see pypfopt.EfficientFrontier.max_sharpe
+
+        Parameters
+        ----------
+        risk_free_rate : float, optional
+            Risk free rate, by default 0.0
 
         Returns
         -------
-        float
-            Risk free rate
+        OrderedDict
+            Weights in the format {ticker:weight}
         """
-        return round(self.riskFreeRate,2)
+        if not (self._expectedReturns.value > risk_free_rate).any():
+            raise ValueError("at least one of the assets must have an expected return exceeding the risk-free rate")
 
-    def getHistoricalPrices(self) -> pd.DataFrame:
-        """Returns the historical prices
+        self._excessReturns.value = self._expectedReturns.value - risk_free_rate
+
+        return self._solve('max_sharpe')
+
+    def min_volatility(self) -> OrderedDict:
+        """Minimises the volatility, see pypfopt.EfficientFrontier.min_volatility
 
         Returns
         -------
-        pd.DataFrame
+        OrderedDict
+            Weights in the format {ticker:weight}
+        """
+        return self._solve('min_volatility')
+
+    def efficient_risk(self, target_volatility: float) -> OrderedDict:
+        """Maximises the return for a target volatility, see pypfopt.EfficientFrontier.efficient_risk
+
+        Parameters
+        ----------
+        target_volatility : float
+            Maximum annualised volatility of the portfolio
+
+        Returns
+        -------
+        OrderedDict
+            Weights in the format {ticker:weight}
+        """
+        self._targetVolatility.value = target_volatility
+
+        return self._solve('efficient_risk')
+
+    def efficient_return(self, target_return: float) -> OrderedDict:
+        """Minimises the volatility for a target return, see pypfopt.EfficientFrontier.efficient_return
+
+        Parameters
+        ----------
+        target_return : float
+            Minimum annualised expected return of the portfolio
+
+        Returns
+        -------
+        OrderedDict
+            Weights in the format {ticker:weight}
+        """
+        if target_return > self._expectedReturns.value.max():
+            raise ValueError("target_return must be lower than the maximum possible return")
+
+        self._targetReturn.value = target_return
+
+        return self._solve('efficient_return')
+
+    def max_quadratic_utility(self, risk_aversion: float = 1) -> OrderedDict:
+        """Maximises the expected return minus half the risk aversion times the variance,
+        see pypfopt.EfficientFrontier.max_quadratic_utility
+
+        Parameters
+        ----------
+        risk_aversion : float, optional
+            Risk aversion coefficient, by default 1
+
+        Returns
+        -------
+        OrderedDict
+            Weights in the format {ticker:weight}
+        """
+        if risk_aversion <= 0:
+            raise ValueError("risk aversion coefficient must be greater than zero")
+
+        self._scaledReturns.value = self._expectedReturns.value / risk_aversion
+
+        return self._solve('max_quadratic_utility')
+
+    def portfolio_performance(self, verbose: bool = False, risk_free_rate: float = 0.0) -> tuple:
+        """Expected annual return, annual volatility and Sharpe Ratio of the last weights,
+        see pypfopt.EfficientFrontier.portfolio_performance
+
+        Parameters
+        ----------
+        verbose : bool, optional
+            Print the statistics, by default False
+        risk_free_rate : float, optional
+            Risk free rate, by default 0.0
+
+        Returns
+        -------
+        tuple
+            Calculated statistics in the format (expected annual return, annual volatility, Sharpe Ratio)
+        """
+        if self.weights is None:
+            raise ValueError("Weights not calculated yet")
+
+        if isinstance(self.covarianceMatrix, FactorCovariance):
+            variance = self.covarianceMatrix.portfolio_variance(self.weights)
+
+        else:
+            variance = self.weights @ self.covarianceMatrix.to_numpy(dtype='float64') @ self.weights
+
+        expectedReturn = self.weights @ self.expectedReturns.to_numpy(dtype='float64')
+        volatility = np.sqrt(variance)
+        sharpe = (expectedReturn - risk_free_rate) / volatility
+
+        if verbose:
+            print("Expected annual return: {:.1f}%".format(100 * expectedReturn))
+            print("Annual volatility: {:.1f}%".format(100 * volatility))
+            print("Sharpe Ratio: {:.2f}".format(sharpe))
+
+        return expectedReturn, volatility, sharpe
+
+
+# Linkage methods of scipy.cluster.hierarchy.linkage that accept a condensed distance matrix
+_LINKAGE_METHODS = ('single', 'complete', 'average', 'weighted', 'centroid', 'median', 'ward')
+
+def _hrp_weights(covarianceMatrix: np.ndarray, linkageMethod: str = 'single') -> np.ndarray:
+    """Hierarchical risk parity weights of Lopez de Prado, as in pypfopt.HRPOpt, from a covariance matrix.
+    The assets are ordered by a hierarchical clustering of the correlation distance sqrt((1 - rho) / 2), and the
+    weights are split recursively between the two halves of every cluster in inverse proportion to their variances.
+
+    Returns
+    -------
+    np.ndarray
+        Weights of the assets, in the order of the covariance matrix
+    """
+    volatilities = np.sqrt(np.diag(covarianceMatrix))
+    correlation = covarianceMatrix / np.outer(volatilities, volatilities)
+    distance = np.sqrt(np.clip((1.0 - correlation) / 2.0, 0.0, 1.0))
+
+    # Single linkage is solved through the minimum spanning tree in O(N^2)
+    clusters = sch.linkage(ssd.squareform(distance, checks=False), linkageMethod)
+    order = sch.leaves_list(clusters)
+
+    weights = np.ones(len(order))
+    clusterItems = [order]
+
+    while clusterItems:
+        clusterItems = [items[start:stop] for items in clusterItems
+                        for start, stop in ((0, len(items) // 2), (len(items) // 2, len(items))) if len(items) > 1]
+
+        for first, second in zip(clusterItems[::2], clusterItems[1::2]):
+            firstVariance = _cluster_variance(covarianceMatrix, first)
+            secondVariance = _cluster_variance(covarianceMatrix, second)
+
+            alpha = 1 - firstVariance / (firstVariance + secondVariance)
+            weights[first] *= alpha
+            weights[second] *= 1 - alpha
+
+    return weights
+
+def _cluster_variance(covarianceMatrix: np.ndarray, items: np.ndarray) -> float:
+    """Variance of the inverse variance portfolio of a cluster"""
+
+    covarianceSlice = covarianceMatrix[np.ix_(items, items)]
+    weights = 1 / np.diag(covarianceSlice)
+    weights /= weights.sum()
+
+    return weights @ covarianceSlice @ weights
+
+def _erc_weights(covarianceMatrix: np.ndarray, riskBudgets: np.ndarray = None, tol: float = 1e-10,
+                    maxIter: int = 100) -> np.ndarray:
+    """Risk budgeting weights (Griveau-Billion, Richard and Roncalli, 2013).
+    Minimises y' S y / 2 - sum(b_i log y_i), whose solution normalised to sum to one gives every asset a share b_i
+    of the portfolio variance. A few sweeps of cyclical coordinate descent, each coordinate with a closed form update
+    and S y kept up to date in O(N), bring y close to the optimum, and damped Newton steps then converge quadratically
+    where coordinate descent alone stalls on strongly correlated assets.
+
+    Returns
+    -------
+    np.ndarray
+        Weights of the assets, in the order of the covariance matrix
+    """
+    n = len(covarianceMatrix)
+    riskBudgets = np.full(n, 1 / n) if riskBudgets is None else np.asarray(riskBudgets, dtype='float64') / np.sum(riskBudgets)
+    variances = np.diag(covarianceMatrix).copy()
+    objective = lambda y: 0.5 * y @ covarianceMatrix @ y - riskBudgets @ np.log(y)
+
+    # Inverse volatility start, scaled so that y' S y = sum(b) = 1 as at the optimum
+    y = 1 / np.sqrt(variances)
+    y /= np.sqrt(y @ covarianceMatrix @ y)
+    covarianceY = covarianceMatrix @ y
+
+    for _ in range(3):
+        for i in range(n):
+            # Sum over j != i of S_ij y_j
+            c = covarianceY[i] - variances[i] * y[i]
+            updated = (-c + np.sqrt(c * c + 4 * variances[i] * riskBudgets[i])) / (2 * variances[i])
+
+            covarianceY += covarianceMatrix[:, i] * (updated - y[i])
+            y[i] = updated
+
+    eps = np.finfo(float).eps
+    absoluteCovariance = np.abs(covarianceMatrix)
+    previousResidual = np.inf
+
+    for _ in range(maxIter):
+
+        # At the optimum the risk contribution y_i (S y)_i of every asset equals its budget, up to the rounding error
+        # of computing (S y)_i, which dominates tol when the covariance matrix is badly conditioned
+        rounding = eps * y * (absoluteCovariance @ y)
+        residual = np.abs(y * covarianceY - riskBudgets)
+        if np.all(residual <= np.maximum(tol * riskBudgets.max(), rounding)):
+            return y / y.sum()
+
+        gradient = covarianceY - riskBudgets / y
+        hessian = covarianceMatrix + np.diag(riskBudgets / y ** 2)
+        direction = -scipy.linalg.cho_solve(scipy.linalg.cho_factor(hessian), gradient)
+        decrement = -gradient @ direction
+        current = objective(y)
+
+        # The terms of the objective, rather than its value, set its rounding error, and y' |S| y grows far beyond
+        # y' S y = 1 when the covariance matrix is nearly singular
+        roundingLimited = decrement <= 1e3 * (0.5 * rounding.sum() + eps * riskBudgets @ np.abs(np.log(y)))
+
+        # On a nearly singular covariance matrix the Newton direction itself carries rounding error of the order of the
+        # condition number of the Hessian, and the residual stalls above the bound. Once the predicted decrease is lost
+        # in the rounding of the objective and a step no longer reduces the residual, y is as accurate as it can get
+        if roundingLimited and residual.max() >= previousResidual:
+            return y / y.sum()
+
+        previousResidual = residual.max()
+
+        # Backtracking line search that keeps y positive
+        step = 1.0
+        while np.any(y + step * direction <= 0):
+            step /= 2
+
+        # Once the predicted decrease is lost in the rounding of the objective the Armijo test can no longer be
+        # evaluated, and the iterate is well inside the region where the full Newton step converges quadratically
+        if not roundingLimited:
+            while objective(y + step * direction) > current - 0.25 * step * decrement and step > 1e-12:
+                step /= 2
+
+        y = y + step * direction
+        covarianceY = covarianceMatrix @ y
+
+    raise OptimizationError(f"Equal risk contribution did not converge in {maxIter} iterations")
+
+
+class _RiskBasedPortfolio(_Portfolio):
+
+    def _set_weights(self, weights: np.ndarray) -> dict:
+
+        self.weights = dict(zip(self.covarianceMatrix.index, (float(weight) for weight in weights)))
+
+        return self.weights
+
+    def stats(self, verbose: bool = True) -> tuple:
+        """Generate the expected annual return, annual volatility and Sharpe Ratio of the portfolio.
+
+        Parameters
+        ----------
+        verbose : bool, optional
+            Print the statistics, by default True
+
+        Returns
+        -------
+        tuple
+            Calculated statistics in the format (expected annual return, annual volatility, Sharpe Ratio)
+        """
+        if self.weights is None:
+            raise ValueError("Weights not calculated yet, please call fit first")
+
+        return portfolio_performance(self.weights, self.expectedReturns, self.covarianceMatrix, verbose, self.riskFreeRate)
+
+
+class HierarchicalRiskParity(_RiskBasedPortfolio):
+
+    def __init__(self, historicalPrices: pd.DataFrame, frequency: int = 252, riskFreeRate: float = None,
+                    expectedReturns: pd.Series = None, covarianceMatrix: pd.DataFrame = None):
+        """Hierarchical risk parity portfolio, with the same interface as MeanVariance.
+        It needs no solver, so it scales to thousands of assets and stays stable when the covariance matrix
+        is close to singular. The weights are long only and fully invested, and weight bounds are not supported.
+
+        Parameters
+        ----------
+        historicalPrices : pd.DataFrame
             DataFrame of historical prices for each ticker, with column name as name of ticker and index as timestamps
+        frequency: int, optional
+            Frequency of the data passed, default is daily, i.e., 252 days
+        riskFreeRate : float, optional
+            Risk free rate, by default None (average of fetch_data.risk_free_rate over the dates of historicalPrices)
+        expectedReturns : pd.Series, optional
+            Precomputed annualised expected returns of the tickers, only used by stats,
+            by default None (mean historical return of historicalPrices)
+        covarianceMatrix : pd.DataFrame, optional
+            Precomputed annualised covariance matrix of the tickers,
+            by default None (Ledoit-Wolf shrunk covariance of historicalPrices)
         """
-        return self.historicalPrices
+        super().__init__(historicalPrices, frequency, riskFreeRate, expectedReturns, covarianceMatrix)
 
-    def getExpectedReturns(self) -> pd.DataFrame:
-        """Returns the expected returns
+    def fit(self, linkageMethod: str = 'single') -> dict:
+        """Compute the hierarchical risk parity weights, see pypfopt.HRPOpt
+
+        Parameters
+        ----------
+        linkageMethod : str, optional
+            Linkage method of scipy.cluster.hierarchy.linkage, by default 'single'
 
         Returns
         -------
-        pd.DataFrame
-            DataFrame of expected returns, with index as ticker names
+        dict
+            Returns a dictionary with format {ticker:weight}
         """
-        return self.expectedReturns
+        if linkageMethod not in _LINKAGE_METHODS:
+            raise ValueError(f"The Chosen linkage method '{linkageMethod}' is not valid, choose one of {_LINKAGE_METHODS}.")
 
-    def getCovarianceMatrix(self) -> pd.DataFrame:
-        """Returns the historical prices
+        return self._set_weights(_hrp_weights(np.asarray(self.covarianceMatrix, dtype='float64'), linkageMethod))
+
+
+class EqualRiskContribution(_RiskBasedPortfolio):
+
+    def __init__(self, historicalPrices: pd.DataFrame, frequency: int = 252, riskFreeRate: float = None,
+                    expectedReturns: pd.Series = None, covarianceMatrix: pd.DataFrame = None):
+        """Equal risk contribution (risk parity) portfolio, with the same interface as MeanVariance.
+        Every asset contributes the same share of the portfolio variance, or a given risk budget. It is solved by
+        coordinate descent and Newton steps rather than a QP, so it scales to thousands of assets. The covariance
+        matrix must be positive definite, and when it is nearly singular the risk contributions are matched as closely
+        as its condition number allows in double precision rather than to tol. The weights are long only and fully
+        invested, and weight bounds are not supported.
+
+        Parameters
+        ----------
+        historicalPrices : pd.DataFrame
+            DataFrame of historical prices for each ticker, with column name as name of ticker and index as timestamps
+        frequency: int, optional
+            Frequency of the data passed, default is daily, i.e., 252 days
+        riskFreeRate : float, optional
+            Risk free rate, by default None (average of fetch_data.risk_free_rate over the dates of historicalPrices)
+        expectedReturns : pd.Series, optional
+            Precomputed annualised expected returns of the tickers, only used by stats,
+            by default None (mean historical return of historicalPrices)
+        covarianceMatrix : pd.DataFrame, optional
+            Precomputed annualised covariance matrix of the tickers,
+            by default None (Ledoit-Wolf shrunk covariance of historicalPrices)
+        """
+        super().__init__(historicalPrices, frequency, riskFreeRate, expectedReturns, covarianceMatrix)
+
+    def fit(self, riskBudgets: Union[pd.Series, dict] = None, tol: float = 1e-10, maxIter: int = 100) -> dict:
+        """Compute the equal risk contribution weights
+
+        Parameters
+        ----------
+        riskBudgets : Union[pd.Series, dict], optional
+            Share of the portfolio variance of each ticker, normalised to sum to one, by default None (equal shares)
+        tol : float, optional
+            Largest error of the risk contributions at convergence, relative to the largest budget, by default 1e-10.
+            Iterations also stop once Newton steps no longer reduce the error, which is limited by rounding on a nearly
+            singular covariance matrix
+        maxIter : int, optional
+            Maximum number of Newton steps, by default 100
 
         Returns
         -------
-        pd.DataFrame
-            DataFrame of covariance between tickers
+        dict
+            Returns a dictionary with format {ticker:weight}
         """
-        return self.covarianceMatrix
+        if riskBudgets is not None:
+            riskBudgets = pd.Series(riskBudgets).reindex(self.covarianceMatrix.index).to_numpy(dtype='float64')
 
+            if np.isnan(riskBudgets).any() or (riskBudgets <= 0).any():
+                raise ValueError("riskBudgets must give a positive budget to every ticker")
 
+        return self._set_weights(_erc_weights(np.asarray(self.covarianceMatrix, dtype='float64'), riskBudgets, tol, maxIter))
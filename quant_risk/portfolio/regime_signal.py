@@ -1,21 +1,74 @@
 """ Implements the regime signal model"""
 
+import os
 import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from typing import OrderedDict, Union
-from quant_risk.portfolio.portfolio import MeanVariance
+from quant_risk.portfolio.portfolio import MeanVariance, ParametricMeanVariance
+from quant_risk.portfolio.backtest import optimise_window
+from quant_risk.portfolio.covariance import WindowStatistics
+from quant_risk.portfolio.performance import simulate_nav
 from dateutil.relativedelta import relativedelta
 from quant_risk.statistics.summarize import print_summary
+from quant_risk.utils import fetch_data
 
 __all__ = [
     'RegimeSignalModel'
 ]
 
+# Expected returns and covariance matrices of every rebalance date, attached once per worker process from shared memory,
+# and the optimizer each worker reuses for all of its dates
+_sharedBlocks = []
+_sharedExpectedReturns = None
+_sharedCovariances = None
+_workerOptimizer = None
+
+def _attach_shared_inputs(expectedReturnsName: str, covariancesName: str, nDates: int, tickers: list,
+                            bounds: Union[tuple, list], solver: str, solverOptions: dict):
+    """Pool initializer that maps the shared expected returns and covariance matrices into the worker
+    and compiles the worker's optimizer"""
+
+    global _sharedBlocks, _sharedExpectedReturns, _sharedCovariances, _workerOptimizer
+
+    nTickers = len(tickers)
+    _sharedBlocks = [shared_memory.SharedMemory(name=expectedReturnsName), shared_memory.SharedMemory(name=covariancesName)]
+    _sharedExpectedReturns = np.ndarray((nDates, nTickers), dtype=np.float64, buffer=_sharedBlocks[0].buf)
+    _sharedCovariances = np.ndarray((nDates, nTickers, nTickers), dtype=np.float64, buffer=_sharedBlocks[1].buf)
+    _workerOptimizer = ParametricMeanVariance(tickers, bounds, solver, solverOptions)
+
+def _optimise_shared(idx: int, method: str, riskFreeRate: float, ceilingRisk: float) -> tuple:
+    """Optimises the portfolio of one rebalance date from the shared inputs"""
+
+    tickers = _workerOptimizer.tickers
+    expectedReturns = pd.Series(_sharedExpectedReturns[idx], index=tickers)
+    covarianceMatrix = pd.DataFrame(_sharedCovariances[idx], index=tickers, columns=tickers)
+
+    return _optimise(_workerOptimizer, method, expectedReturns, covarianceMatrix, riskFreeRate, ceilingRisk)
+
+def _optimise(optimizer: ParametricMeanVariance, method: str, expectedReturns: pd.Series, covarianceMatrix: pd.DataFrame,
+                riskFreeRate: float, ceilingRisk: float) -> tuple:
+    """Optimises the portfolio of one rebalance date with the method of its regime: 'max_sharpe', 'min_volatility',
+    'efficient_risk' under a volatility ceiling, 'hierarchical_risk_parity' or 'equal_risk_contribution'.
+    If the method fails, the minimum volatility portfolio is used instead, and equal weights if that fails too,
+    see backtest.optimise_window.
+
+    Returns
+    -------
+    tuple
+        (weights in the format {ticker:weight}, name of the method that produced them,
+        the errors of the attempts that failed or None)
+    """
+    call = ('efficient_risk', {'target_volatility': ceilingRisk}) if method == 'efficient_risk' else method
+
+    return optimise_window(optimizer, call, expectedReturns, covarianceMatrix, riskFreeRate)
+
 class RegimeSignalModel():
 
     def __init__(self, regimeSignals: pd.Series, historicalPrices: pd.DataFrame, frequency: int=252, bounds: Union[tuple,list] = (0,1), riskFreeRate: float = None,
     solver: str = None, solverOptions: dict = None, verbose: bool = False, constraint: bool = True,
-    LOOKBACKMONTHS: int = 3, CUSTOM_CEILING_RISK: float = .15):
+    LOOKBACKMONTHS: int = 3, CUSTOM_CEILING_RISK: float = .15, regimeMethods: dict = None):
         """Constructor to instantiate the class based on the input parameters.
 
         Parameters
@@ -40,10 +93,23 @@ class RegimeSignalModel():
             Whether performance and debugging information should be printed, by default False
         constraint: bool
             True if you want to be invested in all tickers, will set minimum weight to 1/n**2 where n is number of tickers, else False
+        regimeMethods : dict, optional
+            Optimisation method of each regime in the format {regimeType:method}, one of 'max_sharpe', 'min_volatility',
+            'efficient_risk', 'hierarchical_risk_parity' or 'equal_risk_contribution',
+            by default None ({-1: 'max_sharpe', 1: 'min_volatility', 0: 'efficient_risk'}).
+            The risk based methods ignore bounds, including the 1/n**2 floor set by constraint
         """
         self.LOOKBACK_MONTHS = LOOKBACKMONTHS
         self.CUSTOM_CEILING_RISK = CUSTOM_CEILING_RISK
 
+        self.regimeMethods = {-1: 'max_sharpe', 1: 'min_volatility', 0: 'efficient_risk'}
+        self.regimeMethods.update(regimeMethods or {})
+
+        validMethods = {'max_sharpe', 'min_volatility', 'efficient_risk', 'hierarchical_risk_parity', 'equal_risk_contribution'}
+        for regimeType in regimeSignals.unique():
+            if self.regimeMethods.get(regimeType) not in validMethods:
+                raise ValueError(f"Regime {regimeType} has no valid optimisation method, choose one of {sorted(validMethods)}")
+
         # TODO: historicalPrices is assumed to be daily data, and regimeSignals monthly
         self.regimeSignals = regimeSignals
 
@@ -66,135 +132,172 @@ class RegimeSignalModel():
 
         self.dates = list(zip(start, end))
 
+        # Fetch the risk free rate once for the whole span, every window then averages the cached series
+        if riskFreeRate is None:
+            fetch_data.risk_free_rate_series(min(start).strftime('%Y-%m-%d'), max(end).strftime('%Y-%m-%d'))
+
+        # The windows overlap, so their statistics are updated incrementally rather than recomputed per window
+        windowStatistics = WindowStatistics(historicalPrices, frequency)
+
         for start, end in self.dates:
             # Create a portfolio of last N months' worth of data
-            self.portfolios.append(MeanVariance(historicalPrices.loc[start:end], frequency, bounds, riskFreeRate, solver, solverOptions, verbose))
+            expectedReturns, covarianceMatrix = windowStatistics.get_statistics(start, end)
+            self.portfolios.append(MeanVariance(historicalPrices.loc[start:end], frequency, bounds, riskFreeRate, solver, solverOptions, verbose,
+                                                expectedReturns, covarianceMatrix))
 
         self.regimeWeights = None
         self.historicalPrices = historicalPrices
+        self.bounds = bounds
+        self.solver = solver
+        self.solverOptions = solverOptions
 
-    def get_weights(self,verbose: bool=False) -> dict:
+    def get_weights(self, verbose: bool = False, nJobs: int = 1) -> dict:
         """Get the average weights for each regime type.
+        The portfolio of each rebalance date is optimised with the method of its regime in regimeMethods, by default
+        maximum sharpe ratio for -1, minimum volatility for +1 and maximum return under CUSTOM_CEILING_RISK volatility
+        for 0. If the method fails, the minimum volatility portfolio is used instead, and equal weights if that fails too.
+        The problems are compiled once by a ParametricMeanVariance and re-solved for each date with warm starts.
+        The dates are independent, so they can be optimised in worker processes that read the expected returns and
+        covariance matrices from shared memory; weightsByTime keeps the date order either way, and optimisationErrors
+        holds the error of every failed attempt.
 
         Parameters
         ----------
         verbose: bool, optional
             Print the performance and debugging information, default False
+        nJobs : int, optional
+            Number of worker processes, -1 to use every CPU, by default 1 (no process pool)
 
         Returns
         -------
         dict
             A dictionary with the average regime weights for each regime, of form {regimeType:setOfWeights}
         """
-
-        self.weightsList = {}
+        descriptions = {'max_sharpe': "Max Sharpe Optimisation", 'min_volatility': "Minimum Volatility Optimisation",
+                        'efficient_risk': f"Custom: Maximum {self.CUSTOM_CEILING_RISK * 100}% volatility",
+                        'hierarchical_risk_parity': "Hierarchical Risk Parity",
+                        'equal_risk_contribution': "Equal Risk Contribution"}
+        regimes = list(self.regimeSignals)
+        methods = [self.regimeMethods[regime] for regime in regimes]
+
+        if nJobs == -1:
+            nJobs = os.cpu_count()
+
+        if nJobs > 1:
+            results = self._optimise_parallel(methods, nJobs)
+
+        else:
+            # One optimizer compiled once and warm started from date to date
+            optimizer = ParametricMeanVariance(self.historicalPrices.columns, self.bounds, self.solver, self.solverOptions)
+            results = [_optimise(optimizer, method, portfolio.getExpectedReturns(), portfolio.getCovarianceMatrix(),
+                                    portfolio.getRiskFreeRate(), self.CUSTOM_CEILING_RISK)
+                        for method, portfolio in zip(methods, self.portfolios)]
+
+        self.weightsList = {regimeType: [] for regimeType in self.regimeSignals.value_counts().index.tolist()}
         self.weightsByTime = []
+        self.optimisationErrors = []
 
-        for regimeType in self.regimeSignals.value_counts().index.tolist():
-            self.weightsList[regimeType] = []
-
-        # For each portfolio in the list, look at regime and optimize portfolio based on required methods
-        for idx, regime in enumerate(self.regimeSignals):
-
-            print("=============================================")
-
-            if regime == -1:
-
-                if verbose:
-
-                    print("Max Sharpe Optimisation")
-
-                    print("\n Training dates",
-                        self.portfolios[idx].getHistoricalPrices().index[0],
-                        self.portfolios[idx].getHistoricalPrices().index[-1])
-
-                    print("\n Regime Signal dates", self.regimeSignals.index[idx])
+        for idx, (regime, (weights, method, error)) in enumerate(zip(regimes, results)):
 
-                    print("\n Risk-free rate",
-                        self.portfolios[idx].getRiskFreeRate())
+            # Keep each portfolio in the same state as if it had been fitted itself, so stats() still works
+            self.portfolios[idx].weights = weights
+            self.portfolios[idx].portfolio.set_weights(weights)
 
+            if verbose:
 
-                # TODO: fails if all expected returns are negative
-                riskFreeRate=self.portfolios[idx].getRiskFreeRate()
-                weights = self.portfolios[idx].fit(method='max_sharpe',risk_free_rate=riskFreeRate)
+                print("=============================================")
 
-            elif regime == 1:
-                if verbose:
+                print(descriptions[self.regimeMethods[regime]])
 
-                    print("Minimum Volatility Optimisation")
+                print("\n Training dates",
+                    self.portfolios[idx].getHistoricalPrices().index[0],
+                    self.portfolios[idx].getHistoricalPrices().index[-1])
 
-                    print("\n Training dates",
-                        self.portfolios[idx].getHistoricalPrices().index[0],
-                        self.portfolios[idx].getHistoricalPrices().index[-1])
+                print("\n Regime Signal dates", self.regimeSignals.index[idx])
 
-                    print("\n Regime Signal dates", self.regimeSignals.index[idx])
+                print("\n Risk-free rate",
+                    self.portfolios[idx].getRiskFreeRate())
 
-                    print("\n Risk-free rate",
-                        self.portfolios[idx].getRiskFreeRate())
+                if method != self.regimeMethods[regime]:
+                    print("\n Solver failed, fell back to", method, "\n", error)
 
-                weights = self.portfolios[idx].fit(method='min_volatility')
+                print("\n", weights, "\n")
 
-            elif regime == 0:
-                if verbose:
+            self.weightsList[regime].append(weights)
+            self.weightsByTime.append(weights)
+            self.optimisationErrors.append(error)
 
-                    print(f"Custom: Maximum {self.CUSTOM_CEILING_RISK * 100}% volatility")
+        self.regimeWeights = {}
 
-                    print("\n Training dates",
-                        self.portfolios[idx].getHistoricalPrices().index[0],
-                        self.portfolios[idx].getHistoricalPrices().index[-1])
+        for regimeType in list(self.weightsList.keys()):
+            self.regimeWeights[regimeType] = pd.DataFrame([ticker for ticker in self.weightsList[regimeType]]).mean().to_dict()
 
-                    print("\n Regime Signal dates", self.regimeSignals.index[idx])
+        self.weightsByTime = pd.DataFrame.from_dict(self.weightsByTime)
+        self.weightsByTime.index = self.regimeSignals.index
+        self.optimisationErrors = pd.Series(self.optimisationErrors, index=self.regimeSignals.index, dtype='object')
 
-                    print("\n Risk-free rate",
-                        self.portfolios[idx].getRiskFreeRate())
+        return self.regimeWeights
 
-                try:
-                    weights = self.portfolios[idx].fit(method='efficient_risk',target_volatility=self.CUSTOM_CEILING_RISK)
+    def _optimise_parallel(self, methods: list, nJobs: int) -> list:
+        """Optimises every rebalance date in a process pool, with the inputs shared rather than pickled per task"""
 
-                except:
-                    weights = self.portfolios[idx].fit(method='min_volatility')
+        tickers = list(self.historicalPrices.columns)
+        nDates, nTickers = len(self.portfolios), len(tickers)
+        blocks = [shared_memory.SharedMemory(create=True, size=max(8 * nDates * nTickers, 1)),
+                    shared_memory.SharedMemory(create=True, size=max(8 * nDates * nTickers ** 2, 1))]
 
-            if verbose:
+        expectedReturns = np.ndarray((nDates, nTickers), dtype=np.float64, buffer=blocks[0].buf)
+        covariances = np.ndarray((nDates, nTickers, nTickers), dtype=np.float64, buffer=blocks[1].buf)
 
-                print("\n", weights, "\n")
+        try:
+            for idx, portfolio in enumerate(self.portfolios):
+                expectedReturns[idx] = portfolio.getExpectedReturns().reindex(tickers).to_numpy()
+                covariances[idx] = portfolio.getCovarianceMatrix().reindex(index=tickers, columns=tickers).to_numpy()
 
-            self.weightsList[regime].append(weights)
-            self.weightsByTime.append(weights)
+            with ProcessPoolExecutor(max_workers=nJobs, initializer=_attach_shared_inputs,
+                                        initargs=(blocks[0].name, blocks[1].name, nDates, tickers, self.bounds,
+                                                    self.solver, self.solverOptions)) as executor:
 
-        self.regimeWeights = {}
+                futures = [executor.submit(_optimise_shared, idx, method, portfolio.getRiskFreeRate(), self.CUSTOM_CEILING_RISK)
+                            for idx, (method, portfolio) in enumerate(zip(methods, self.portfolios))]
 
-        for regimeType in list(self.weightsList.keys()):
-            self.regimeWeights[regimeType] = pd.DataFrame([ticker for ticker in self.weightsList[regimeType]]).mean().to_dict()
+                results = [future.result() for future in futures]
 
-        self.weightsByTime = pd.DataFrame.from_dict(self.weightsByTime)
-        self.weightsByTime.index = self.regimeSignals.index
+        finally:
+            # The views must be released before the shared blocks can be closed
+            del expectedReturns, covariances
+            for block in blocks:
+                block.close()
+                block.unlink()
 
+        return results
 
-    def get_portfolio(self, verbose: bool = True):
-        """Computes the portfolio value from the weights matrix calculated in get_weights function.
+    def get_portfolio(self, verbose: bool = True, initialValue: float = 1.0, transactionCost: float = 0.0,
+                        slippage: float = 0.0) -> pd.DataFrame:
+        """Computes the portfolio value from the weights matrix calculated in get_weights function, see
+        performance.simulate_nav. The holdings drift with the returns between rebalance dates and every rebalance
+        pays transaction costs and slippage on its turnover.
         If Verbose: prints out the summary statistics of the portfolio
 
         Parameters
         ----------
         verbose : bool, optional
             prints out the portfolio statistics, by default True
+        initialValue : float, optional
+            Portfolio value before the first rebalance, by default 1.0
+        transactionCost : float, optional
+            Proportional cost per unit of turnover, e.g 0.001 for 10 basis points, by default 0.0
+        slippage : float, optional
+            Proportional slippage per unit of turnover, by default 0.0
 
         Returns
         -------
         DataFrame
-            Returns a pandas dataframe of the Portfolio indexed by date
+            Returns a pandas dataframe of the Portfolio value, turnover and costs indexed by date
         """
-
-        temp = pd.DataFrame(index=pd.date_range(start=self.weightsByTime.index[0],
-                                            end=self.weightsByTime.index[-1], freq='B'))
-
-        weightsByTime = pd.concat([temp, self.weightsByTime], axis=1, join='outer').ffill().resample('B').asfreq()
-        self.historicalPrices = pd.concat([self.historicalPrices, temp], axis=1, join='outer').ffill()
-
-        portfolio = pd.DataFrame((self.historicalPrices.loc[weightsByTime.index.tolist(), :] * weightsByTime).sum(axis = 1))
-        portfolio.columns = ['Portfolio Value']
+        portfolio = simulate_nav(self.historicalPrices, self.weightsByTime, initialValue, transactionCost, slippage)
 
         if verbose:
-            print(print_summary(portfolio))
+            print(print_summary(portfolio[['Portfolio Value']]))
 
         return portfolio
@@ -3,6 +3,7 @@
 import pandas as pd
 import empyrical
 import numpy as np
+from quant_risk.statistics import kernels
 
 __all__ = [
     'conditional_value_at_risk',
@@ -45,7 +46,11 @@ def value_at_risk(price: pd.Series, threshold: float = 0.05) -> float:
 
     if isinstance(price, pd.DataFrame):
 
-        return price.apply(value_at_risk)
+        returns = kernels.simple_returns(price.to_numpy(dtype='float64'))
+        counts = (~np.isnan(returns)).sum(axis=0)
+        var = kernels.value_at_risk(np.sort(returns, axis=0), counts, threshold)
+
+        return pd.Series(var, index=price.columns)
 
     returns = price.pct_change().dropna()
     var = empyrical.stats.value_at_risk(returns, threshold)
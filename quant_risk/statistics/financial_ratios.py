@@ -1,7 +1,9 @@
 "Put all financial ratios here, no need for class I think"
 
 from quant_risk.statistics.annualize import annualised_returns, annualised_volatility
+from quant_risk.statistics import kernels
 import empyrical
+import numpy as np
 import pandas as pd
 from typing import Union
 from quant_risk.statistics.statistics import maximum_drawdown
@@ -62,7 +64,7 @@ def calmar_ratio(price: Union[pd.DataFrame, pd.Series], periodsPerYear: Union[fl
     excessReturn = returns - rfPerPeriod
 
     annualiseExcessReturn = annualised_returns(excessReturn, periodsPerYear)
-    calmar = annualiseExcessReturn / maximum_drawdown(price)
+    calmar = annualiseExcessReturn / maximum_drawdown(price).maximumDrawdown
     # calmar = empyrical.stats.calmar_ratio(returns=returns, annualization=periodsPerYear)
 
     return calmar
@@ -86,7 +88,10 @@ def omega_ratio(price: Union[pd.DataFrame, pd.Series], riskFreeRate: float = 0.0
     """
     if isinstance(price, pd.DataFrame):
 
-        return price.apply(omega_ratio, axis=0)
+        returns = kernels.simple_returns(price.to_numpy(dtype='float64'))
+        omega = kernels.omega_ratio(returns, riskFreeRate=riskFreeRate, periodsPerYear=periodsPerYear)
+
+        return pd.Series(omega, index=price.columns)
 
     returns = price.pct_change().dropna()
     omega = empyrical.stats.omega_ratio(returns, risk_free = riskFreeRate, annualization = periodsPerYear)
@@ -113,7 +118,10 @@ def sortino_ratio(price: Union[pd.DataFrame, pd.Series], periodsPerYear: Union[f
 
     if isinstance(price, pd.DataFrame):
 
-        return price.apply(sortino_ratio, axis=0)
+        returns = kernels.simple_returns(price.to_numpy(dtype='float64'))
+        sortino = kernels.sortino_ratio(returns, periodsPerYear=periodsPerYear, reqReturn=reqReturn)
+
+        return pd.Series(sortino, index=price.columns)
 
     returns = price.pct_change().dropna()
     sortino = empyrical.stats.sortino_ratio(returns, annualization = periodsPerYear, required_return = reqReturn)
@@ -135,7 +143,11 @@ def tail_ratio(price: Union[pd.DataFrame, pd.Series]) -> float:
     """
     if isinstance(price, pd.DataFrame):
 
-        return price.apply(tail_ratio, axis=0)
+        returns = kernels.simple_returns(price.to_numpy(dtype='float64'))
+        counts = (~np.isnan(returns)).sum(axis=0)
+        tail = kernels.tail_ratio(np.sort(returns, axis=0), counts)
+
+        return pd.Series(tail, index=price.columns)
 
     returns = price.pct_change().dropna()
     tail = empyrical.stats.tail_ratio(returns)
@@ -0,0 +1,546 @@
+"""Vectorised NumPy kernels for T x N matrices of prices and returns.
+Every kernel reduces along axis 0 (time) and treats NaN as a missing observation, so each column
+is computed on its own observations exactly as the per-column pandas/empyrical functions would."""
+
+import numpy as np
+from scipy.stats import skew, kurtosis
+from typing import Union
+
+__all__ = [
+    'simple_returns',
+    'percentile',
+    'annualised_returns',
+    'annualised_volatility',
+    'sharpe_ratio',
+    'calmar_ratio',
+    'omega_ratio',
+    'sortino_ratio',
+    'tail_ratio',
+    'stability',
+    'maximum_drawdown',
+    'cumulative_returns',
+    'value_at_risk',
+    'conditional_value_at_risk',
+    'alpha_beta',
+    'fused_summary'
+]
+
+
+def simple_returns(price: np.ndarray) -> np.ndarray:
+    """Computes simple returns of a T x N price matrix into a single (T-1) x N buffer
+
+    Parameters
+    ----------
+    price : np.ndarray
+        matrix of historical prices, one column per security
+
+    Returns
+    -------
+    np.ndarray
+        matrix of simple returns, NaN where either price is missing
+    """
+    price = np.asarray(price, dtype=np.float64)
+
+    if price.ndim == 1:
+        price = price[:, None]
+
+    returns = np.divide(price[1:], price[:-1])
+    returns -= 1
+
+    return returns
+
+def _valid_count(returns: np.ndarray, valid: np.ndarray = None) -> np.ndarray:
+    """Number of non-missing observations for each column"""
+
+    if valid is None:
+        valid = ~np.isnan(returns)
+
+    return valid.sum(axis=0)
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Elementwise division that returns NaN rather than warning on 0/0"""
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.divide(numerator, denominator)
+
+def percentile(sortedReturns: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Linearly interpolated percentile of each column of an already sorted matrix.
+    Matches np.percentile with the default 'linear' interpolation on each column's observations.
+
+    Parameters
+    ----------
+    sortedReturns : np.ndarray
+        returns sorted along axis 0, with missing values (NaN) sorted to the end of each column
+    counts : np.ndarray
+        number of non-missing observations in each column
+    q : float
+        percentile to compute, between 0 and 100
+
+    Returns
+    -------
+    np.ndarray
+        percentile of each column, NaN for columns without observations
+    """
+    counts = np.asarray(counts)
+    position = (q / 100) * np.maximum(counts - 1, 0)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+    fraction = position - lower
+
+    lowerValue = np.take_along_axis(sortedReturns, lower[None, :], axis=0)[0]
+    upperValue = np.take_along_axis(sortedReturns, upper[None, :], axis=0)[0]
+
+    result = lowerValue + (upperValue - lowerValue) * fraction
+
+    return np.where(counts > 0, result, np.nan)
+
+def annualised_returns(returns: np.ndarray, periodsPerYear: Union[float, int] = 252,
+                        growth: np.ndarray = None, counts: np.ndarray = None) -> np.ndarray:
+    """Annualised compound returns of each column, see annualize.annualised_returns
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        matrix of returns
+    periodsPerYear : Union[float, int], optional
+        freq of returns in a year, by default 252
+    growth : np.ndarray, optional
+        precomputed compound growth (1 + returns).prod() of each column, by default None
+    counts : np.ndarray, optional
+        precomputed number of observations of each column, by default None
+
+    Returns
+    -------
+    np.ndarray
+        annualised return of each column
+    """
+    if growth is None:
+        growth = np.nanprod(1 + returns, axis=0)
+
+    if counts is None:
+        counts = _valid_count(returns)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return growth ** (periodsPerYear / counts) - 1
+
+def _moments(returns: np.ndarray, valid: np.ndarray, counts: np.ndarray) -> tuple:
+    """Mean and demeaned returns (zero where missing) of each column"""
+
+    filled = np.where(valid, returns, 0.0)
+    mean = _safe_divide(filled.sum(axis=0), counts)
+    demeaned = np.where(valid, returns - mean, 0.0)
+
+    return mean, demeaned
+
+def annualised_volatility(returns: np.ndarray, periodsPerYear: Union[float, int] = 252,
+                            demeaned: np.ndarray = None, counts: np.ndarray = None) -> np.ndarray:
+    """Annualised sample (ddof=1) volatility of each column, see annualize.annualised_volatility
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        matrix of returns
+    periodsPerYear : Union[float, int], optional
+        freq of returns in a year, by default 252
+    demeaned : np.ndarray, optional
+        precomputed demeaned returns with missing values set to zero, by default None
+    counts : np.ndarray, optional
+        precomputed number of observations of each column, by default None
+
+    Returns
+    -------
+    np.ndarray
+        annualised volatility of each column
+    """
+    valid = ~np.isnan(returns)
+
+    if counts is None:
+        counts = _valid_count(returns, valid)
+
+    if demeaned is None:
+        _, demeaned = _moments(returns, valid, counts)
+
+    variance = _safe_divide(np.einsum('ij,ij->j', demeaned, demeaned), counts - 1)
+
+    return np.sqrt(variance) * (periodsPerYear ** 0.5)
+
+def _per_period_rate(riskFreeRate: float, periodsPerYear: Union[float, int]) -> float:
+    """De-annualises a constant annual risk free rate"""
+
+    return (1 + riskFreeRate) ** (1 / periodsPerYear) - 1
+
+def sharpe_ratio(returns: np.ndarray, riskFreeRate: float = 0.0, periodsPerYear: Union[float, int] = 252) -> np.ndarray:
+    """Annualised sharpe ratio of each column, see financial_ratios.sharpe_ratio
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        matrix of returns
+    riskFreeRate : float, optional
+        given constant annual risk free rate throughout the period, by default 0.0
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+
+    Returns
+    -------
+    np.ndarray
+        annualised sharpe ratio of each column
+    """
+    excessReturn = returns - _per_period_rate(riskFreeRate, periodsPerYear)
+
+    return _safe_divide(annualised_returns(excessReturn, periodsPerYear),
+                        annualised_volatility(returns, periodsPerYear))
+
+def maximum_drawdown(price: np.ndarray, runningPeak: np.ndarray = None) -> np.ndarray:
+    """Maximum drawdown of each column of a price matrix, see statistics.maximum_drawdown
+
+    Parameters
+    ----------
+    price : np.ndarray
+        matrix of historical prices
+    runningPeak : np.ndarray, optional
+        precomputed running maximum (cummax) of the prices, by default None
+
+    Returns
+    -------
+    np.ndarray
+        maximum drawdown of each column (a negative number)
+    """
+    price = np.asarray(price, dtype=np.float64)
+
+    if runningPeak is None:
+        runningPeak = np.fmax.accumulate(price, axis=0)
+
+    drawdowns = _safe_divide(price, runningPeak) - 1
+
+    with np.errstate(invalid='ignore'):
+        return np.fmin.reduce(drawdowns, axis=0)
+
+def calmar_ratio(price: np.ndarray, riskFreeRate: float = 0.0, periodsPerYear: Union[float, int] = 252) -> np.ndarray:
+    """Calmar ratio of each column of a price matrix, see financial_ratios.calmar_ratio
+
+    Parameters
+    ----------
+    price : np.ndarray
+        matrix of historical prices
+    riskFreeRate : float, optional
+        given constant annual risk free rate throughout the period, by default 0.0
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+
+    Returns
+    -------
+    np.ndarray
+        calmar ratio of each column
+    """
+    excessReturn = simple_returns(price) - _per_period_rate(riskFreeRate, periodsPerYear)
+
+    return _safe_divide(annualised_returns(excessReturn, periodsPerYear), maximum_drawdown(price))
+
+def omega_ratio(returns: np.ndarray, riskFreeRate: float = 0.0, requiredReturn: float = 0.0,
+                periodsPerYear: Union[float, int] = 252) -> np.ndarray:
+    """Omega ratio of each column, matching empyrical.stats.omega_ratio
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        matrix of returns
+    riskFreeRate : float, optional
+        constant per period risk free rate, by default 0.0
+    requiredReturn : float, optional
+        annual minimum acceptable return, by default 0.0
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+
+    Returns
+    -------
+    np.ndarray
+        omega ratio of each column
+    """
+    if periodsPerYear == 1:
+        returnThreshold = requiredReturn
+
+    elif requiredReturn <= -1:
+        return np.full(returns.shape[1], np.nan)
+
+    else:
+        returnThreshold = (1 + requiredReturn) ** (1. / periodsPerYear) - 1
+
+    returnsLessThreshold = returns - riskFreeRate - returnThreshold
+
+    with np.errstate(invalid='ignore'):
+        numerator = np.where(returnsLessThreshold > 0, returnsLessThreshold, 0.0).sum(axis=0)
+        denominator = -np.where(returnsLessThreshold < 0, returnsLessThreshold, 0.0).sum(axis=0)
+
+    omega = np.where(denominator > 0, _safe_divide(numerator, denominator), np.nan)
+
+    return np.where(_valid_count(returns) < 2, np.nan, omega)
+
+def sortino_ratio(returns: np.ndarray, periodsPerYear: Union[float, int] = 252, reqReturn: float = 0.0,
+                    mean: np.ndarray = None, counts: np.ndarray = None) -> np.ndarray:
+    """Annualised sortino ratio of each column, matching empyrical.stats.sortino_ratio
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        matrix of returns
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+    reqReturn : float, optional
+        the minimum acceptable return by investors, by default 0
+    mean : np.ndarray, optional
+        precomputed mean return of each column, by default None
+    counts : np.ndarray, optional
+        precomputed number of observations of each column, by default None
+
+    Returns
+    -------
+    np.ndarray
+        annualised sortino ratio of each column
+    """
+    valid = ~np.isnan(returns)
+
+    if counts is None:
+        counts = _valid_count(returns, valid)
+
+    if mean is None:
+        mean, _ = _moments(returns, valid, counts)
+
+    downside = np.where(valid, np.minimum(returns - reqReturn, 0.0), 0.0)
+    downsideRisk = np.sqrt(_safe_divide(np.einsum('ij,ij->j', downside, downside), counts)) * np.sqrt(periodsPerYear)
+
+    sortino = _safe_divide((mean - reqReturn) * periodsPerYear, downsideRisk)
+
+    return np.where(counts < 2, np.nan, sortino)
+
+def tail_ratio(sortedReturns: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Tail ratio of each column, matching empyrical.stats.tail_ratio
+
+    Parameters
+    ----------
+    sortedReturns : np.ndarray
+        returns sorted along axis 0 with missing values at the end, e.g. np.sort(returns, axis=0)
+    counts : np.ndarray
+        number of non-missing observations in each column
+
+    Returns
+    -------
+    np.ndarray
+        ratio of the absolute 95th percentile to the absolute 5th percentile of each column
+    """
+
+    return _safe_divide(np.abs(percentile(sortedReturns, counts, 95)),
+                        np.abs(percentile(sortedReturns, counts, 5)))
+
+def stability(returns: np.ndarray) -> np.ndarray:
+    """R-squared of a linear fit to the cumulative log returns of each column,
+    matching empyrical.stats.stability_of_timeseries
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        matrix of returns
+
+    Returns
+    -------
+    np.ndarray
+        stability of each column
+    """
+    valid = ~np.isnan(returns)
+    counts = _valid_count(returns, valid)
+
+    # Missing observations are skipped by giving them a zero log return and no time step
+    cumLogReturns = np.cumsum(np.log1p(np.where(valid, returns, 0.0)), axis=0)
+    time = np.cumsum(valid, axis=0) - 1.0
+
+    timeMean = _safe_divide(np.where(valid, time, 0.0).sum(axis=0), counts)
+    returnMean = _safe_divide(np.where(valid, cumLogReturns, 0.0).sum(axis=0), counts)
+
+    timeDeviation = np.where(valid, time - timeMean, 0.0)
+    returnDeviation = np.where(valid, cumLogReturns - returnMean, 0.0)
+
+    covariance = np.einsum('ij,ij->j', timeDeviation, returnDeviation)
+    timeVariance = np.einsum('ij,ij->j', timeDeviation, timeDeviation)
+    returnVariance = np.einsum('ij,ij->j', returnDeviation, returnDeviation)
+
+    rSquared = _safe_divide(covariance ** 2, timeVariance * returnVariance)
+
+    return np.where(counts < 2, np.nan, np.minimum(rSquared, 1.0))
+
+def cumulative_returns(returns: np.ndarray, growth: np.ndarray = None) -> np.ndarray:
+    """Total compounded return of each column, i.e. the last row of statistics.cumulative_returns
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        matrix of returns
+    growth : np.ndarray, optional
+        precomputed compound growth (1 + returns).prod() of each column, by default None
+
+    Returns
+    -------
+    np.ndarray
+        cumulative return of each column
+    """
+    if growth is None:
+        growth = np.nanprod(1 + returns, axis=0)
+
+    return growth - 1
+
+def value_at_risk(sortedReturns: np.ndarray, counts: np.ndarray, threshold: float = 0.05) -> np.ndarray:
+    """Historical value at risk of each column, matching empyrical.stats.value_at_risk
+
+    Parameters
+    ----------
+    sortedReturns : np.ndarray
+        returns sorted along axis 0 with missing values at the end, e.g. np.sort(returns, axis=0)
+    counts : np.ndarray
+        number of non-missing observations in each column
+    threshold : float, optional
+        cutoff of the lower tail, by default 0.05
+
+    Returns
+    -------
+    np.ndarray
+        value at risk of each column
+    """
+
+    return percentile(sortedReturns, counts, 100 * threshold)
+
+def conditional_value_at_risk(returns: np.ndarray, valueAtRisk: np.ndarray) -> np.ndarray:
+    """Mean of the returns strictly below the value at risk of each column
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        matrix of returns
+    valueAtRisk : np.ndarray
+        value at risk of each column
+
+    Returns
+    -------
+    np.ndarray
+        conditional value at risk of each column
+    """
+    with np.errstate(invalid='ignore'):
+        tail = returns < valueAtRisk
+
+    return _safe_divide(np.where(tail, returns, 0.0).sum(axis=0), tail.sum(axis=0))
+
+def alpha_beta(returns: np.ndarray, benchmarkReturns: np.ndarray, riskFreeRate: float = 0.0,
+                periodsPerYear: Union[float, int] = 252) -> tuple:
+    """CAPM alpha and beta of every security against every benchmark, see statistics.alpha and statistics.beta.
+    Each pair is computed on the dates where both returns are present, with the joint counts, sums and cross
+    products of all N x K pairs obtained from a handful of matrix products.
+
+    Parameters
+    ----------
+    returns : np.ndarray
+        T x N matrix of security returns
+    benchmarkReturns : np.ndarray
+        T x K matrix of benchmark returns on the same dates
+    riskFreeRate : float, optional
+        given constant annual risk free rate throughout the period, by default 0.0
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+
+    Returns
+    -------
+    tuple
+        (annualised alpha, beta), each an N x K matrix
+    """
+    rfPerPeriod = _per_period_rate(riskFreeRate, periodsPerYear)
+    valid = ~np.isnan(returns)
+    benchmarkValid = ~np.isnan(benchmarkReturns)
+
+    # Centering on each column's mean leaves the covariances unchanged and avoids cancellation in the sums
+    with np.errstate(invalid='ignore'):
+        shift = np.nanmean(returns, axis=0)
+        benchmarkShift = np.nanmean(benchmarkReturns, axis=0)
+
+    centered = np.where(valid, returns - shift, 0.0)
+    benchmarkCentered = np.where(benchmarkValid, benchmarkReturns - benchmarkShift, 0.0)
+    valid = valid.astype(np.float64)
+    benchmarkValid = benchmarkValid.astype(np.float64)
+
+    counts = valid.T @ benchmarkValid
+    meanReturn = _safe_divide(centered.T @ benchmarkValid, counts)
+    meanBenchmark = _safe_divide(valid.T @ benchmarkCentered, counts)
+    covariance = _safe_divide(centered.T @ benchmarkCentered, counts) - meanReturn * meanBenchmark
+    variance = _safe_divide(valid.T @ benchmarkCentered ** 2, counts) - meanBenchmark ** 2
+
+    beta = _safe_divide(covariance, variance)
+    excessReturn = meanReturn + shift[:, None] - rfPerPeriod
+    excessBenchmark = meanBenchmark + benchmarkShift[None, :] - rfPerPeriod
+    alpha = (1 + excessReturn - beta * excessBenchmark) ** periodsPerYear - 1
+
+    return alpha, beta
+
+def fused_summary(price: np.ndarray, riskFreeRate: float = 0.0, periodsPerYear: Union[float, int] = 252,
+                    reqReturn: float = 0.0, threshold: float = 0.05) -> dict:
+    """Computes every metric reported by summarize.print_summary in a single pass over a price matrix.
+    Returns are computed once and the mean, deviations, compound growth, running peak and sorted tails
+    are shared between the metrics instead of being recomputed by each one.
+
+    Parameters
+    ----------
+    price : np.ndarray
+        T x N matrix of historical prices
+    riskFreeRate : float, optional
+        risk free rate, annual for the sharpe and calmar ratios and per period for the omega ratio
+        as in the corresponding financial_ratios functions, by default 0.0
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+    reqReturn : float, optional
+        the minimum acceptable return for the sortino ratio, by default 0
+    threshold : float, optional
+        cutoff of the lower tail for the value at risk, by default 0.05
+
+    Returns
+    -------
+    dict
+        Dictionary of the form {metricName: np.ndarray of length N}, ordered as in print_summary
+    """
+    price = np.asarray(price, dtype=np.float64)
+
+    if price.ndim == 1:
+        price = price[:, None]
+
+    returns = simple_returns(price)
+    valid = ~np.isnan(returns)
+    counts = valid.sum(axis=0)
+
+    mean, demeaned = _moments(returns, valid, counts)
+    growth = np.nanprod(1 + returns, axis=0)
+
+    rfPerPeriod = _per_period_rate(riskFreeRate, periodsPerYear)
+    if rfPerPeriod == 0:
+        excessGrowth = growth
+    else:
+        excessGrowth = np.nanprod(1 + returns - rfPerPeriod, axis=0)
+
+    annualReturns = annualised_returns(returns, periodsPerYear, growth, counts)
+    annualExcessReturns = annualised_returns(returns, periodsPerYear, excessGrowth, counts)
+    annualVolatility = annualised_volatility(returns, periodsPerYear, demeaned, counts)
+    maxDrawdown = maximum_drawdown(price, np.fmax.accumulate(price, axis=0))
+
+    sortedReturns = np.sort(returns, axis=0)
+    valueAtRisk = value_at_risk(sortedReturns, counts, threshold)
+
+    result = {}
+    result['sharpe_ratio'] = _safe_divide(annualExcessReturns, annualVolatility)
+    result['calmar_ratio'] = _safe_divide(annualExcessReturns, maxDrawdown)
+    result['omega_ratio'] = omega_ratio(returns, riskFreeRate, 0.0, periodsPerYear)
+    result['sortino_ratio'] = sortino_ratio(returns, periodsPerYear, reqReturn, mean, counts)
+    result['tail_ratio'] = tail_ratio(sortedReturns, counts)
+    result['annualised_returns'] = annualReturns
+    result['annualised_volatility'] = annualVolatility
+    result['calculate_skewness'] = skew(price, axis=0)
+    result['calculate_kurtosis'] = kurtosis(price, axis=0)
+    result['is_stable'] = stability(returns)
+    result['maximum_drawdown'] = maxDrawdown
+    result['cumulative_returns'] = cumulative_returns(returns, growth)
+    result['conditional_value_at_risk'] = conditional_value_at_risk(returns, valueAtRisk)
+    result['value_at_risk'] = valueAtRisk
+
+    return result
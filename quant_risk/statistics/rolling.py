@@ -0,0 +1,253 @@
+"""Rolling window versions of the risk metrics in financial_ratios, annualize, statistics and VaR.
+The value reported at date t is the batch metric computed on price.iloc[t - window: t + 1], i.e. on the last
+`window` returns, and every output is aligned to the index and columns of the input prices.
+Windows that are not yet full or that contain a missing price are NaN."""
+
+import numpy as np
+import pandas as pd
+from typing import Union
+from quant_risk.statistics import kernels
+
+__all__ = [
+    'rolling_volatility',
+    'rolling_sharpe_ratio',
+    'rolling_sortino_ratio',
+    'rolling_value_at_risk',
+    'rolling_maximum_drawdown'
+]
+
+
+def _as_frame(price: Union[pd.DataFrame, pd.Series]) -> pd.DataFrame:
+    """Returns the prices as a DataFrame so Series and DataFrames share one code path"""
+
+    if isinstance(price, pd.Series):
+        return price.to_frame()
+
+    return price
+
+def _wrap(values: np.ndarray, price: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
+    """Wraps a T x N result in the index and columns of the input prices"""
+
+    if isinstance(price, pd.Series):
+        return pd.Series(values[:, 0], index=price.index, name=price.name)
+
+    return pd.DataFrame(values, index=price.index, columns=price.columns)
+
+def _returns(price: Union[pd.DataFrame, pd.Series]) -> np.ndarray:
+    """Returns matrix aligned to the prices, with a NaN first row"""
+
+    returns = np.full(_as_frame(price).shape, np.nan)
+    returns[1:] = kernels.simple_returns(_as_frame(price).to_numpy(dtype='float64'))
+
+    return returns
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Running sum over the last `window` rows, updated in O(1) per row by adding the
+    entering row and dropping the leaving one. Windows containing a missing value are NaN."""
+
+    valid = ~np.isnan(values)
+
+    runningSum = np.zeros((values.shape[0] + 1, values.shape[1]))
+    np.cumsum(np.where(valid, values, 0.0), axis=0, out=runningSum[1:])
+    runningCount = np.zeros((values.shape[0] + 1, values.shape[1]), dtype=np.int64)
+    np.cumsum(valid, axis=0, out=runningCount[1:])
+
+    result = np.full(values.shape, np.nan)
+    if window > values.shape[0]:
+        return result
+
+    windowSum = runningSum[window:] - runningSum[:-window]
+    windowCount = runningCount[window:] - runningCount[:-window]
+    result[window - 1:] = np.where(windowCount == window, windowSum, np.nan)
+
+    return result
+
+def _check_window(window: int):
+    """Windows need at least two returns for the sample statistics"""
+
+    if not isinstance(window, (int, np.integer)) or window < 2:
+        raise ValueError(f"window must be an integer of at least 2, got {window}")
+
+def _rolling_variance(returns: np.ndarray, window: int) -> np.ndarray:
+    """Sample (ddof=1) variance over the last `window` returns from running sums of the returns and their squares"""
+
+    # Centering on the full sample mean leaves the variance unchanged and avoids cancellation in the sums
+    centered = returns - np.nanmean(returns, axis=0)
+    sumReturns = _rolling_sum(centered, window)
+    sumSquares = _rolling_sum(centered ** 2, window)
+
+    return np.maximum(sumSquares - sumReturns ** 2 / window, 0.0) / (window - 1)
+
+def rolling_volatility(price: Union[pd.DataFrame, pd.Series], window: int = 252,
+                        periodsPerYear: Union[float, int] = 252) -> Union[pd.DataFrame, pd.Series]:
+    """Calculates the rolling annualised volatility, see annualize.annualised_volatility
+
+    Parameters
+    ----------
+    price : Union[pd.DataFrame, pd.Series]
+        historical prices of the given securities
+    window : int, optional
+        number of returns in each window, by default 252
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+
+    Returns
+    -------
+    Union[pd.DataFrame, pd.Series]
+        rolling annualised volatility aligned to the prices
+    """
+    _check_window(window)
+    variance = _rolling_variance(_returns(price), window)
+
+    return _wrap(np.sqrt(variance) * (periodsPerYear ** 0.5), price)
+
+def rolling_sharpe_ratio(price: Union[pd.DataFrame, pd.Series], window: int = 252, riskFreeRate: float = 0.0,
+                            periodsPerYear: Union[float, int] = 252) -> Union[pd.DataFrame, pd.Series]:
+    """Calculates the rolling annualised sharpe ratio, see financial_ratios.sharpe_ratio
+
+    Parameters
+    ----------
+    price : Union[pd.DataFrame, pd.Series]
+        historical prices of the given securities
+    window : int, optional
+        number of returns in each window, by default 252
+    riskFreeRate : float, optional
+        given constant annual risk free rate throughout the period, by default 0.0
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+
+    Returns
+    -------
+    Union[pd.DataFrame, pd.Series]
+        rolling annualised sharpe ratio aligned to the prices
+    """
+    _check_window(window)
+    returns = _returns(price)
+    rfPerPeriod = kernels._per_period_rate(riskFreeRate, periodsPerYear)
+
+    # Compound growth of the excess returns as a running sum of log growth
+    logGrowth = _rolling_sum(np.log1p(returns - rfPerPeriod), window)
+    annualExcessReturn = np.expm1(logGrowth * (periodsPerYear / window))
+    annualVolatility = np.sqrt(_rolling_variance(returns, window)) * (periodsPerYear ** 0.5)
+
+    return _wrap(kernels._safe_divide(annualExcessReturn, annualVolatility), price)
+
+def rolling_sortino_ratio(price: Union[pd.DataFrame, pd.Series], window: int = 252, periodsPerYear: Union[float, int] = 252,
+                            reqReturn: float = 0) -> Union[pd.DataFrame, pd.Series]:
+    """Calculates the rolling annualised sortino ratio, see financial_ratios.sortino_ratio
+
+    Parameters
+    ----------
+    price : Union[pd.DataFrame, pd.Series]
+        historical prices of the given securities
+    window : int, optional
+        number of returns in each window, by default 252
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+    reqReturn : float, optional
+        the minimum acceptable return by investors, by default 0
+
+    Returns
+    -------
+    Union[pd.DataFrame, pd.Series]
+        rolling annualised sortino ratio aligned to the prices
+    """
+    _check_window(window)
+    adjustedReturns = _returns(price) - reqReturn
+
+    meanReturn = _rolling_sum(adjustedReturns, window) / window
+    downsideRisk = np.sqrt(_rolling_sum(np.minimum(adjustedReturns, 0.0) ** 2, window) / window)
+
+    return _wrap(kernels._safe_divide(meanReturn * periodsPerYear, downsideRisk * np.sqrt(periodsPerYear)), price)
+
+def rolling_value_at_risk(price: Union[pd.DataFrame, pd.Series], window: int = 252,
+                            threshold: float = 0.05) -> Union[pd.DataFrame, pd.Series]:
+    """Calculates the rolling historical value at risk, see VaR.value_at_risk.
+    The quantiles are maintained by pandas' rolling skiplist, an order-statistic structure that
+    inserts and removes one return per step in O(log window).
+
+    Parameters
+    ----------
+    price : Union[pd.DataFrame, pd.Series]
+        historical prices of the given securities
+    window : int, optional
+        number of returns in each window, by default 252
+    threshold : float, optional
+        cutoff of the lower tail, by default 0.05
+
+    Returns
+    -------
+    Union[pd.DataFrame, pd.Series]
+        rolling value at risk aligned to the prices
+    """
+    _check_window(window)
+    returns = pd.DataFrame(_returns(price))
+    var = returns.rolling(window).quantile(threshold, interpolation='linear')
+
+    return _wrap(var.to_numpy(), price)
+
+def _block_accumulate(values: np.ndarray, blockSize: int, ufunc: np.ufunc, reverse: bool = False) -> np.ndarray:
+    """Accumulates a ufunc within consecutive blocks of rows, forwards or backwards"""
+
+    nBlocks = values.shape[0] // blockSize
+    blocks = values.reshape(nBlocks, blockSize, values.shape[1])
+
+    if reverse:
+        return ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(values.shape)
+
+    return ufunc.accumulate(blocks, axis=1).reshape(values.shape)
+
+def rolling_maximum_drawdown(price: Union[pd.DataFrame, pd.Series], window: int = 252) -> Union[pd.DataFrame, pd.Series]:
+    """Calculates the rolling maximum drawdown, see statistics.maximum_drawdown.
+    The running peak, trough and worst drawdown are aggregated over blocks of window + 1 prices with prefix and
+    suffix scans (van Herk/Gil-Werman), so each window is merged from at most two partial blocks in O(1).
+
+    Parameters
+    ----------
+    price : Union[pd.DataFrame, pd.Series]
+        historical prices of the given securities
+    window : int, optional
+        number of returns in each window, i.e. each window spans window + 1 prices, by default 252
+
+    Returns
+    -------
+    Union[pd.DataFrame, pd.Series]
+        rolling maximum drawdown (a negative number) aligned to the prices
+    """
+    _check_window(window)
+    prices = _as_frame(price).to_numpy(dtype='float64')
+    nObs, nSeries = prices.shape
+    length = window + 1
+
+    result = np.full(prices.shape, np.nan)
+    if length > nObs:
+        return _wrap(result, price)
+
+    # Pad to a whole number of blocks, the padding never falls inside a reported window
+    nPadded = -(-nObs // length) * length
+    padded = np.full((nPadded, nSeries), np.nan)
+    padded[:nObs] = prices
+
+    with np.errstate(invalid='ignore'):
+        # Within each block, from the block start up to each row
+        prefixPeak = _block_accumulate(padded, length, np.fmax)
+        prefixTrough = _block_accumulate(padded, length, np.fmin)
+        prefixWorst = _block_accumulate(padded / prefixPeak - 1, length, np.fmin)
+
+        # Within each block, from each row up to the block end
+        suffixPeak = _block_accumulate(padded, length, np.fmax, reverse=True)
+        suffixTrough = _block_accumulate(padded, length, np.fmin, reverse=True)
+        suffixWorst = _block_accumulate(suffixTrough / padded - 1, length, np.fmin, reverse=True)
+
+        start = np.arange(nObs - length + 1)
+        end = start + length - 1
+
+        # A window that starts on a block boundary is exactly one block
+        crossing = np.minimum(np.minimum(suffixWorst[start], prefixWorst[end]),
+                                prefixTrough[end] / suffixPeak[start] - 1)
+        worst = np.where((start % length == 0)[:, None], suffixWorst[start], crossing)
+
+    complete = _rolling_sum(np.where(np.isnan(prices), np.nan, 0.0), length)[length - 1:] == 0
+    result[length - 1:] = np.where(complete, worst, np.nan)
+
+    return _wrap(result, price)
@@ -1,16 +1,20 @@
 "Put summary function here that prints or returns a dataframe"
 import pandas as pd
-from typing import Union
+from typing import NamedTuple, Union
 import empyrical
 import numpy as np
 from scipy.stats import skew, kurtosis, skewtest, kurtosistest
+from quant_risk.statistics import kernels
 
 __all__ = [
     'calculate_skewness',
     'calculate_kurtosis',
     'is_stable',
     'maximum_drawdown',
-    'cumulative_returns'
+    'DrawdownResult',
+    'cumulative_returns',
+    'alpha',
+    'beta'
 ]
 
 def calculate_skewness(price: Union[pd.DataFrame,pd.Series], test: bool = False, **kwargs) -> Union[float,pd.Series]:
@@ -68,30 +72,97 @@ def is_stable(price: pd.Series) -> float:
        stability for a given set of prices
     """
     if isinstance(price, pd.DataFrame):
-        return price.apply(is_stable)
+        returns = kernels.simple_returns(price.to_numpy(dtype='float64'))
+        return pd.Series(kernels.stability(returns), index=price.columns)
 
     returns = price.pct_change().dropna()
     stability = empyrical.stats.stability_of_timeseries(returns)
     return stability
 
-def maximum_drawdown(price: pd.Series) -> float:
-    """Calculates maximum drawdown for a given set of prices
+class DrawdownResult(NamedTuple):
+    """Result of statistics.maximum_drawdown. For a DataFrame of prices every field except drawdowns
+    is a pd.Series indexed by ticker, for a pd.Series of prices they are scalars.
+
+    Attributes
+    ----------
+    maximumDrawdown : Union[float, pd.Series]
+        maximum drawdown (a negative number)
+    drawdowns : Union[pd.Series, pd.DataFrame]
+        drawdown from the running peak at every date
+    duration : Union[float, pd.Series]
+        number of periods from the peak to the recovery, or to the last date if the prices have not recovered
+    peakDate : Union[object, pd.Series]
+        index label of the peak before the maximum drawdown
+    troughDate : Union[object, pd.Series]
+        index label of the trough of the maximum drawdown
+    recoveryDate : Union[object, pd.Series]
+        index label where the prices first regain the peak after the trough, None if they have not recovered
+    """
+    maximumDrawdown: Union[float, pd.Series]
+    drawdowns: Union[pd.Series, pd.DataFrame]
+    duration: Union[float, pd.Series]
+    peakDate: Union[object, pd.Series]
+    troughDate: Union[object, pd.Series]
+    recoveryDate: Union[object, pd.Series]
+
+def maximum_drawdown(price: Union[pd.DataFrame, pd.Series]) -> DrawdownResult:
+    """Calculates maximum drawdown for a given set of prices.
+    Nothing is stored between calls, so the function is safe to call concurrently.
 
     Parameters
     ----------
-    price : pd.Series
+    price : Union[pd.DataFrame, pd.Series]
         historical prices of a given security
 
     Returns
     -------
-    float
-        maximum drawdown for a given set of prices
+    DrawdownResult
+        maximum drawdown for a given set of prices, with the drawdown path, duration, peak, trough and recovery dates
     """
 
-    maximum_drawdown.drawdowns = (price / price.cummax()) - 1
-    maximumDrawdown = (maximum_drawdown.drawdowns).min()
+    frame = price.to_frame() if isinstance(price, pd.Series) else price
+    prices = frame.to_numpy(dtype='float64')
+    nObs, nSeries = prices.shape
+
+    drawdowns = (frame / frame.cummax()) - 1
+    values = drawdowns.to_numpy()
+
+    maximumDrawdown = drawdowns.min()
+    hasData = ~np.all(np.isnan(values), axis=0)
+
+    positions = np.arange(nObs)[:, None]
+    troughPosition = np.argmin(np.where(np.isnan(values), np.inf, values), axis=0)
+
+    # The peak is the last time the prices were at their running maximum before the trough
+    atPeak = values == 0
+    peakPosition = np.max(np.where(atPeak & (positions <= troughPosition), positions, 0), axis=0)
+
+    # The recovery is the first time after the trough the prices regain the peak
+    recovered = atPeak & (positions > troughPosition)
+    hasRecovered = recovered.any(axis=0)
+    recoveryPosition = np.where(hasRecovered, np.argmax(recovered, axis=0), nObs - 1)
+
+    # Prices that never fell below their running maximum have a zero length drawdown
+    hasDrawdown = np.where(np.isnan(values), 0, values).min(axis=0) < 0
+    recoveryPosition = np.where(hasDrawdown, recoveryPosition, troughPosition)
+    hasRecovered = hasRecovered | ~hasDrawdown
 
-    return maximumDrawdown
+    duration = np.where(hasData, recoveryPosition - peakPosition, np.nan)
+
+    index = frame.index
+    peakDate = [index[i] if valid else None for i, valid in zip(peakPosition, hasData)]
+    troughDate = [index[i] if valid else None for i, valid in zip(troughPosition, hasData)]
+    recoveryDate = [index[i] if valid and done else None for i, valid, done in zip(recoveryPosition, hasData, hasRecovered)]
+
+    if isinstance(price, pd.Series):
+        return DrawdownResult(maximumDrawdown.iloc[0], drawdowns.iloc[:, 0], duration[0],
+                                peakDate[0], troughDate[0], recoveryDate[0])
+
+    return DrawdownResult(maximumDrawdown, drawdowns,
+                            pd.Series(duration, index=frame.columns),
+                            pd.Series(peakDate, index=frame.columns, dtype=object),
+                            pd.Series(troughDate, index=frame.columns, dtype=object),
+                            pd.Series(recoveryDate, index=frame.columns, dtype=object))
 
 def cumulative_returns(price: Union[pd.DataFrame, pd.Series]) -> float:
     """Calculates cumulative returns for a given set of prices
@@ -111,58 +182,134 @@ def cumulative_returns(price: Union[pd.DataFrame, pd.Series]) -> float:
 
     return cumReturns
 
-def alpha(price: pd.Series, marketReturn: float, riskFreeRate: float = 0.0, periodsPerYear: Union[float, int] = 252) -> float:
-    """Calculates annualised alpha for a given set of prices, risk free rate and benchmark return (market return in CAPM)
+def _capm(price: Union[pd.DataFrame, pd.Series], marketReturn: Union[pd.DataFrame, pd.Series, np.ndarray],
+            riskFreeRate: float, periodsPerYear: Union[float, int], window: int, which: int):
+    """Shared implementation of alpha and beta, `which` selects the alpha (0) or beta (1) output"""
+
+    prices = price.to_frame() if isinstance(price, pd.Series) else price
+    benchmarks = marketReturn.to_frame() if isinstance(marketReturn, pd.Series) else marketReturn
+
+    if isinstance(benchmarks, pd.DataFrame):
+        benchmarks = benchmarks.reindex(prices.index)
+
+    else:
+        benchmarks = pd.DataFrame(np.asarray(marketReturn, dtype=np.float64).reshape(len(prices), -1), index=prices.index)
+
+    returns = np.full(prices.shape, np.nan)
+    returns[1:] = kernels.simple_returns(prices.to_numpy(dtype=np.float64))
+    benchmarkReturns = benchmarks.to_numpy(dtype=np.float64)
+
+    if window is None:
+        values = kernels.alpha_beta(returns, benchmarkReturns, riskFreeRate, periodsPerYear)[which]
+
+        if isinstance(price, pd.Series) and isinstance(marketReturn, (pd.Series, np.ndarray)) and benchmarks.shape[1] == 1:
+            return values[0, 0]
+
+        if isinstance(price, pd.Series):
+            return pd.Series(values[0], index=benchmarks.columns)
+
+        if benchmarks.shape[1] == 1 and not isinstance(marketReturn, pd.DataFrame):
+            return pd.Series(values[:, 0], index=prices.columns)
+
+        return pd.DataFrame(values, index=prices.columns, columns=benchmarks.columns)
+
+    # Imported here as rolling builds on this module's kernels
+    from quant_risk.statistics.rolling import _check_window, _rolling_sum
+
+    _check_window(window)
+    rfPerPeriod = kernels._per_period_rate(riskFreeRate, periodsPerYear)
+    excess = returns - rfPerPeriod
+    sumReturns = _rolling_sum(excess, window)
+
+    # Centering on the full sample means leaves the covariances unchanged and avoids cancellation in the sums
+    centered = excess - np.nanmean(excess, axis=0)
+    sumCentered = _rolling_sum(centered, window)
+    columns = []
+
+    for k in range(benchmarks.shape[1]):
+
+        benchmarkExcess = benchmarkReturns[:, [k]] - rfPerPeriod
+        benchmarkCentered = benchmarkExcess - np.nanmean(benchmarkExcess)
+        sumBenchmark = _rolling_sum(benchmarkCentered, window)
+
+        # Windows missing either return are incomplete, so every window holds exactly `window` pairs
+        covariance = (_rolling_sum(centered * benchmarkCentered, window) - sumCentered * sumBenchmark / window) / window
+        variance = (_rolling_sum(benchmarkCentered ** 2, window) - sumBenchmark ** 2 / window) / window
+        beta = kernels._safe_divide(covariance, variance)
+
+        if which == 1:
+            columns.append(beta)
+
+        else:
+            meanBenchmark = sumBenchmark / window + np.nanmean(benchmarkExcess)
+            columns.append((1 + sumReturns / window - beta * meanBenchmark) ** periodsPerYear - 1)
+
+    values = np.stack(columns, axis=2)
+
+    if isinstance(price, pd.Series):
+        if benchmarks.shape[1] == 1 and not isinstance(marketReturn, pd.DataFrame):
+            return pd.Series(values[:, 0, 0], index=prices.index, name=price.name)
+        return pd.DataFrame(values[:, 0, :], index=prices.index, columns=benchmarks.columns)
+
+    if benchmarks.shape[1] == 1 and not isinstance(marketReturn, pd.DataFrame):
+        return pd.DataFrame(values[:, :, 0], index=prices.index, columns=prices.columns)
+
+    columns = pd.MultiIndex.from_product([prices.columns, benchmarks.columns], names=['security', 'benchmark'])
+
+    return pd.DataFrame(values.reshape(len(prices), -1), index=prices.index, columns=columns)
+
+def alpha(price: Union[pd.DataFrame, pd.Series], marketReturn: Union[pd.DataFrame, pd.Series, np.ndarray],
+            riskFreeRate: float = 0.0, periodsPerYear: Union[float, int] = 252,
+            window: int = None) -> Union[float, pd.Series, pd.DataFrame]:
+    """Calculates annualised alpha for a given set of prices, risk free rate and benchmark return (market return in CAPM).
+    Every security is measured against every benchmark on the dates where both returns are present.
 
     Parameters
     ----------
-    price : pd.Series
-        historical prices of a given security
-    riskFreeRate : float
-        given constant risk free rate throughout the period
-    marketReturn : float
-        daily noncumulative benchmark return throughout the period
-    periodsPerYear : Union[float, int]
-        periodicity of the returns data for purposes of annualising
+    price : Union[pd.DataFrame, pd.Series]
+        historical prices of the given securities
+    marketReturn : Union[pd.DataFrame, pd.Series, np.ndarray]
+        daily noncumulative returns of one or more benchmarks, aligned to the prices
+    riskFreeRate : float, optional
+        given constant annual risk free rate throughout the period, by default 0.0
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of annualising, by default 252
+    window : int, optional
+        number of returns in each rolling window, by default None (the whole period)
 
     Returns
     -------
-    float
-        annualised alpha for a given set of prices, risk free rate and benchmark return (market return in CAPM)
+    Union[float, pd.Series, pd.DataFrame]
+        annualised alpha, a float for one security and one benchmark, otherwise indexed by security and/or benchmark.
+        With a window, the rolling alpha aligned to the prices, with (security, benchmark) columns if both are frames
     """
+    return _capm(price, marketReturn, riskFreeRate, periodsPerYear, window, which=0)
 
-    raise NotImplementedError("Will do it later :P")
-    if isinstance(price, pd.DataFrame):
-        return price.apply(alpha, args = (marketReturn , riskFreeRate, periodsPerYear))
-
-    returns = price.pct_change().dropna()
-    a = empyrical.stats.alpha(returns, factor_returns = marketReturn, risk_free = riskFreeRate, annualization = periodsPerYear)
-
-    return a
-
-def beta(price: pd.Series, riskFreeRate: float, marketReturn: float, periodsPerYear: Union[float, int]) -> float:
-    """Calculates annualised beta for a given set of prices, risk free rate and benchmark return (market return in CAPM)
+def beta(price: Union[pd.DataFrame, pd.Series], marketReturn: Union[pd.DataFrame, pd.Series, np.ndarray],
+            riskFreeRate: float = 0.0, periodsPerYear: Union[float, int] = 252,
+            window: int = None) -> Union[float, pd.Series, pd.DataFrame]:
+    """Calculates beta for a given set of prices, risk free rate and benchmark return (market return in CAPM).
+    Every security is measured against every benchmark on the dates where both returns are present.
 
     Parameters
     ----------
-    price : pd.Series
-        historical prices of a given security
-    riskFreeRate : float
-        given constant risk free rate throughout the period
-    marketReturn : float
-        daily noncumulative benchmark return throughout the period
-    periodsPerYear : Union[float, int]
-        periodicity of the returns data for purposes of annualising
+    price : Union[pd.DataFrame, pd.Series]
+        historical prices of the given securities
+    marketReturn : Union[pd.DataFrame, pd.Series, np.ndarray]
+        daily noncumulative returns of one or more benchmarks, aligned to the prices
+    riskFreeRate : float, optional
+        given constant annual risk free rate throughout the period, by default 0.0
+    periodsPerYear : Union[float, int], optional
+        periodicity of the returns data for purposes of converting the risk free rate, by default 252
+    window : int, optional
+        number of returns in each rolling window, by default None (the whole period)
 
     Returns
     -------
-    float
-        annualised beta for a given set of prices, risk free rate and benchmark return (market return in CAPM)
+    Union[float, pd.Series, pd.DataFrame]
+        beta, a float for one security and one benchmark, otherwise indexed by security and/or benchmark.
+        With a window, the rolling beta aligned to the prices, with (security, benchmark) columns if both are frames
     """
-    #TO DO: take dataframe as price input
-    raise NotImplementedError("Will do it later :P")
-    r = price.pct_change().dropna()
-    b = empyrical.stats.beta(r, factor_returns = marketReturn, risk_free = riskFreeRate, annualisation = periodsPerYear)
-    return b
+    return _capm(price, marketReturn, riskFreeRate, periodsPerYear, window, which=1)
 
 
@@ -0,0 +1,394 @@
+""" This module implements stateful accumulators that update risk metrics one price at a time for live monitoring.
+Each accumulator agrees with the corresponding batch function on the same price history."""
+
+import abc
+import math
+import numpy as np
+import pandas as pd
+from typing import Union
+from quant_risk.statistics import kernels
+
+__all__ = [
+    'VolatilityAccumulator',
+    'SharpeRatioAccumulator',
+    'DrawdownAccumulator',
+    'ConditionalValueAtRiskAccumulator',
+    'RiskMonitor'
+]
+
+
+class _ReturnAccumulator(abc.ABC):
+    """Base class that turns a stream of prices into a stream of simple returns"""
+
+    def __init__(self):
+
+        self.lastPrice = None
+        self.count = 0
+
+    def update(self, price: float):
+        """Adds a single new price
+
+        Parameters
+        ----------
+        price : float
+            latest price of the security
+        """
+        self.update_many([price])
+
+    def update_many(self, prices: Union[np.ndarray, list, pd.Series]):
+        """Adds a batch of new prices in chronological order
+
+        Parameters
+        ----------
+        prices : Union[np.ndarray, list, pd.Series]
+            latest prices of the security, oldest first
+        """
+        prices = np.asarray(prices, dtype=np.float64).ravel()
+        prices = prices[~np.isnan(prices)]
+
+        if prices.size == 0:
+            return
+
+        if self.lastPrice is not None:
+            prices = np.concatenate(([self.lastPrice], prices))
+
+        self.lastPrice = prices[-1]
+
+        if prices.size > 1:
+            returns = prices[1:] / prices[:-1] - 1
+            self.count += returns.size
+            self._add_returns(returns)
+
+    @abc.abstractmethod
+    def _add_returns(self, returns: np.ndarray):
+        """Folds a batch of new returns into the accumulated statistics"""
+
+
+class VolatilityAccumulator(_ReturnAccumulator):
+
+    def __init__(self, periodsPerYear: Union[float, int] = 252):
+        """Tracks the annualised volatility of the returns with Welford's algorithm,
+        see annualize.annualised_volatility
+
+        Parameters
+        ----------
+        periodsPerYear : Union[float, int], optional
+            freq of returns in a year, by default 252
+        """
+        super().__init__()
+        self.periodsPerYear = periodsPerYear
+        self.mean = 0.0
+        self.sumSquaredDeviations = 0.0
+
+    def _add_returns(self, returns: np.ndarray):
+
+        # Chan et al. pairwise combination of the running moments with the moments of the batch
+        n = self.count
+        batchCount = returns.size
+        previousCount = n - batchCount
+        batchMean = returns.mean()
+        batchSquaredDeviations = ((returns - batchMean) ** 2).sum()
+
+        delta = batchMean - self.mean
+        self.mean += delta * batchCount / n
+        self.sumSquaredDeviations += batchSquaredDeviations + delta ** 2 * previousCount * batchCount / n
+
+    def getVolatility(self) -> float:
+        """Returns the annualised volatility of the returns seen so far
+
+        Returns
+        -------
+        float
+            Annualised volatility, NaN before two returns have been seen
+        """
+        if self.count < 2:
+            return np.nan
+
+        return math.sqrt(self.sumSquaredDeviations / (self.count - 1)) * (self.periodsPerYear ** 0.5)
+
+
+class SharpeRatioAccumulator(VolatilityAccumulator):
+
+    def __init__(self, riskFreeRate: float = 0.0, periodsPerYear: Union[float, int] = 252):
+        """Tracks the annualised sharpe ratio, see financial_ratios.sharpe_ratio
+
+        Parameters
+        ----------
+        riskFreeRate : float, optional
+            given constant annual risk free rate throughout the period, by default 0.0
+        periodsPerYear : Union[float, int], optional
+            periodicity of the returns data for purposes of annualising, by default 252
+        """
+        super().__init__(periodsPerYear)
+        self.riskFreeRate = riskFreeRate
+        self.rfPerPeriod = kernels._per_period_rate(riskFreeRate, periodsPerYear)
+        self.logGrowth = 0.0
+
+    def _add_returns(self, returns: np.ndarray):
+
+        super()._add_returns(returns)
+        self.logGrowth += np.log1p(returns - self.rfPerPeriod).sum()
+
+    def getSharpeRatio(self) -> float:
+        """Returns the annualised sharpe ratio of the returns seen so far
+
+        Returns
+        -------
+        float
+            Annualised sharpe ratio, NaN before two returns have been seen
+        """
+        volatility = self.getVolatility()
+
+        if self.count < 2 or volatility == 0:
+            return np.nan
+
+        annualExcessReturn = math.expm1(self.logGrowth * self.periodsPerYear / self.count)
+
+        return annualExcessReturn / volatility
+
+
+class DrawdownAccumulator:
+
+    def __init__(self):
+        """Tracks the running peak, the current drawdown and the maximum drawdown, see statistics.maximum_drawdown"""
+
+        self.peak = -np.inf
+        self.drawdown = np.nan
+        self.maximumDrawdown = np.nan
+
+    def update(self, price: float):
+        """Adds a single new price
+
+        Parameters
+        ----------
+        price : float
+            latest price of the security
+        """
+        if np.isnan(price):
+            return
+
+        self.peak = max(self.peak, price)
+        self.drawdown = price / self.peak - 1
+        self.maximumDrawdown = np.fmin(self.maximumDrawdown, self.drawdown)
+
+    def update_many(self, prices: Union[np.ndarray, list, pd.Series]):
+        """Adds a batch of new prices in chronological order
+
+        Parameters
+        ----------
+        prices : Union[np.ndarray, list, pd.Series]
+            latest prices of the security, oldest first
+        """
+        prices = np.asarray(prices, dtype=np.float64).ravel()
+        prices = prices[~np.isnan(prices)]
+
+        if prices.size == 0:
+            return
+
+        runningPeak = np.maximum.accumulate(np.maximum(prices, self.peak))
+        drawdowns = prices / runningPeak - 1
+
+        self.peak = runningPeak[-1]
+        self.drawdown = drawdowns[-1]
+        self.maximumDrawdown = np.fmin(self.maximumDrawdown, drawdowns.min())
+
+    def getDrawdown(self) -> float:
+        """Returns the drawdown of the latest price from the running peak
+
+        Returns
+        -------
+        float
+            Current drawdown (a negative number or zero)
+        """
+        return self.drawdown
+
+    def getMaximumDrawdown(self) -> float:
+        """Returns the maximum drawdown of the prices seen so far
+
+        Returns
+        -------
+        float
+            Maximum drawdown (a negative number or zero)
+        """
+        return self.maximumDrawdown
+
+
+class ConditionalValueAtRiskAccumulator(_ReturnAccumulator):
+
+    def __init__(self, threshold: float = 0.05, compression: int = 200, bufferSize: int = 500):
+        """Tracks the historical value at risk and conditional value at risk with a bounded quantile sketch,
+        see VaR.value_at_risk and VaR.conditional_value_at_risk.
+        Every return is kept exactly until `compression` returns have been seen, after which the returns are
+        summarised by a merging t-digest of at most about `compression` centroids, most finely resolved in the tails.
+
+        Parameters
+        ----------
+        threshold : float, optional
+            cutoff of the lower tail, by default 0.05
+        compression : int, optional
+            maximum number of centroids kept by the sketch, by default 200
+        bufferSize : int, optional
+            number of new returns buffered before they are merged into the sketch, by default 500
+        """
+        super().__init__()
+        self.threshold = threshold
+        self.compression = compression
+        self.bufferSize = bufferSize
+
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.buffer = []
+        self.compressed = False
+
+    def _add_returns(self, returns: np.ndarray):
+
+        self.buffer.extend(returns[~np.isnan(returns)].tolist())
+
+        if len(self.buffer) >= self.bufferSize:
+            self._flush()
+
+    def _scale(self, quantile: float) -> float:
+        """t-digest k1 scale function, centroids may span at most one unit of k"""
+
+        return self.compression / (2 * math.pi) * math.asin(2 * quantile - 1)
+
+    def _flush(self):
+        """Merges the buffered returns into the sketch"""
+
+        if not self.buffer:
+            return
+
+        means = np.concatenate((self.means, self.buffer))
+        weights = np.concatenate((self.weights, np.ones(len(self.buffer))))
+        self.buffer = []
+
+        order = np.argsort(means, kind='mergesort')
+        means, weights = means[order], weights[order]
+
+        if not self.compressed and means.size <= self.compression:
+            self.means, self.weights = means, weights
+            return
+
+        self.compressed = True
+        total = weights.sum()
+        mergedMeans, mergedWeights = [], []
+        currentMean, currentWeight = means[0], weights[0]
+        cumulative = 0.0
+        kLeft = self._scale(0.0)
+
+        for mean, weight in zip(means[1:], weights[1:]):
+
+            if self._scale(min((cumulative + currentWeight + weight) / total, 1.0)) - kLeft <= 1:
+                currentWeight += weight
+                currentMean += (mean - currentMean) * weight / currentWeight
+
+            else:
+                mergedMeans.append(currentMean)
+                mergedWeights.append(currentWeight)
+                cumulative += currentWeight
+                kLeft = self._scale(min(cumulative / total, 1.0))
+                currentMean, currentWeight = mean, weight
+
+        mergedMeans.append(currentMean)
+        mergedWeights.append(currentWeight)
+
+        self.means, self.weights = np.array(mergedMeans), np.array(mergedWeights)
+
+    def getValueAtRisk(self) -> float:
+        """Returns the value at risk of the returns seen so far
+
+        Returns
+        -------
+        float
+            Value at risk, exact (linear interpolation as in np.percentile) until the sketch is compressed
+        """
+        self._flush()
+
+        if self.weights.size == 0:
+            return np.nan
+
+        # Centre rank of each centroid, so unit weights reproduce np.percentile exactly
+        ranks = np.cumsum(self.weights) - self.weights + (self.weights - 1) / 2
+        target = self.threshold * (self.weights.sum() - 1)
+
+        return float(np.interp(target, ranks, self.means))
+
+    def getConditionalValueAtRisk(self) -> float:
+        """Returns the conditional value at risk of the returns seen so far
+
+        Returns
+        -------
+        float
+            Mean of the returns below the value at risk
+        """
+        valueAtRisk = self.getValueAtRisk()
+        tail = self.means < valueAtRisk
+
+        if not tail.any():
+            return np.nan
+
+        return float(np.average(self.means[tail], weights=self.weights[tail]))
+
+
+class RiskMonitor:
+
+    def __init__(self, riskFreeRate: float = 0.0, periodsPerYear: Union[float, int] = 252, threshold: float = 0.05,
+                compression: int = 200):
+        """Updates the sharpe ratio, annualised volatility, drawdown and conditional value at risk of a single
+        security on every new price
+
+        Parameters
+        ----------
+        riskFreeRate : float, optional
+            given constant annual risk free rate throughout the period, by default 0.0
+        periodsPerYear : Union[float, int], optional
+            periodicity of the price updates for purposes of annualising, by default 252
+        threshold : float, optional
+            cutoff of the lower tail for the value at risk, by default 0.05
+        compression : int, optional
+            maximum number of centroids kept by the quantile sketch, by default 200
+        """
+        self.sharpe = SharpeRatioAccumulator(riskFreeRate, periodsPerYear)
+        self.drawdown = DrawdownAccumulator()
+        self.tailRisk = ConditionalValueAtRiskAccumulator(threshold, compression)
+
+    def update(self, price: float):
+        """Adds a single new price
+
+        Parameters
+        ----------
+        price : float
+            latest price of the security
+        """
+        self.sharpe.update(price)
+        self.drawdown.update(price)
+        self.tailRisk.update(price)
+
+    def update_many(self, prices: Union[np.ndarray, list, pd.Series]):
+        """Adds a batch of new prices in chronological order
+
+        Parameters
+        ----------
+        prices : Union[np.ndarray, list, pd.Series]
+            latest prices of the security, oldest first
+        """
+        self.sharpe.update_many(prices)
+        self.drawdown.update_many(prices)
+        self.tailRisk.update_many(prices)
+
+    def summary(self) -> pd.Series:
+        """Returns the current value of every monitored metric
+
+        Returns
+        -------
+        pd.Series
+            Sharpe ratio, annualised volatility, current and maximum drawdown, value at risk and conditional value at risk
+        """
+        return pd.Series({
+            'sharpe_ratio': self.sharpe.getSharpeRatio(),
+            'annualised_volatility': self.sharpe.getVolatility(),
+            'drawdown': self.drawdown.getDrawdown(),
+            'maximum_drawdown': self.drawdown.getMaximumDrawdown(),
+            'value_at_risk': self.tailRisk.getValueAtRisk(),
+            'conditional_value_at_risk': self.tailRisk.getConditionalValueAtRisk()
+        })
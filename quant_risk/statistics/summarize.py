@@ -1,14 +1,12 @@
-from quant_risk.statistics import financial_ratios
-from quant_risk.statistics import annualize
-from quant_risk.statistics import statistics
-from quant_risk.statistics import VaR
+from quant_risk.statistics import kernels
 import pandas as pd
+from typing import Union
 
 __all__ = [
     'print_summary'
 ]
 
-def print_summary(price: pd.Series, **kwargs):
+def print_summary(price: Union[pd.DataFrame, pd.Series], **kwargs) -> pd.DataFrame:
 
     # Fin ratios
     """
@@ -32,26 +30,26 @@ def print_summary(price: pd.Series, **kwargs):
     VaR
     1. var
     2. cvar
-    """
-
-    result = {}
-    for ratio in financial_ratios.__all__ :
-        result[ratio] = eval(f"financial_ratios.{ratio}(price, **kwargs)")
-
-    returns = price.pct_change().dropna()
 
-    for annual in annualize.__all__:
-        result[annual] = eval(f"annualize.{annual}(returns, **kwargs)")
+    All metrics are computed in a single vectorised pass by kernels.fused_summary, which computes the returns
+    once and shares the intermediates between metrics. Each column uses its own non-missing observations.
 
-    for stat in statistics.__all__:
-        result[stat] = eval(f"statistics.{stat}(price, **kwargs)")
+    Parameters
+    ----------
+    price : Union[pd.DataFrame, pd.Series]
+        historical prices of the given securities
+    kwargs :
+        riskFreeRate, periodsPerYear, reqReturn and threshold, passed to kernels.fused_summary
 
-    for var in VaR.__all__:
-        result[var] = eval(f"VaR.{var}(price, **kwargs)")
-
-    result['cumulative_returns'] = result['cumulative_returns'].iloc[-1, :]
-
-    return pd.DataFrame.from_dict(result).T
+    Returns
+    -------
+    pd.DataFrame
+        Summary statistics with one row per metric and one column per security
+    """
 
+    if isinstance(price, pd.Series):
+        price = price.to_frame()
 
+    result = kernels.fused_summary(price.to_numpy(dtype='float64'), **kwargs)
 
+    return pd.DataFrame.from_dict(result, orient='index', columns=price.columns)
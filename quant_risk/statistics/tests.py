@@ -1,78 +1,187 @@
 """Statistical tests"""
 from statsmodels.tsa.stattools import adfuller,grangercausalitytests,acf,pacf
 from typing import Union
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from scipy import stats, fft
+import hashlib
+import os
+import threading
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import statsmodels.api as sm
 
 __all__ = [
     'stationary_test_adf',
+    'clear_stationarity_cache',
     'granger_causality',
     'granger_causality_matrix',
     'ACF',
     'PACF',
+    'batch_ACF',
+    'batch_PACF',
     'hurst_exponent'
 ]
 
-def stationary_test_adf(series: pd.Series, verbose: bool = True, stationaritySignifiance: float = 0.05) -> tuple:
+# ADF results keyed by data fingerprint and lag setting, shared by every stationarity screen in the process
+_ADF_CACHE_SIZE = 4096
+_adfCache = OrderedDict()
+_adfCacheLock = threading.Lock()
+
+def _fingerprint(values: np.ndarray) -> str:
+    """Hash of the values of a series, used as the stationarity cache key"""
+
+    values = np.ascontiguousarray(values, dtype=np.float64)
+
+    return hashlib.sha1(values.tobytes()).hexdigest() + str(values.shape)
+
+def _adf(values: np.ndarray, lags: int = None) -> tuple:
+    """Runs adfuller with autolag, or a single regression with a fixed number of lags if lags is given
+
+    Returns
+    -------
+    tuple
+        (ADF statistic, p-value, critical values)
+    """
+    if lags is None:
+        result = adfuller(values)
+
+    else:
+        result = adfuller(values, maxlag=lags, autolag=None)
+
+    return result[0], result[1], result[4]
+
+def clear_stationarity_cache():
+    """Empties the cache of ADF results used by stationary_test_adf"""
+
+    with _adfCacheLock:
+        _adfCache.clear()
+
+def _cached_adf(columns: dict, lags: int = None, nJobs: int = 1, useCache: bool = True) -> dict:
+    """Runs the ADF test on each series, skipping those already in the cache and spreading the rest over a process pool
+
+    Parameters
+    ----------
+    columns : dict
+        Dictionary of the form {name: np.ndarray}
+    lags : int, optional
+        Fixed number of lags, by default None (autolag)
+    nJobs : int, optional
+        Number of worker processes, -1 to use every CPU, by default 1 (no process pool)
+    useCache : bool, optional
+        Whether cached results may be used and new results stored, by default True
+
+    Returns
+    -------
+    dict
+        Dictionary of the form {name: (ADF statistic, p-value, critical values)}
+    """
+    keys = {name: (_fingerprint(values), lags) for name, values in columns.items()}
+    results = {}
+
+    if useCache:
+        with _adfCacheLock:
+            for name, key in keys.items():
+                if key in _adfCache:
+                    _adfCache.move_to_end(key)
+                    results[name] = _adfCache[key]
+
+    missing = [name for name in columns if name not in results]
+
+    if nJobs == -1:
+        nJobs = os.cpu_count()
+
+    if nJobs > 1 and len(missing) > 1:
+        with ProcessPoolExecutor(max_workers=min(nJobs, len(missing))) as executor:
+            computed = list(executor.map(_adf, [columns[name] for name in missing], [lags] * len(missing)))
+
+    else:
+        computed = [_adf(columns[name], lags) for name in missing]
+
+    for name, result in zip(missing, computed):
+        results[name] = result
+
+    if useCache:
+        with _adfCacheLock:
+            for name, result in zip(missing, computed):
+                _adfCache[keys[name]] = result
+
+            while len(_adfCache) > _ADF_CACHE_SIZE:
+                _adfCache.popitem(last=False)
+
+    # Cache hits were collected first, restore the order of the columns
+    return {name: results[name] for name in columns}
+
+def stationary_test_adf(series: Union[pd.Series, pd.DataFrame], verbose: bool = True, stationaritySignifiance: float = 0.05,
+                        lags: int = None, nJobs: int = 1, useCache: bool = True) -> dict:
     """Runs the Augmented Dickey-Fuller test on the series, with the Null Hypothesis of non-stationarity
-    i.e data has a unit root
+    i.e data has a unit root.
+    Results are cached by a fingerprint of the data, so screening the same series again does not rerun the test.
 
     Parameters
     ----------
-    series : pd.Series
-        Time series data that we want to test for stationarity
+    series : Union[pd.Series, pd.DataFrame]
+        Time series data that we want to test for stationarity, each column is tested separately for a DataFrame
     verbose : bool, optional
         True if the ADF statistic, p-value and critical values are to be printed, by default True
     stationaritySignificance : float, optional
         The level of signifiance at which stationarity is checked, by default 0.05 (5%)
+    lags : int, optional
+        Fixed number of lagged differences in the test regression, which skips the autolag search over every lag
+        up to the default maximum, by default None (autolag by AIC)
+    nJobs : int, optional
+        Number of worker processes used to test the columns of a DataFrame, -1 to use every CPU, by default 1
+    useCache : bool, optional
+        Whether cached results may be used and new results stored, by default True
 
     Returns
     -------
-    tuple
-        Returns the relevant values in the format (p-value, ADF statistic, stationaryBool)
+    dict
+        Returns the relevant values in the format {'pvalue', 'Test Statistic', 'Is stationary'},
+        or a dictionary of those keyed by column for a DataFrame
     """
 
-    # Incase the given input is a Dataframe and not a Series object, iteratively call the same function
-    # for each col of our input dataframe and return as a dict
+    # Incase the given input is a Dataframe and not a Series object, test every column
+    # and return the results as a dict keyed by column
     if isinstance(series, pd.DataFrame):
+        columns = {col: series[col].to_numpy(dtype='float64') for col in series.columns}
 
-        results = {}
-        for col in series.columns:
+    else:
+        columns = {None: np.asarray(series, dtype='float64')}
 
-            if verbose:
-                print("--------------- \n")
-                print(col)
+    adfResults = _cached_adf(columns, lags=lags, nJobs=nJobs, useCache=useCache)
 
-            results[col] = stationary_test_adf(series[col], verbose=verbose)
+    results = {}
+    for col, (statistic, pvalue, criticalValues) in adfResults.items():
 
+        if verbose:
+            if col is not None:
+                print("--------------- \n")
+                print(col)
 
-        return results
+            print('ADF Statistic: %f' % statistic)
+            print('p-value: %f' % pvalue)
+            print('Critical Values:')
 
-    result = adfuller(series)
+            for key, value in criticalValues.items():
 
-    if verbose:
-        print('ADF Statistic: %f' % result[0])
-        print('p-value: %f' % result[1])
-        print('Critical Values:')
+                print('\t%s: %.3f' % (key, value))
 
-        for key, value in result[4].items():
+        if pvalue <= stationaritySignifiance:
+            # Null Hypothesis is rejected and series is stationary
+            stationaryBool = True
 
-            print('\t%s: %.3f' % (key, value))
+        else:
+            # Null Hypothesis cannot be rejected and series isn't stationary
+            stationaryBool = False
 
-    if result[1] <= stationaritySignifiance:
-        # Null Hypothesis is rejected and series is stationary
-        stationaryBool = True
+        results[col] = {'pvalue': pvalue,
+                        'Test Statistic': statistic,
+                        'Is stationary': stationaryBool}
 
-    else:
-        # Null Hypothesis cannot be rejected and series isn't stationary
-        stationaryBool = False
+    if isinstance(series, pd.DataFrame):
+        return results
 
-    results = {'pvalue': result[1],
-                'Test Statistic': result[0],
-                'Is stationary': stationaryBool}
-    return results
+    return results[None]
 
 def granger_causality(series: pd.DataFrame, maxLags: Union[int,list], addConst: bool = True, verbose: bool = True, testToUse: str = 'ssr_ftest') -> dict:
     """Performs the Granger Causality Test for the given series
@@ -121,11 +230,134 @@ def granger_causality(series: pd.DataFrame, maxLags: Union[int,list], addConst:
 
     return pvalue
 
-def  granger_causality_matrix(data: pd.DataFrame, testToUse: str = 'ssr_ftest', verbose: bool = False, maxlag: int = 10):
+# Lagged values and lag cross products of every series, set only inside the worker processes of granger_causality_matrix
+_grangerValues = None
+_grangerLags = None
+_grangerLagGrams = None
+
+def _lag_matrices(values: np.ndarray, maxlag: int) -> tuple:
+    """Builds the lag matrix of every series once, lags[t, l - 1, i] is the value of series i at time t - l,
+    together with the cross products of each series' first L lags over the sample used at lag L
+
+    Parameters
+    ----------
+    values : np.ndarray
+        T x N matrix of time series
+    maxlag : int
+        the maximum lag
+
+    Returns
+    -------
+    tuple
+        T x maxlag x N array of lagged values (NaN where the lag precedes the sample) and
+        a list whose (L - 1)th element is the N x L x L array of lag cross products at lag L
+    """
+    nObs, nSeries = values.shape
+    lags = np.full((nObs, maxlag, nSeries), np.nan)
+
+    for lag in range(1, maxlag + 1):
+        lags[lag:, lag - 1, :] = values[:-lag]
+
+    lagGrams = []
+    for lag in range(1, maxlag + 1):
+        sample = np.ascontiguousarray(lags[lag:, :lag, :].transpose(2, 0, 1))
+        lagGrams.append(sample.transpose(0, 2, 1) @ sample)
+
+    return lags, lagGrams
+
+def _set_granger_data(values: np.ndarray, lags: np.ndarray, lagGrams: list):
+    """Process pool initializer, stores the shared series and lag matrices in the worker"""
+
+    global _grangerValues, _grangerLags, _grangerLagGrams
+    _grangerValues, _grangerLags, _grangerLagGrams = values, lags, lagGrams
+
+def _granger_response_shared(response: int, maxlag: int, testToUse: str) -> np.ndarray:
+    """Runs _granger_response in a worker process on the data stored by _set_granger_data"""
+
+    return _granger_response(_grangerValues, _grangerLags, _grangerLagGrams, response, maxlag, testToUse)
+
+def _granger_response(values: np.ndarray, lags: np.ndarray, lagGrams: list, response: int, maxlag: int,
+                        testToUse: str) -> np.ndarray:
+    """Runs the Granger causality tests of every series against one response series for lags 1 to maxlag.
+    The restricted model (own lags and a constant) is fitted once per lag. The predictor lags are projected off the
+    restricted design, after which all predictors' unrestricted fits are one batched least squares solve.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        T x N matrix of time series
+    lags : np.ndarray
+        lagged values of the series, see _lag_matrices
+    lagGrams : list
+        lag cross products of the series, see _lag_matrices
+    response : int
+        column position of the response series
+    maxlag : int
+        the maximum lag that is tested
+    testToUse : str
+        one of 'ssr_ftest', 'params_ftest', 'ssr_chi2test' or 'lrtest'
+
+    Returns
+    -------
+    np.ndarray
+        maxlag x N array of p-values, row l - 1 holds the p-values at lag l for each predictor
+    """
+    nObs, nSeries = values.shape
+    pvalues = np.empty((maxlag, nSeries))
+
+    for lag in range(1, maxlag + 1):
+
+        nobs = nObs - lag
+        y = values[lag:, response]
+        restricted = np.column_stack((lags[lag:, :lag, response], np.ones(nobs)))
+        q, _ = np.linalg.qr(restricted)
+
+        residual = y - q @ (q.T @ y)
+        ssrRestricted = residual @ residual
+
+        # Frisch-Waugh-Lovell: the gain from the predictor lags is that of their residuals on the restricted design.
+        # Their cross products follow from the precomputed lag cross products and the projections on the restricted
+        # design, and the residual is already orthogonal to that design.
+        predictorLags = lags[lag:, :lag, :].reshape(nobs, lag * nSeries)
+        projection = (q.T @ predictorLags).reshape(-1, lag, nSeries).transpose(2, 0, 1)
+        gram = lagGrams[lag - 1] - projection.transpose(0, 2, 1) @ projection
+        moment = (residual @ predictorLags).reshape(lag, nSeries).T
+        coefficients = (np.linalg.pinv(gram) @ moment[:, :, None])[:, :, 0]
+
+        # Predictors spanned by the restricted design (e.g. the response itself) add nothing to the fit
+        energy = np.trace(lagGrams[lag - 1], axis1=1, axis2=2)
+        coefficients[np.trace(gram, axis1=1, axis2=2) <= 1e-10 * energy] = 0
+
+        ssrUnrestricted = ssrRestricted - np.einsum('pl,pl->p', moment, coefficients)
+        ssrUnrestricted = np.clip(ssrUnrestricted, 0, ssrRestricted)
+        dfResid = nobs - (2 * lag + 1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+
+            if testToUse in ('ssr_ftest', 'params_ftest'):
+                fstat = (ssrRestricted - ssrUnrestricted) / ssrUnrestricted / lag * dfResid
+                pvalues[lag - 1] = stats.f.sf(fstat, lag, dfResid)
+
+            elif testToUse == 'ssr_chi2test':
+                chi2stat = nobs * (ssrRestricted - ssrUnrestricted) / ssrUnrestricted
+                pvalues[lag - 1] = stats.chi2.sf(chi2stat, lag)
+
+            elif testToUse == 'lrtest':
+                lrstat = nobs * np.log(ssrRestricted / ssrUnrestricted)
+                pvalues[lag - 1] = stats.chi2.sf(lrstat, lag)
+
+            else:
+                raise ValueError(f"Invalid test '{testToUse}', please choose from 'ssr_ftest', 'params_ftest', 'ssr_chi2test' or 'lrtest'")
+
+    return pvalues
+
+def  granger_causality_matrix(data: pd.DataFrame, testToUse: str = 'ssr_ftest', verbose: bool = False, maxlag: int = 10, nJobs: int = 1):
     """The function returns a NxN matrix where N is the number of columns in our time series dataframe(should be the same as the number of variables in variables).
     The matrix is just the minimum p-value of the Johansen Cointegration test that is performed for each lag till maxlag for each series pair.
     The function also returns a dataframe that contains the lag value where the minimum pvalue was found. The variables in the columns are the predictors
     and the variables in the rows are reponses. The value in each cell of the matrix can be interpreted as the whether we can assume(<0.05) if our column causes our row variable.
+    The lag matrix of each series is built once and reused for every pair, and each response is tested against all predictors
+    with batched least squares, optionally spread over a process pool.
     Parameters
     ----------
     data : pd.DataFrame
@@ -136,13 +368,15 @@ def  granger_causality_matrix(data: pd.DataFrame, testToUse: str = 'ssr_ftest',
         Should the computation  be shown for each lag value for each pair computed, by default False
     maxlag : int, optional
         The maximum lag that the test checks causality for, by default 6
+    nJobs : int, optional
+        Number of worker processes, -1 to use every CPU, by default 1 (no process pool)
     Returns
     -------
     [pd.DataFrame, pd.DataFrame]
         Returns two dataframes that contain the pvalues and the value of the lag at which the minimum pvalue was found.
     """
 
-    stationarity_results = stationary_test_adf(data, verbose=verbose, stationaritySignifiance=0.05)
+    stationarity_results = stationary_test_adf(data, verbose=verbose, stationaritySignifiance=0.05, nJobs=nJobs)
 
     for key in list(stationarity_results.keys()):
 
@@ -150,23 +384,31 @@ def  granger_causality_matrix(data: pd.DataFrame, testToUse: str = 'ssr_ftest',
             raise ValueError(f"{key} is not stationary")
 
     variables = data.columns
-    dataset = pd.DataFrame(np.zeros((len(variables), len(variables))), columns=variables, index=variables)
-    Indexdataset = pd.DataFrame(np.zeros((len(variables), len(variables))), columns=variables, index=variables)
+    values = data.to_numpy(dtype='float64')
+    lags, lagGrams = _lag_matrices(values, maxlag)
+    responses = range(len(variables))
+
+    if nJobs == -1:
+        nJobs = os.cpu_count()
 
-    for predictor in dataset.columns:
-        for response in dataset.index:
+    if nJobs > 1:
 
-            test_result = grangercausalitytests(data[[response, predictor]], maxlag=maxlag, verbose=False, addconst=True)
+        with ProcessPoolExecutor(max_workers=nJobs, initializer=_set_granger_data, initargs=(values, lags, lagGrams)) as executor:
+            pvalues = list(executor.map(_granger_response_shared, responses, [maxlag] * len(variables), [testToUse] * len(variables)))
 
-            p_values = [round(test_result[i+1][0][testToUse][1], 4) for i in range(maxlag)]
-            min_p_value = np.min(p_values)
-            min_p_index = np.argmin(p_values)
+    else:
 
-            if verbose:
-                print(f'Y = {response}, X = {predictor}, P Value = {min_p_value}')
+        pvalues = [_granger_response(values, lags, lagGrams, response, maxlag, testToUse) for response in responses]
 
-            dataset.loc[response, predictor] = min_p_value
-            Indexdataset.loc[response, predictor] = min_p_index
+    # p-values are rounded before the minimum is taken, as reported by grangercausalitytests
+    pvalues = np.round(np.stack(pvalues), 4)
+    dataset = pd.DataFrame(pvalues.min(axis=1), columns=variables, index=variables)
+    Indexdataset = pd.DataFrame(pvalues.argmin(axis=1).astype('float64'), columns=variables, index=variables)
+
+    if verbose:
+        for predictor in dataset.columns:
+            for response in dataset.index:
+                print(f'Y = {response}, X = {predictor}, P Value = {dataset.loc[response, predictor]}')
 
     return dataset, Indexdataset
 
@@ -204,6 +446,9 @@ def ACF(series: pd.Series, adjusted: bool = False, nLags: int = 20, qStat: bool
     result = acf(x=series, adjusted=adjusted, nlags=nLags, qstat=qStat, fft=fft, alpha=alpha, missing=missing)
 
     if plot:
+        # Plotting libraries are only imported when a plot is requested, so batch jobs stay headless
+        import matplotlib.pyplot as plt
+        import statsmodels.api as sm
 
         sm.graphics.tsa.plot_acf(series.values.squeeze(), lags=nLags)
         plt.show()
@@ -236,12 +481,191 @@ def PACF(series: pd.Series, nLags: int = 20, method: str='ywadjusted', alpha: fl
     result =  pacf(x=series,nlags=nLags,method=method,alpha=alpha)
 
     if plot:
+        import matplotlib.pyplot as plt
+        import statsmodels.api as sm
 
         sm.graphics.tsa.plot_pacf(series.values.squeeze(), lags=nLags)
         plt.show()
 
     return result
 
+def _autocovariance(values: np.ndarray, nLags: int, adjusted: bool = False) -> np.ndarray:
+    """Autocovariances of every column of a T x N matrix up to nLags, computed with one FFT along the time axis
+
+    Parameters
+    ----------
+    values : np.ndarray
+        T x N matrix of time series without missing values
+    nLags : int
+        Number of lags to return autocovariances for
+    adjusted : bool, optional
+        If True, then denominators for autocovariance are n-k, otherwise n, by default False
+
+    Returns
+    -------
+    np.ndarray
+        (nLags + 1) x N matrix of autocovariances
+    """
+    nObs = values.shape[0]
+    demeaned = values - values.mean(axis=0)
+
+    # Zero padding to at least 2T - 1 points turns the circular correlation into the linear one
+    nfft = fft.next_fast_len(2 * nObs - 1)
+    spectrum = fft.rfft(demeaned, n=nfft, axis=0)
+    autocovariance = fft.irfft(spectrum * np.conj(spectrum), n=nfft, axis=0)[:nLags + 1]
+
+    if adjusted:
+        return autocovariance / (nObs - np.arange(nLags + 1))[:, None]
+
+    return autocovariance / nObs
+
+def _as_matrix(data: Union[pd.DataFrame, pd.Series, np.ndarray]) -> tuple:
+    """Returns the data as a float T x N matrix and its column labels"""
+
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+
+    if isinstance(data, pd.DataFrame):
+        values, columns = data.to_numpy(dtype='float64'), data.columns
+
+    else:
+        values = np.asarray(data, dtype='float64')
+        values = values[:, None] if values.ndim == 1 else values
+        columns = pd.RangeIndex(values.shape[1])
+
+    if np.isnan(values).any():
+        raise ValueError("Missing values are not supported, please drop or fill them first")
+
+    return values, columns
+
+def batch_ACF(data: Union[pd.DataFrame, np.ndarray], nLags: int = 20, adjusted: bool = False, qStat: bool = False,
+                alpha: float = None) -> Union[pd.DataFrame, tuple]:
+    """Calculates the ACF of every column of a T x N matrix in one FFT pass, and optionally the confidence intervals,
+    Ljung-Box Q-Statistic and its associated p-values, matching statsmodels' acf with fft=True for each column.
+    Never imports or uses matplotlib.
+
+    Parameters
+    ----------
+    data : Union[pd.DataFrame, np.ndarray]
+        T x N matrix of time series without missing values
+    nLags : int, optional
+        Number of lags to return autocorrelation for, by default 20
+    adjusted : bool, optional
+        If True, then denominators for autocovariance are n-k, otherwise n, by default False
+    qStat : bool, optional
+        If True, returns the Ljung-Box q statistic for each autocorrelation coefficient, by default False
+    alpha : float, optional
+        If a number is given, the confidence intervals (Bartlett's formula) for the given level are returned, by default None
+
+    Returns
+    -------
+    Union[pd.DataFrame, tuple]
+        Returns the autocorrelations as a (nLags + 1) x N DataFrame indexed by lag, and
+            Confidence intervals, if alpha is not None, as a DataFrame with columns ('lower', series) and ('upper', series)
+            The Ljung-Box Q-Statistic for lags 1 to nLags, if qStat is True, as a DataFrame
+            The p-values associated with the Q-statistics, if qStat is True, as a DataFrame
+    """
+    values, columns = _as_matrix(data)
+    nObs = values.shape[0]
+
+    autocovariance = _autocovariance(values, nLags, adjusted)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        autocorrelation = autocovariance / autocovariance[0]
+
+    lags = pd.RangeIndex(nLags + 1, name='lag')
+    result = [pd.DataFrame(autocorrelation, index=lags, columns=columns)]
+
+    if alpha is not None:
+        variance = np.ones((nLags + 1, values.shape[1])) / nObs
+        variance[0] = 0
+        variance[2:] *= 1 + 2 * np.cumsum(autocorrelation[1:-1] ** 2, axis=0)
+        interval = stats.norm.ppf(1 - alpha / 2.) * np.sqrt(variance)
+
+        result.append(pd.concat({'lower': pd.DataFrame(autocorrelation - interval, index=lags, columns=columns),
+                                 'upper': pd.DataFrame(autocorrelation + interval, index=lags, columns=columns)}, axis=1))
+
+    if qStat:
+        lagNumbers = np.arange(1, nLags + 1)
+        qstat = nObs * (nObs + 2) * np.cumsum(autocorrelation[1:] ** 2 / (nObs - lagNumbers)[:, None], axis=0)
+        pvalues = stats.chi2.sf(qstat, lagNumbers[:, None])
+
+        result.append(pd.DataFrame(qstat, index=lags[1:], columns=columns))
+        result.append(pd.DataFrame(pvalues, index=lags[1:], columns=columns))
+
+    if len(result) == 1:
+        return result[0]
+
+    return tuple(result)
+
+def batch_PACF(data: Union[pd.DataFrame, np.ndarray], nLags: int = 20, method: str = 'ywadjusted',
+                alpha: float = None) -> Union[pd.DataFrame, tuple]:
+    """Calculates the PACF of every column of a T x N matrix, and optionally the confidence intervals.
+    The autocovariances come from one FFT pass and the partial autocorrelations from a Durbin-Levinson recursion
+    vectorised across the columns, which matches statsmodels' Yule-Walker and Levinson-Durbin methods.
+    Never imports or uses matplotlib.
+
+    Parameters
+    ----------
+    data : Union[pd.DataFrame, np.ndarray]
+        T x N matrix of time series without missing values
+    nLags : int, optional
+        The largest lag for which the PACF is returned, by default 20
+    method : str, optional
+        One of 'yw'/'ywadjusted'/'ld'/'ldadjusted' (autocovariances with n-k denominators) or
+        'ywm'/'ywmle'/'ldb'/'ldbiased' (n denominators), by default 'ywadjusted'
+    alpha : float, optional
+        If a number is given, the confidence intervals for the given level are returned, by default None
+
+    Returns
+    -------
+    Union[pd.DataFrame, tuple]
+        Partial autocorrelations as a (nLags + 1) x N DataFrame indexed by lag, including lag zero, and
+            Confidence intervals, if alpha is not None, as a DataFrame with columns ('lower', series) and ('upper', series)
+    """
+    if method in ('yw', 'ywadjusted', 'ld', 'ldadjusted'):
+        adjusted = True
+
+    elif method in ('ywm', 'ywmle', 'ldb', 'ldbiased'):
+        adjusted = False
+
+    else:
+        raise ValueError(f"Invalid method '{method}', please choose from 'yw', 'ywadjusted', 'ywm', 'ywmle', 'ld', 'ldadjusted', 'ldb' or 'ldbiased'")
+
+    values, columns = _as_matrix(data)
+    nObs, nSeries = values.shape
+
+    autocovariance = _autocovariance(values, nLags, adjusted)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        autocorrelation = autocovariance / autocovariance[0]
+
+    partial = np.ones((nLags + 1, nSeries))
+    coefficients = np.zeros((nLags + 1, nSeries))
+    errorVariance = np.ones(nSeries)
+
+    # Durbin-Levinson: coefficients[1:k + 1] hold the AR(k) Yule-Walker coefficients after step k
+    for k in range(1, nLags + 1):
+
+        reflection = (autocorrelation[k] - np.einsum('jn,jn->n', coefficients[1:k], autocorrelation[k - 1:0:-1])) / errorVariance
+        coefficients[1:k] = coefficients[1:k] - reflection * coefficients[k - 1:0:-1]
+        coefficients[k] = reflection
+        errorVariance = errorVariance * (1 - reflection ** 2)
+        partial[k] = reflection
+
+    lags = pd.RangeIndex(nLags + 1, name='lag')
+    result = pd.DataFrame(partial, index=lags, columns=columns)
+
+    if alpha is None:
+        return result
+
+    interval = stats.norm.ppf(1 - alpha / 2.) * np.sqrt(1. / nObs)
+    lower, upper = partial - interval, partial + interval
+    lower[0], upper[0] = partial[0], partial[0]
+
+    confint = pd.concat({'lower': pd.DataFrame(lower, index=lags, columns=columns),
+                         'upper': pd.DataFrame(upper, index=lags, columns=columns)}, axis=1)
+
+    return result, confint
+
 def hurst_exponent(series: pd.Series, maxlag: int) -> float:
     """Returns the Hurst Exponent value for a given time series
     Source: https://towardsdatascience.com/introduction-to-the-hurst-exponent-with-code-in-python-4da0414ca52e
@@ -1,13 +1,24 @@
+import numpy as np
 import pandas as pd
 import quandl
 import datetime as dt
 from typing import Union
+from collections import OrderedDict
 
 __all__ = [
     'test_set',
-    'risk_free_rate'
+    'risk_free_rate',
+    'RiskFreeRateSeries',
+    'risk_free_rate_series',
+    'mean_risk_free_rate',
+    'clear_risk_free_rate_cache'
 ]
 
+# Risk free rate series fetched so far keyed by their span, reused by every later request that falls inside one of
+# them, with the least recently used series dropped first
+_RISK_FREE_RATE_CACHE_SIZE = 16
+_riskFreeRateCache = OrderedDict()
+
 # Gets test datasets from the quandl api
 def test_set(startDate: str = None, endDate: str = None, ticker: Union[str, list] = "AAPL", **kwargs) -> pd.DataFrame:
     """Test sets which are called from Quandl each time.
@@ -100,4 +111,114 @@ def risk_free_rate(startDate: str = None, endDate: str = None, **kwargs) -> pd.D
 
     else:
         print(f"...Data for {database} from {startDate} to {endDate} loaded successfully")
-        return data
\ No newline at end of file
+        return data
+
+class RiskFreeRateSeries:
+
+    def __init__(self, data: pd.DataFrame, startDate: str = None, endDate: str = None):
+        """Risk free rate series with O(1) averages over any window, from a cumulative sum of the rates indexed by date
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            riskFreeRate data indexed by date, as returned by risk_free_rate
+        startDate : str, optional
+            First date the series was requested for, by default the first date of the data
+        endDate : str, optional
+            Last date the series was requested for, by default the last date of the data
+        """
+        data = data.sort_index()
+        rates = data.iloc[:, 0].to_numpy(dtype='float64')
+        valid = ~np.isnan(rates)
+
+        self.data = data
+        self.dates = pd.DatetimeIndex(data.index)
+        self.startDate = pd.Timestamp(startDate) if startDate is not None else self.dates[0]
+        self.endDate = pd.Timestamp(endDate) if endDate is not None else self.dates[-1]
+        self.cumulativeRates = np.concatenate(([0.0], np.cumsum(np.where(valid, rates, 0.0))))
+        self.cumulativeCounts = np.concatenate(([0], np.cumsum(valid)))
+
+    def covers(self, startDate: str, endDate: str) -> bool:
+        """Whether the series was fetched for a span containing the given dates"""
+
+        return self.startDate <= pd.Timestamp(startDate) and pd.Timestamp(endDate) <= self.endDate
+
+    def mean(self, startDate: str, endDate: str) -> float:
+        """Returns the average risk free rate between startDate and endDate (both included)
+
+        Parameters
+        ----------
+        startDate : str
+            The format is "YYYY-MM-DD"
+        endDate : str
+            The format is "YYYY-MM-DD"
+
+        Returns
+        -------
+        float
+            Average rate over the window, NaN if there is no rate in the window
+        """
+        first = self.dates.searchsorted(pd.Timestamp(startDate), side='left')
+        last = self.dates.searchsorted(pd.Timestamp(endDate), side='right')
+        count = self.cumulativeCounts[last] - self.cumulativeCounts[first]
+
+        if count == 0:
+            return np.nan
+
+        return (self.cumulativeRates[last] - self.cumulativeRates[first]) / count
+
+def risk_free_rate_series(startDate: str, endDate: str) -> RiskFreeRateSeries:
+    """Returns the risk free rate series for a span of dates, fetched with risk_free_rate only if no series fetched
+    earlier already covers the span. Fetch the full span once before averaging over many windows inside it.
+
+    Parameters
+    ----------
+    startDate : str
+        The format is "YYYY-MM-DD"
+    endDate : str
+        The format is "YYYY-MM-DD"
+
+    Returns
+    -------
+    RiskFreeRateSeries
+        Cached risk free rate series covering the span
+    """
+    for span, series in _riskFreeRateCache.items():
+        if series.covers(startDate, endDate):
+            _riskFreeRateCache.move_to_end(span)
+            return series
+
+    series = RiskFreeRateSeries(risk_free_rate(startDate=startDate, endDate=endDate), startDate, endDate)
+
+    # Series whose span the new one covers would never be used again
+    for span in [span for span in _riskFreeRateCache if series.covers(*span)]:
+        del _riskFreeRateCache[span]
+
+    _riskFreeRateCache[(series.startDate, series.endDate)] = series
+
+    while len(_riskFreeRateCache) > _RISK_FREE_RATE_CACHE_SIZE:
+        _riskFreeRateCache.popitem(last=False)
+
+    return series
+
+def mean_risk_free_rate(startDate: str, endDate: str) -> float:
+    """Returns the average risk free rate between startDate and endDate, from the cached series if one covers them
+
+    Parameters
+    ----------
+    startDate : str
+        The format is "YYYY-MM-DD"
+    endDate : str
+        The format is "YYYY-MM-DD"
+
+    Returns
+    -------
+    float
+        Average of the riskFreeRate data over the window
+    """
+    return risk_free_rate_series(startDate, endDate).mean(startDate, endDate)
+
+def clear_risk_free_rate_cache():
+    """Empties the cache of risk free rate series used by risk_free_rate_series and mean_risk_free_rate"""
+
+    _riskFreeRateCache.clear()
@@ -5,6 +5,7 @@ import matplotlib.pyplot as plt
 import pandas as pd
 from typing import Union
 from pypfopt import plotting
+from quant_risk.portfolio.frontier import CriticalLineFrontier, sample_portfolios
 
 __all__ = [
     'weights',
@@ -48,9 +49,12 @@ def weights(weights: dict, ax: ax = None, plot: bool = False, **kwargs) -> ax:
 
 def efficient_frontier(optimizer: pypfopt.EfficientFrontier, efficientParameter: str = 'return',
                         efficentParameterRange:Union[np.array,list]=None, points:int=100, ax:ax=None,
-                        showAssets=True, plot:bool=False, complex:bool=True, **kwargs) -> ax:
+                        showAssets=True, plot:bool=False, complex:bool=True, riskFreeRate: float = 0.0,
+                        nSamples: int = 10000, seed: int = None, **kwargs) -> ax:
     """The function computes and plots the Efficient Frontier on an Efficient Frontier object
-        instantiated from the PyPortolioOpt package
+        instantiated from the PyPortolioOpt package.
+        The frontier over 'return' or 'risk' is computed in one pass by the critical line algorithm
+        (frontier.CriticalLineFrontier) and interpolated at every point, rather than solving one problem per point.
 
     Parameters
     ----------
@@ -74,6 +78,12 @@ def efficient_frontier(optimizer: pypfopt.EfficientFrontier, efficientParameter:
     complex : bool, optional
         Whether to plot a more comprehensive plot with suboptimal portfolios coloured by sharpe ratios.
         Note: this requires that the returns(mu) and the covariance matrix(S) also be provided in kwargs , by default True
+    riskFreeRate : float, optional
+        Risk free rate used to find the maximum sharpe ratio portfolio, by default 0.0
+    nSamples : int, optional
+        Number of random portfolios drawn when complex is True, by default 10000
+    seed : int, optional
+        Seed of the random portfolios, by default None
 
     Returns
     -------
@@ -82,26 +92,50 @@ def efficient_frontier(optimizer: pypfopt.EfficientFrontier, efficientParameter:
     """
 
     fig, ax = plt.subplots(figsize=(12, 8))
-    # TODO: Some error occuring in plotting
-    ax = plotting.plot_efficient_frontier(opt=optimizer, ef_param=efficientParameter,
-                                                    ef_param_range=efficentParameterRange, points=points,
-                                                    ax=ax, show_assets=showAssets)
+
+    # The critical line algorithm only handles the weight bounds, the utility frontier is left to pypfopt
+    bounds = [(float(lower), float(upper)) for lower, upper in zip(optimizer._lower_bounds, optimizer._upper_bounds)]
+    engine = None
+    if efficientParameter in ('return', 'risk'):
+        engine = CriticalLineFrontier(pd.Series(optimizer.expected_returns, index=optimizer.tickers),
+                                        optimizer.cov_matrix, bounds)
+
+    if engine is None:
+        ax = plotting.plot_efficient_frontier(opt=optimizer, ef_param=efficientParameter,
+                                                        ef_param_range=efficentParameterRange, points=points,
+                                                        ax=ax, show_assets=showAssets)
+
+    else:
+        if efficentParameterRange is None:
+            frontierReturns, frontierStd, _ = engine.frontier(points)
+
+        else:
+            frontierReturns, frontierStd, _ = engine.interpolate(efficentParameterRange, efficientParameter)
+
+        ax.plot(frontierStd, frontierReturns, label="Efficient frontier")
+
+        if showAssets:
+            ax.scatter(np.sqrt(np.diag(optimizer.cov_matrix)), optimizer.expected_returns, s=30, color="k", label="assets")
+
+        ax.legend()
+        ax.set_xlabel("Volatility")
+        ax.set_ylabel("Return")
 
     if complex:
 
         expectedReturns = pypfopt.expected_returns.mean_historical_return(**kwargs)
         covarianceMatrix = pypfopt.risk_models.CovarianceShrinkage(**kwargs).ledoit_wolf()
         # Find the tangency portfolio
-        optimizer.max_sharpe()
-        tangentReturns, tangentStd, _ = optimizer.portfolio_performance()
+        if engine is None:
+            engine = CriticalLineFrontier(pd.Series(optimizer.expected_returns, index=optimizer.tickers),
+                                            optimizer.cov_matrix, bounds)
+
+        _, tangentReturns, tangentStd, _ = engine.max_sharpe(riskFreeRate)
         ax.scatter(tangentStd, tangentReturns, marker="*", s=100, c="r", label="Max Sharpe")
 
         # Generate random portfolios
-        n_samples = 10000
-        sampleWeights = np.random.dirichlet(np.ones(len(expectedReturns)), n_samples)
-        sampleReturns = sampleWeights.dot(expectedReturns)
-        sampleStd = np.sqrt(np.diag(sampleWeights @ covarianceMatrix @ sampleWeights.T))
-        sharpes = sampleReturns / sampleStd
+        sampleReturns, sampleStd = sample_portfolios(expectedReturns, covarianceMatrix, nSamples, seed)
+        sharpes = (sampleReturns - riskFreeRate) / sampleStd
         ax.scatter(sampleStd, sampleReturns, marker=".", c=sharpes, cmap="viridis_r")
 
         # Output
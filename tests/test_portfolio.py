@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pypfopt import expected_returns, risk_models
+from quant_risk.portfolio.covariance import WindowStatistics
+from quant_risk.portfolio.portfolio import _erc_weights
+
+
+@pytest.mark.parametrize('nAssets', [5, 6, 20, 100])
+def test_erc_weights_converges_on_random_covariances(nAssets):
+
+    generator = np.random.default_rng(nAssets)
+
+    for trial in range(40):
+
+        if trial % 2:
+            loadings = generator.normal(size=(nAssets, 3))
+            covarianceMatrix = loadings @ loadings.T * 0.01 + np.diag(generator.uniform(0.01, 0.05, nAssets))
+
+        else:
+            returns = generator.normal(size=(2 * nAssets, nAssets))
+            covarianceMatrix = returns.T @ returns / (2 * nAssets) * generator.uniform(0.01, 0.1)
+
+        weights = _erc_weights(covarianceMatrix)
+        riskContributions = weights * (covarianceMatrix @ weights)
+
+        assert weights.sum() == pytest.approx(1.0)
+        assert (weights > 0).all()
+        np.testing.assert_allclose(riskContributions / riskContributions.sum(), 1 / nAssets, rtol=1e-8)
+
+
+@pytest.mark.parametrize('rank, ridge', [(3, 1e-6), (3, 1e-10), (10, 1e-8)])
+def test_erc_weights_converges_on_nearly_singular_covariances(rank, ridge):
+
+    generator = np.random.default_rng(rank)
+
+    for trial in range(5):
+
+        loadings = generator.normal(size=(50, rank))
+        covarianceMatrix = loadings @ loadings.T * 0.01 + ridge * np.eye(50)
+
+        weights = _erc_weights(covarianceMatrix)
+        riskContributions = weights * (covarianceMatrix @ weights)
+
+        assert weights.sum() == pytest.approx(1.0)
+        assert (weights > 0).all()
+        np.testing.assert_allclose(riskContributions / riskContributions.sum(), 1 / 50, rtol=1e-4)
+
+
+def test_window_statistics_match_pypfopt_with_missing_rows():
+
+    generator = np.random.default_rng(0)
+    returns = generator.normal(0.0005, 0.01, size=(300, 4))
+    historicalPrices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), columns=list('ABCD'),
+                                    index=pd.bdate_range('2020-01-01', periods=300))
+
+    # A row missing for every ticker, which drops two rows of returns, and a gap in a single ticker
+    historicalPrices.iloc[120] = np.nan
+    historicalPrices.iloc[200:205, 1] = np.nan
+
+    statistics = WindowStatistics(historicalPrices)
+
+    for startRow, endRow in [(0, 300), (50, 250), (100, 300), (110, 130)]:
+
+        window = historicalPrices.iloc[startRow:endRow]
+        expectedReturns, covarianceMatrix = statistics.get_window(startRow, endRow)
+
+        pd.testing.assert_series_equal(expectedReturns, expected_returns.mean_historical_return(window),
+                                       check_names=False)
+        pd.testing.assert_frame_equal(covarianceMatrix, risk_models.CovarianceShrinkage(window).ledoit_wolf())